@@ -0,0 +1,302 @@
+# tabadex_bot/benchmarks/crud_bench.py
+"""
+Seeded-database benchmark for database/crud.py.
+
+Seeds a throwaway database with users, orders, tickets and messages at several sizes,
+times every crud function and counts the SQL statements each call issues.
+Results are written as JSON so later runs can be compared against them:
+
+    python -m tabadex_bot.benchmarks.crud_bench --sizes 1000,10000
+    python -m tabadex_bot.benchmarks.crud_bench --compare benchmarks/results/crud-20260101-120000.json
+
+By default an in-memory SQLite database is used; pass --url to point at a local PostgreSQL
+(the database is dropped and re-created, so never point this at production).
+"""
+
+import argparse
+import asyncio
+import datetime
+import inspect
+import itertools
+import json
+import random
+import statistics
+import time
+from collections import Counter
+from pathlib import Path
+
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from ..database import crud
+from ..database.models import Base, User, Order, OrderStatus, SavedAddress, StaffRole, Ticket, TicketMessage, TicketStatus
+
+RESULTS_DIR = Path(__file__).parent / "results"
+DEFAULT_URL = "sqlite+aiosqlite:///:memory:"
+DEFAULT_SIZES = [1_000, 10_000]
+
+# Volumes relative to the user count.
+ORDERS_PER_USER = 3
+TICKETS_PER_USER = 0.2
+MESSAGES_PER_TICKET = 4
+ADDRESSES_PER_USER = 0.5
+SEED_CHUNK = 5_000
+
+FIRST_NAMES = ["Ali", "Sara", "Reza", "Maryam", "John", "Anna", "Mohammad", "Zahra", "Alex", "Nika"]
+
+
+class StatementCounter:
+    """Counts statements sent to the DBAPI through an engine."""
+    def __init__(self, sync_engine):
+        self.count = 0
+        event.listen(sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+
+def _chunks(rows: list, size: int = SEED_CHUNK):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+async def seed(engine, user_count: int, rng: random.Random) -> dict:
+    """Creates the schema and fills it with deterministic fake data. Returns sample keys for the cases."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    users = [{
+        "user_id": 10_000_000 + i,
+        "username": f"user{i}" if rng.random() < 0.8 else None,
+        "first_name": f"{rng.choice(FIRST_NAMES)}{i % 97}",
+        "language_code": rng.choice(["fa", "en"]),
+        "created_at": now - datetime.timedelta(minutes=rng.randrange(60 * 24 * 365)),
+        "is_blocked": rng.random() < 0.02,
+        "is_unreachable": rng.random() < 0.05,
+    } for i in range(user_count)]
+    user_ids = [u["user_id"] for u in users]
+
+    statuses = list(OrderStatus)
+    orders = [{
+        "id": f"tx{i:012d}",
+        "user_id": rng.choice(user_ids),
+        "from_currency": "btc", "to_currency": "usdt",
+        "from_amount": "0.01", "to_amount_estimated": "600",
+        "deposit_address": "bc1qdeposit", "recipient_address": "TRecipient",
+        "status": rng.choice(statuses),
+        "created_at": now - datetime.timedelta(minutes=rng.randrange(60 * 24 * 365)),
+    } for i in range(int(user_count * ORDERS_PER_USER))]
+
+    ticket_count = max(1, int(user_count * TICKETS_PER_USER))
+    ticket_statuses = list(TicketStatus)
+    tickets = [{
+        "id": i + 1, "user_id": rng.choice(user_ids), "title": "General question",
+        "status": rng.choice(ticket_statuses),
+        "created_at": now - datetime.timedelta(minutes=rng.randrange(60 * 24 * 365)),
+    } for i in range(ticket_count)]
+    messages = [{
+        "ticket_id": t["id"], "sender_id": t["user_id"], "text": "Hello, I have a question about my order.",
+        "is_admin_response": j % 2 == 1,
+    } for t in tickets for j in range(MESSAGES_PER_TICKET)]
+
+    addresses = [{
+        "user_id": rng.choice(user_ids), "name": f"wallet {i}", "address": "bc1qsaved", "currency_ticker": "btc",
+    } for i in range(int(user_count * ADDRESSES_PER_USER))]
+
+    async with engine.begin() as conn:
+        for model, rows in ((User, users), (Order, orders), (Ticket, tickets), (TicketMessage, messages), (SavedAddress, addresses)):
+            for chunk in _chunks(rows):
+                await conn.execute(insert(model), chunk)
+
+    busiest_user = Counter(o["user_id"] for o in orders).most_common(1)[0][0]
+    sample_order = next(o for o in orders if o["user_id"] == busiest_user)
+    sample_ticket = tickets[len(tickets) // 2]
+    return {
+        "user_id": busiest_user,
+        "order_id": sample_order["id"],
+        "unreachable_user_id": user_ids[-1],
+        "ticket_id": sample_ticket["id"],
+        "ticket_user_id": sample_ticket["user_id"],
+        "since": now - datetime.timedelta(hours=24),
+    }
+
+
+def build_cases(keys: dict) -> dict:
+    """Maps each crud function name to a coroutine factory taking a session."""
+    uid, tid, t_uid = keys["user_id"], keys["ticket_id"], keys["ticket_user_id"]
+
+    order_ids = itertools.count()
+
+    async def add_then_delete_address(session):
+        address = await crud.add_saved_address(session, uid, "bench", "bc1qbench", "btc")
+        await crud.delete_saved_address(session, address.id, uid)
+
+    return {
+        "get_setting": lambda s: crud.get_setting(s, "markup_percentage", "0.5"),
+        "get_all_settings": lambda s: crud.get_all_settings(s),
+        "set_setting": lambda s: crud.set_setting(s, "markup_percentage", "0.5"),
+        "get_or_create_user": lambda s: crud.get_or_create_user(s, uid, "bench", "Bench"),
+        "get_users_paginated": lambda s: crud.get_users_paginated(s, page=5, limit=10),
+        "get_total_user_count": lambda s: crud.get_total_user_count(s),
+        "get_user_by_user_id": lambda s: crud.get_user_by_user_id(s, uid),
+        "update_user_block_status": lambda s: crud.update_user_block_status(s, uid, is_blocked=False),
+        "get_blocked_user_ids": lambda s: crud.get_blocked_user_ids(s),
+        "get_user_language": lambda s: crud.get_user_language(s, uid),
+        "get_persisted_user_data": lambda s: crud.get_persisted_user_data(s, uid),
+        "save_persisted_user_data": lambda s: crud.save_persisted_user_data(s, {uid: '{"amount":"1"}', t_uid: None}),
+        "get_persisted_conversations": lambda s: crud.get_persisted_conversations(s, "exchange"),
+        "save_persisted_conversations": lambda s: crud.save_persisted_conversations(s, {("exchange", f"[{uid},{uid}]"): "3", ("exchange", f"[{t_uid},{t_uid}]"): None}),
+        "get_recent_user_languages": lambda s: crud.get_recent_user_languages(s, keys["since"], limit=1000),
+        "get_staff_roles": lambda s: crud.get_staff_roles(s),
+        "set_staff_role": lambda s: crud.set_staff_role(s, t_uid, StaffRole.SUPPORT, granted_by=uid),
+        "remove_staff_role": lambda s: crud.remove_staff_role(s, -1),
+        "bootstrap_admins": lambda s: crud.bootstrap_admins(s, {uid}),
+        "delete_finished_broadcast_jobs": lambda s: crud.delete_finished_broadcast_jobs(s, datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)),
+        "acquire_lease": lambda s: crud.acquire_lease(s, "bench", "bench-holder", 30),
+        "release_lease": lambda s: crud.release_lease(s, "bench", "other-holder"),
+        "search_users": lambda s: crud.search_users(s, "ali", page=1, limit=10),
+        "mark_users_seen": lambda s: crud.mark_users_seen(s, [uid, t_uid], keys["since"]),
+        "mark_users_unreachable": lambda s: crud.mark_users_unreachable(s, [keys["unreachable_user_id"]]),
+        "get_broadcast_recipient_ids_after": lambda s: crud.get_broadcast_recipient_ids_after(s, 0, 500, language="fa"),
+        "count_broadcast_recipients": lambda s: crud.count_broadcast_recipients(s, language="fa", active_since=keys["since"]),
+        "get_new_users_count_since": lambda s: crud.get_new_users_count_since(s, keys["since"]),
+        "get_order_by_idempotency_key": lambda s: crud.get_order_by_idempotency_key(s, "bench-missing-key"),
+        "create_order": lambda s: crud.create_order(
+            s, f"bench{next(order_ids)}", uid, "btc", "btc", "usdt", "trx", "0.01", "600",
+            "bc1qdeposit", "TRecipient", idempotency_key=f"bench-key-{next(order_ids)}"
+        ),
+        "get_orders_count_by_status": lambda s: crud.get_orders_count_by_status(s, OrderStatus.COMPLETED),
+        "get_orders_count_since": lambda s: crud.get_orders_count_since(s, keys["since"]),
+        "get_orders_by_user": lambda s: crud.get_orders_by_user(s, uid, page=1, limit=5),
+        "get_order_by_id_for_user": lambda s: crud.get_order_by_id_for_user(s, keys["order_id"], uid),
+        "get_saved_addresses_by_user": lambda s: crud.get_saved_addresses_by_user(s, uid),
+        "add_saved_address": add_then_delete_address,
+        "delete_saved_address": lambda s: crud.delete_saved_address(s, -1, uid),
+        "create_ticket": lambda s: crud.create_ticket(s, uid, "Bench", "Benchmark ticket"),
+        "get_tickets_by_user": lambda s: crud.get_tickets_by_user(s, t_uid),
+        "get_ticket_with_messages": lambda s: crud.get_ticket_with_messages(s, tid, t_uid),
+        "add_reply_to_ticket": lambda s: crud.add_reply_to_ticket(s, tid, t_uid, "Benchmark reply", is_admin=False),
+        "close_ticket_by_user": lambda s: crud.close_ticket_by_user(s, tid, t_uid),
+        "get_all_tickets_by_status": lambda s: crud.get_all_tickets_by_status(s, [TicketStatus.OPEN, TicketStatus.PENDING_USER_REPLY]),
+        "get_ticket_by_id_for_admin": lambda s: crud.get_ticket_by_id_for_admin(s, tid),
+        "close_ticket_by_admin": lambda s: crud.close_ticket_by_admin(s, tid),
+        "create_broadcast_job": lambda s: crud.create_broadcast_job(s, uid, uid, 1, "fa", 100, owner="bench"),
+        "get_broadcast_job": lambda s: crud.get_broadcast_job(s, 1),
+        "get_stale_broadcast_jobs": lambda s: crud.get_stale_broadcast_jobs(s, keys["since"]),
+        "claim_broadcast_job": lambda s: crud.claim_broadcast_job(s, 1, "bench", keys["since"]),
+        "update_broadcast_job": lambda s: crud.update_broadcast_job(s, 1, only_if_owner="bench", cursor_user_id=uid, success_count=1, failure_count=0),
+        "release_broadcast_jobs": lambda s: crud.release_broadcast_jobs(s, "bench"),
+    }
+
+
+def public_crud_functions() -> set[str]:
+    return {
+        name for name, obj in vars(crud).items()
+        if not name.startswith("_") and inspect.iscoroutinefunction(obj) and obj.__module__ == crud.__name__
+    }
+
+
+async def run_size(url: str, user_count: int, repeat: int, seed_value: int) -> dict:
+    engine = create_async_engine(url)
+    counter = StatementCounter(engine.sync_engine)
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        seed_started = time.perf_counter()
+        keys = await seed(engine, user_count, random.Random(seed_value))
+        seed_seconds = time.perf_counter() - seed_started
+
+        results = {}
+        for name, factory in build_cases(keys).items():
+            timings = []
+            statements = 0
+            for _ in range(repeat):
+                async with session_factory() as session:
+                    before = counter.count
+                    started = time.perf_counter()
+                    await factory(session)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    statements = counter.count - before
+            timings.sort()
+            results[name] = {
+                "median_ms": round(statistics.median(timings), 3),
+                "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+                "statements": statements,
+            }
+        return {"users": user_count, "seed_seconds": round(seed_seconds, 2), "functions": results}
+    finally:
+        await engine.dispose()
+
+
+def compare(current: dict, previous: dict, threshold: float) -> list[str]:
+    """Returns human-readable regressions of `current` against `previous`."""
+    regressions = []
+    previous_by_size = {run["users"]: run for run in previous.get("runs", [])}
+    for run in current["runs"]:
+        old_run = previous_by_size.get(run["users"])
+        if not old_run:
+            continue
+        for name, now in run["functions"].items():
+            old = old_run["functions"].get(name)
+            if not old:
+                continue
+            if now["statements"] > old["statements"]:
+                regressions.append(f"{name} @ {run['users']} users: statements {old['statements']} -> {now['statements']}")
+            if old["median_ms"] > 0 and now["median_ms"] > old["median_ms"] * (1 + threshold):
+                regressions.append(f"{name} @ {run['users']} users: median {old['median_ms']}ms -> {now['median_ms']}ms")
+    return regressions
+
+
+def print_report(report: dict):
+    for run in report["runs"]:
+        print(f"\n=== {run['users']} users (seeded in {run['seed_seconds']}s) ===")
+        print(f"{'function':<32}{'median ms':>12}{'p95 ms':>12}{'stmts':>8}")
+        for name, r in sorted(run["functions"].items()):
+            print(f"{name:<32}{r['median_ms']:>12.3f}{r['p95_ms']:>12.3f}{r['statements']:>8}")
+
+
+async def main_async(args) -> int:
+    missing = public_crud_functions() - set(build_cases({k: None for k in ("user_id", "ticket_id", "ticket_user_id", "order_id", "unreachable_user_id", "since")}))
+    if missing:
+        print(f"WARNING: no benchmark case for: {', '.join(sorted(missing))}")
+
+    report = {
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "url": args.url.split("@")[-1],
+        "repeat": args.repeat,
+        "runs": [await run_size(args.url, size, args.repeat, args.seed) for size in args.sizes],
+    }
+    print_report(report)
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    out = Path(args.output) if args.output else RESULTS_DIR / f"crud-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    out.write_text(json.dumps(report, indent=2))
+    print(f"\nResults saved to {out}")
+
+    if args.compare:
+        regressions = compare(report, json.loads(Path(args.compare).read_text()), args.threshold)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print("\nNo regressions.")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark database/crud.py against a seeded database.")
+    parser.add_argument("--url", default=DEFAULT_URL, help="SQLAlchemy async database URL (dropped and re-seeded!)")
+    parser.add_argument("--sizes", type=lambda v: [int(x) for x in v.split(",")], default=DEFAULT_SIZES, help="comma-separated user counts")
+    parser.add_argument("--repeat", type=int, default=20, help="calls per function")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="where to write the JSON report")
+    parser.add_argument("--compare", help="previous JSON report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative median slowdown")
+    raise SystemExit(asyncio.run(main_async(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# tabadex_bot/benchmarks/ingress_bench.py
+"""
+Polling vs. webhook ingestion throughput against a local fake Bot API.
+
+A small aiohttp server plays the role of api.telegram.org: it serves queued updates through
+getUpdates and answers sendMessage. The same synthetic handler (a simulated slow upstream call
+followed by a reply) runs under both ingestion modes and every CONCURRENT_UPDATES level given,
+using the bot's PerUserUpdateProcessor. Per-user ordering is verified on every run.
+
+    python -m tabadex_bot.benchmarks.ingress_bench --updates 2000 --users 200 --concurrency 1,8,32
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+
+from aiohttp import ClientSession, web
+from telegram import Update
+from telegram.ext import ApplicationBuilder, ContextTypes, MessageHandler, filters
+
+from ..utils.update_processor import PerUserUpdateProcessor
+
+TOKEN = "123456:BENCHMARK"
+API_PORT = 18081
+WEBHOOK_PORT = 18082
+
+
+class FakeBotAPI:
+    """Just enough of the Bot API for an Application to start, poll/receive and reply."""
+    def __init__(self):
+        self.pending: list[dict] = []
+        self.sent_messages = 0
+        self._message_ids = itertools.count(1)
+        self._runner: web.AppRunner | None = None
+
+    def _ok(self, result):
+        return web.json_response({"ok": True, "result": result})
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        data = await request.post() if request.can_read_body else {}
+        if method == "getMe":
+            return self._ok({"id": 123456, "is_bot": True, "first_name": "Bench", "username": "bench_bot"})
+        if method in ("deleteWebhook", "setWebhook"):
+            return self._ok(True)
+        if method == "getUpdates":
+            offset = int(data.get("offset") or 0)
+            self.pending = [u for u in self.pending if u["update_id"] >= offset]
+            if not self.pending:
+                await asyncio.sleep(0.05)
+            return self._ok(self.pending[:100])
+        if method == "sendMessage":
+            self.sent_messages += 1
+            return self._ok({
+                "message_id": next(self._message_ids), "date": int(time.time()),
+                "chat": {"id": int(data["chat_id"]), "type": "private"}, "text": data.get("text", ""),
+            })
+        return self._ok(True)
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", API_PORT).start()
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+
+def make_updates(count: int, users: int) -> list[dict]:
+    return [{
+        "update_id": i + 1,
+        "message": {
+            "message_id": i + 1, "date": int(time.time()), "text": str(i),
+            "chat": {"id": 1000 + i % users, "type": "private"},
+            "from": {"id": 1000 + i % users, "is_bot": False, "first_name": "U"},
+        },
+    } for i in range(count)]
+
+
+async def run_mode(mode: str, api: FakeBotAPI, updates: list[dict], concurrency: int, handler_latency: float) -> dict:
+    seen: dict[int, list[int]] = {}
+    active: set[int] = set()
+    overlaps = 0
+    done = asyncio.Event()
+
+    async def handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        nonlocal overlaps
+        user_id = update.effective_user.id
+        if user_id in active:
+            overlaps += 1
+        active.add(user_id)
+        try:
+            await asyncio.sleep(handler_latency)  # stands in for a SwapZone round trip
+            await update.message.reply_text("ok")
+            seen.setdefault(user_id, []).append(update.update_id)
+        finally:
+            active.discard(user_id)
+        if sum(map(len, seen.values())) == len(updates):
+            done.set()
+
+    application = (
+        ApplicationBuilder().token(TOKEN).base_url(f"http://127.0.0.1:{API_PORT}/bot")
+        .concurrent_updates(PerUserUpdateProcessor(concurrency)).build()
+    )
+    application.add_handler(MessageHandler(filters.TEXT, handler))
+
+    async with application:
+        await application.start()
+        started = time.perf_counter()
+        if mode == "polling":
+            api.pending = list(updates)
+            await application.updater.start_polling(poll_interval=0)
+        else:
+            await application.updater.start_webhook(
+                listen="127.0.0.1", port=WEBHOOK_PORT, url_path="hook",
+                webhook_url=f"http://127.0.0.1:{WEBHOOK_PORT}/hook", max_connections=40,
+            )
+            semaphore = asyncio.Semaphore(40)  # Telegram's default max_connections
+
+            async def post(session: ClientSession, payload: dict):
+                async with semaphore:
+                    async with session.post(f"http://127.0.0.1:{WEBHOOK_PORT}/hook", json=payload) as response:
+                        await response.read()
+
+            async with ClientSession() as session:
+                await asyncio.gather(*(post(session, u) for u in updates))
+        await asyncio.wait_for(done.wait(), timeout=600)
+        elapsed = time.perf_counter() - started
+        await application.updater.stop()
+        await application.stop()
+
+    out_of_order = sum(1 for ids in seen.values() if ids != sorted(ids))
+    return {
+        "mode": mode, "concurrency": concurrency, "seconds": round(elapsed, 3),
+        "updates_per_second": round(len(updates) / elapsed, 1),
+        "out_of_order_users": out_of_order, "overlapping_user_updates": overlaps,
+    }
+
+
+async def main_async(args):
+    api = FakeBotAPI()
+    await api.start()
+    results = []
+    try:
+        updates = make_updates(args.updates, args.users)
+        for concurrency in args.concurrency:
+            for mode in ("polling", "webhook"):
+                result = await run_mode(mode, api, updates, concurrency, args.handler_latency_ms / 1000)
+                results.append(result)
+                print(f"{mode:<8} concurrency={concurrency:<4} {result['updates_per_second']:>9} upd/s  "
+                      f"out-of-order users={result['out_of_order_users']} overlaps={result['overlapping_user_updates']}")
+    finally:
+        await api.stop()
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare polling and webhook ingestion throughput.")
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=lambda v: [int(x) for x in v.split(",")], default=[1, 8, 32])
+    parser.add_argument("--handler-latency-ms", type=float, default=20.0, help="simulated upstream latency per update")
+    parser.add_argument("--output", help="optional JSON file for the results")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# tabadex_bot/benchmarks/startup_bench.py
+"""
+Startup cost of each boot phase, old path vs. fast-start path.
+
+Against a seeded throwaway database and a local fake SwapZone (answering /currencies after
+--catalog-latency seconds), each run measures:
+
+- schema: create_all on every boot vs. the fingerprint check of utils/startup.ensure_schema
+- first query: the first request's query on a fresh engine, with and without warm_pool
+- caches: loading catalog, settings, roles, blocklist and languages one after another vs. concurrently
+
+    python -m tabadex_bot.benchmarks.startup_bench --users 10000 --runs 5
+
+By default a temporary SQLite file is used; pass --url to point at a local PostgreSQL
+(the database is dropped and re-created, so never point this at production).
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from aiohttp import web
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from ..database.models import Base, User, StaffMember, StaffRole
+from ..utils import swapzone_api
+from ..utils.startup import StartupReport, ensure_schema, warm_caches, warm_pool
+
+RESULTS_DIR = Path(__file__).parent / "results"
+SWAPZONE_PORT = 18083
+POOL_CONNECTIONS = 5
+
+
+async def serve_fake_swapzone(latency: float) -> web.AppRunner:
+    async def currencies(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        return web.json_response([{"ticker": f"c{i}", "name": f"Coin {i}", "network": "main"} for i in range(500)])
+
+    app = web.Application()
+    app.router.add_get("/v1/exchange/currencies", currencies)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", SWAPZONE_PORT).start()
+    swapzone_api.API_BASE_URL = f"http://127.0.0.1:{SWAPZONE_PORT}/v1/exchange"
+    return runner
+
+
+async def seed(url: str, user_count: int):
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await ensure_schema(engine, Base.metadata)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    async with engine.begin() as conn:
+        await conn.execute(insert(User), [{
+            "user_id": 10_000_000 + i, "first_name": f"User{i}", "language_code": "en" if i % 3 else "fa",
+            "is_blocked": i % 50 == 0, "last_seen_at": now - datetime.timedelta(minutes=i % (60 * 24 * 14)),
+        } for i in range(user_count)])
+        await conn.execute(insert(StaffMember), [{"user_id": 10_000_000 + i, "role": StaffRole.ADMIN} for i in range(3)])
+    await engine.dispose()
+
+
+async def timed(coro_factory) -> float:
+    started = time.perf_counter()
+    await coro_factory()
+    return time.perf_counter() - started
+
+
+async def run_once(url: str) -> dict:
+    results = {}
+    engine = create_async_engine(url)
+
+    async def create_all():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    results["schema_create_all"] = await timed(create_all)
+    results["schema_fingerprint"] = await timed(lambda: ensure_schema(engine, Base.metadata))
+    await engine.dispose()
+
+    for name, warm in (("first_query_cold", False), ("first_query_warm", True)):
+        engine = create_async_engine(url)
+        if warm:
+            await warm_pool(engine, POOL_CONNECTIONS)
+
+        async def first_query():
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT count(*) FROM app_settings"))
+        results[name] = await timed(first_query)
+        await engine.dispose()
+
+    engine = create_async_engine(url)
+    await warm_pool(engine, POOL_CONNECTIONS)
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    for name, concurrent in (("caches_sequential", False), ("caches_concurrent", True)):
+        results[name] = await timed(lambda: warm_caches(session_factory, StartupReport(), 7, concurrent=concurrent))
+    await engine.dispose()
+    return results
+
+
+async def main_async(args) -> int:
+    with tempfile.TemporaryDirectory() as directory:
+        url = args.url or f"sqlite+aiosqlite:///{directory}/startup_bench.db"
+        runner = await serve_fake_swapzone(args.catalog_latency)
+        try:
+            await seed(url, args.users)
+            runs = [await run_once(url) for _ in range(args.runs)]
+        finally:
+            await swapzone_api.swapzone_api_client.close_session()
+            await runner.cleanup()
+
+    medians = {name: statistics.median(run[name] for run in runs) for name in runs[0]}
+    report = {
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "url": (args.url or "sqlite (temporary file)").split("@")[-1],
+        "users": args.users, "runs": args.runs, "catalog_latency": args.catalog_latency,
+        "median_ms": {name: round(seconds * 1000, 3) for name, seconds in medians.items()},
+    }
+    print(f"{'phase':<24}{'median ms':>12}")
+    for name, ms in report["median_ms"].items():
+        print(f"{name:<24}{ms:>12.3f}")
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    out = Path(args.output) if args.output else RESULTS_DIR / f"startup-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    out.write_text(json.dumps(report, indent=2))
+    print(f"\nResults saved to {out}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the startup phases.")
+    parser.add_argument("--url", help="SQLAlchemy async database URL (dropped and re-seeded!)")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--catalog-latency", type=float, default=0.3, help="seconds the fake SwapZone takes to answer")
+    parser.add_argument("--output", help="where to write the JSON report")
+    raise SystemExit(asyncio.run(main_async(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
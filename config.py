@@ -4,6 +4,8 @@ import logging
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import List, Set
 
+from .utils.logging_setup import configure_logging
+
 class Settings(BaseSettings):
     # .env variables
     model_config = SettingsConfigDict(env_file='.env', env_file_encoding='utf-8', extra='ignore')
@@ -13,6 +15,76 @@ class Settings(BaseSettings):
     ADMIN_IDS: str
     SWAPZONE_API_KEY: str
 
+    # Update ingestion: "polling" or "webhook"
+    RUN_MODE: str = "polling"
+    CONCURRENT_UPDATES: int = 8
+    WEBHOOK_URL: str | None = None  # public base URL Telegram should call, e.g. https://bot.example.com
+    WEBHOOK_LISTEN: str = "0.0.0.0"
+    WEBHOOK_PORT: int = 8443
+    WEBHOOK_PATH: str = "telegram"
+    WEBHOOK_SECRET_TOKEN: str | None = None
+
+    # Broadcasts
+    BROADCAST_RATE_PER_SECOND: float = 25.0
+    BROADCAST_CONCURRENCY: int = 8
+    BROADCAST_MAX_JOBS: int = 4  # broadcasts sending at once; later ones wait
+    BROADCAST_RETENTION_DAYS: int = 90  # finished broadcast jobs are deleted after this
+
+    # Per-user flood control: sustained updates per second and burst size, per update kind
+    FLOOD_MESSAGE_RATE: float = 1.0
+    FLOOD_MESSAGE_BURST: float = 5
+    FLOOD_CALLBACK_RATE: float = 2.0
+    FLOOD_CALLBACK_BURST: float = 8
+    FLOOD_CALLBACK_DEBOUNCE_SECONDS: float = 0.7
+
+    # Locales: refuse to start when a key used in the code is missing from a language
+    LOCALE_STRICT: bool = False
+
+    # Language cache: users kept in memory, and how far back startup preloads active users
+    LANGUAGE_CACHE_SIZE: int = 50000
+    LANGUAGE_PRELOAD_DAYS: int = 7
+
+    # Conversation / user_data persistence: changed entries are written in one batch per interval
+    PERSISTENCE_FLUSH_SECONDS: float = 5.0
+
+    # Worker processes; above 1, one ingress process shards updates across workers by user id
+    WORKER_PROCESSES: int = 1
+
+    # Prometheus metrics endpoint (GET /metrics); off unless a port is set. Worker N of a sharded deployment uses port + N.
+    METRICS_HOST: str = "127.0.0.1"
+    METRICS_PORT: int | None = None
+
+    # Per-update tracing: share of updates traced (0 turns it off) and the duration that keeps a trace for admins
+    TRACE_SAMPLE_RATE: float = 0.0
+    TRACE_SLOW_SECONDS: float = 2.0
+    TRACE_BUFFER_SIZE: int = 50
+
+    # Startup: database connections opened before the first update is handled
+    DB_POOL_WARMUP_CONNECTIONS: int = 5
+
+    # Background jobs: leader lease for jobs that run once per deployment, concurrent maintenance jobs,
+    # how long shutdown waits for running tasks, and how often the currency catalog is refreshed
+    SCHEDULER_LEASE_SECONDS: float = 30.0
+    SCHEDULER_MAINTENANCE_CONCURRENCY: int = 2
+    SCHEDULER_DRAIN_SECONDS: float = 10.0
+    CATALOG_REFRESH_SECONDS: float = 3600.0
+
+    # Exchange flow: limits and rates fetched ahead of the step that needs them are used only if younger than this
+    PREFETCH_MAX_AGE_SECONDS: float = 30.0
+
+    # Recipient addresses are format-checked locally before any SwapZone call; verdicts cached per (network, address)
+    ADDRESS_CACHE_SIZE: int = 10000
+
+    # Logging: written by a background thread; the file rotates at LOG_MAX_BYTES, or on LOG_ROTATE_WHEN (e.g. "midnight") if set.
+    # LOG_SAMPLE_RATE is the share of high-volume info logs (per-request payloads) kept.
+    LOG_LEVEL: str = "INFO"
+    LOG_FILE: str = "bot.log"
+    LOG_MAX_BYTES: int = 50 * 1024 * 1024
+    LOG_ROTATE_WHEN: str | None = None
+    LOG_BACKUP_COUNT: int = 10
+    LOG_JSON: bool = False
+    LOG_SAMPLE_RATE: float = 1.0
+
     @property
     def ADMIN_ID_SET(self) -> Set[int]:
         """Returns a set of integer admin IDs."""
@@ -22,13 +94,9 @@ class Settings(BaseSettings):
 settings = Settings()
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler("bot.log")
-    ]
+log_listener = configure_logging(
+    settings.LOG_LEVEL, settings.LOG_FILE, settings.LOG_MAX_BYTES, settings.LOG_ROTATE_WHEN,
+    settings.LOG_BACKUP_COUNT, settings.LOG_JSON, settings.LOG_SAMPLE_RATE,
 )
 
 # Get a logger instance
@@ -1,18 +1,34 @@
 # tabadex_bot/database/crud.py
 
 import datetime
+import inspect
+import sys
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlalchemy.future import select
-from sqlalchemy import desc, update, func
+from sqlalchemy import desc, insert, update, delete, func, and_, or_, case, column, text, tuple_, Integer
+from sqlalchemy.exc import IntegrityError
 
-from .models import AppSetting, User, Order, OrderStatus, SavedAddress, Ticket, TicketMessage, TicketStatus
+from .models import (
+    AppSetting, User, Order, OrderStatus, SavedAddress, Ticket, TicketMessage, TicketStatus,
+    BroadcastJob, BroadcastStatus, StaffMember, StaffRole, PersistedUserData, PersistedConversation, SchedulerLease,
+    USER_SEARCH_FTS_TABLE
+)
+from ..utils.metrics import timed_crud
+
+USER_SEARCH_MAX_LIMIT = 20
+USER_SEARCH_MAX_PAGE = 50
+USER_SEARCH_MIN_FUZZY_LENGTH = 3
 
 # --- App Settings Functions ---
 async def get_setting(session: AsyncSession, key: str, default: str | None = None) -> str | None:
     setting = await session.get(AppSetting, key)
     return setting.value if setting else default
 
+async def get_all_settings(session: AsyncSession) -> dict[str, str]:
+    result = await session.execute(select(AppSetting.key, AppSetting.value))
+    return dict(result.all())
+
 async def set_setting(session: AsyncSession, key: str, value: str):
     setting = await session.get(AppSetting, key)
     if setting:
@@ -48,17 +64,191 @@ async def get_user_by_user_id(session: AsyncSession, user_id: int) -> User | Non
     result = await session.execute(select(User).filter(User.user_id == user_id))
     return result.scalar_one_or_none()
 
+async def get_user_language(session: AsyncSession, user_id: int) -> str | None:
+    result = await session.execute(select(User.language_code).filter(User.user_id == user_id))
+    return result.scalar_one_or_none()
+
+async def get_recent_user_languages(session: AsyncSession, active_since: datetime.datetime, limit: int) -> list[tuple[int, str]]:
+    """(user_id, language_code) of the users seen since `active_since`, most recently active first."""
+    query = (
+        select(User.user_id, User.language_code).filter(User.last_seen_at >= active_since)
+        .order_by(desc(User.last_seen_at)).limit(limit)
+    )
+    result = await session.execute(query)
+    return [tuple(row) for row in result.all()]
+
 async def update_user_block_status(session: AsyncSession, user_id: int, is_blocked: bool) -> bool:
     stmt = update(User).where(User.user_id == user_id).values(is_blocked=is_blocked)
     result = await session.execute(stmt)
     await session.commit()
     return result.rowcount > 0
 
-async def get_all_active_user_ids(session: AsyncSession) -> list[int]:
-    query = select(User.user_id).filter(User.is_blocked == False)
+async def get_blocked_user_ids(session: AsyncSession) -> list[int]:
+    result = await session.execute(select(User.user_id).where(User.is_blocked == True))
+    return list(result.scalars().all())
+
+def _prefix_upper_bound(prefix: str) -> str | None:
+    """The smallest string above every string starting with `prefix`, or None when there is none."""
+    stripped = prefix.rstrip(chr(sys.maxunicode))
+    if not stripped:
+        return None
+    code_point = ord(stripped[-1]) + 1
+    if 0xD800 <= code_point <= 0xDFFF:  # Surrogates cannot be sent to the database
+        code_point = 0xE000
+    return stripped[:-1] + chr(code_point)
+
+def _prefix_match(column_, prefix: str, dialect: str):
+    lowered = func.lower(column_)
+    if dialect == 'postgresql':
+        # Under a non-"C" collation a range does not match prefixes exactly; an escaped LIKE 'x%' does,
+        # and the text_pattern_ops ix_users_*_lower indexes serve it.
+        escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return lowered.like(f"{escaped}%", escape='\\')
+    # SQLite compares with the BINARY collation, so the range is exact, and unlike LIKE it is served by the indexes.
+    upper_bound = _prefix_upper_bound(prefix)
+    return lowered >= prefix if upper_bound is None else and_(lowered >= prefix, lowered < upper_bound)
+
+async def search_users(session: AsyncSession, query: str, page: int = 1, limit: int = 10) -> tuple[list[User], bool]:
+    """
+    Searches users by username / first name prefix, plus fuzzy matching when the term is long enough.
+    Returns one bounded page of results and whether another page exists.
+    """
+    term = query.strip().lstrip('@').lower()[:64]
+    if not term:
+        return [], False
+    limit = max(1, min(limit, USER_SEARCH_MAX_LIMIT))
+    page = max(1, min(page, USER_SEARCH_MAX_PAGE))
+    dialect = session.bind.dialect.name
+
+    prefix_match = or_(_prefix_match(User.username, term, dialect), _prefix_match(User.first_name, term, dialect))
+    conditions = [prefix_match]
+    order_by = [case((prefix_match, 0), else_=1)]
+
+    if len(term) >= USER_SEARCH_MIN_FUZZY_LENGTH:
+        if dialect == 'postgresql':
+            conditions += [User.username.op('%')(term), User.first_name.op('%')(term)]
+            order_by.append(desc(func.greatest(
+                func.similarity(func.coalesce(User.username, ''), term),
+                func.similarity(func.coalesce(User.first_name, ''), term),
+            )))
+        elif dialect == 'sqlite':
+            fts_term = '"' + term.replace('"', '""') + '"'
+            fts_match = text(f"SELECT rowid FROM {USER_SEARCH_FTS_TABLE} WHERE {USER_SEARCH_FTS_TABLE} MATCH :fts_term")
+            conditions.append(User.id.in_(fts_match.bindparams(fts_term=fts_term).columns(column('rowid', Integer))))
+        else:
+            pattern = f"%{term}%"
+            conditions += [User.username.ilike(pattern), User.first_name.ilike(pattern)]
+
+    stmt = (
+        select(User).filter(or_(*conditions))
+        .order_by(*order_by, User.username, User.id)
+        .offset((page - 1) * limit).limit(limit + 1)
+    )
+    result = await session.execute(stmt)
+    users = result.scalars().all()
+    return users[:limit], len(users) > limit
+
+async def mark_users_seen(session: AsyncSession, user_ids: list[int], seen_at: datetime.datetime, chunk_size: int = 500):
+    # A user who sent us an update can evidently be reached again.
+    for i in range(0, len(user_ids), chunk_size):
+        stmt = update(User).where(User.user_id.in_(user_ids[i:i + chunk_size])).values(last_seen_at=seen_at, is_unreachable=False)
+        await session.execute(stmt)
+    await session.commit()
+
+async def mark_users_unreachable(session: AsyncSession, user_ids: list[int], chunk_size: int = 500):
+    for i in range(0, len(user_ids), chunk_size):
+        await session.execute(update(User).where(User.user_id.in_(user_ids[i:i + chunk_size])).values(is_unreachable=True))
+    await session.commit()
+
+def _broadcast_recipient_filter(language: str | None = None, active_since: datetime.datetime | None = None) -> list:
+    # is_not(True): a NULL flag (a row that got the column without its default) counts as reachable.
+    conditions = [User.is_blocked == False, User.is_unreachable.is_not(True)]
+    if language:
+        conditions.append(User.language_code == language)
+    if active_since:
+        conditions.append(User.last_seen_at >= active_since)
+    return conditions
+
+async def count_broadcast_recipients(session: AsyncSession, language: str | None = None, active_since: datetime.datetime | None = None) -> int:
+    query = select(func.count(User.id)).filter(*_broadcast_recipient_filter(language, active_since))
+    result = await session.execute(query)
+    return result.scalar_one()
+
+async def get_broadcast_recipient_ids_after(
+    session: AsyncSession, after_user_id: int, limit: int,
+    language: str | None = None, active_since: datetime.datetime | None = None
+) -> list[int]:
+    """Keyset page of recipient user ids greater than `after_user_id`, in ascending order."""
+    query = (
+        select(User.user_id)
+        .filter(User.user_id > after_user_id, *_broadcast_recipient_filter(language, active_since))
+        .order_by(User.user_id).limit(limit)
+    )
     result = await session.execute(query)
     return result.scalars().all()
 
+# --- Staff Role Functions ---
+async def get_staff_roles(session: AsyncSession) -> dict[int, StaffRole]:
+    result = await session.execute(select(StaffMember.user_id, StaffMember.role))
+    return {user_id: role for user_id, role in result.all()}
+
+async def set_staff_role(session: AsyncSession, user_id: int, role: StaffRole, granted_by: int | None = None) -> StaffMember:
+    member = await session.get(StaffMember, user_id)
+    if member:
+        member.role, member.granted_by = role, granted_by
+    else:
+        member = StaffMember(user_id=user_id, role=role, granted_by=granted_by)
+        session.add(member)
+    await session.commit()
+    return member
+
+async def remove_staff_role(session: AsyncSession, user_id: int) -> bool:
+    member = await session.get(StaffMember, user_id)
+    if not member:
+        return False
+    await session.delete(member)
+    await session.commit()
+    return True
+
+async def bootstrap_admins(session: AsyncSession, user_ids: set[int]) -> int:
+    """Seeds the configured admins, but only while no admin exists, so roles changed in the bot stick."""
+    existing = await session.execute(select(StaffMember.user_id).where(StaffMember.role == StaffRole.ADMIN).limit(1))
+    if existing.first() is not None:
+        return 0
+    for user_id in user_ids:
+        await session.merge(StaffMember(user_id=user_id, role=StaffRole.ADMIN))
+    await session.commit()
+    return len(user_ids)
+
+# --- Persistence Functions ---
+async def get_persisted_user_data(session: AsyncSession, user_id: int) -> str | None:
+    result = await session.execute(select(PersistedUserData.data).filter(PersistedUserData.user_id == user_id))
+    return result.scalar_one_or_none()
+
+async def save_persisted_user_data(session: AsyncSession, entries: dict[int, str | None], chunk_size: int = 500):
+    """Writes a batch of serialized user_data in one transaction; None deletes the entry."""
+    user_ids = list(entries)
+    for i in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[i:i + chunk_size]
+        await session.execute(delete(PersistedUserData).where(PersistedUserData.user_id.in_(chunk)))
+        session.add_all(PersistedUserData(user_id=user_id, data=entries[user_id]) for user_id in chunk if entries[user_id] is not None)
+        await session.flush()
+    await session.commit()
+
+async def get_persisted_conversations(session: AsyncSession, name: str) -> list[tuple[str, str]]:
+    result = await session.execute(select(PersistedConversation.key, PersistedConversation.state).filter(PersistedConversation.name == name))
+    return [tuple(row) for row in result.all()]
+
+async def save_persisted_conversations(session: AsyncSession, entries: dict[tuple[str, str], str | None], chunk_size: int = 500):
+    """Writes a batch of conversation states keyed by (name, key) in one transaction; None deletes the entry."""
+    keys = list(entries)
+    for i in range(0, len(keys), chunk_size):
+        chunk = keys[i:i + chunk_size]
+        await session.execute(delete(PersistedConversation).where(tuple_(PersistedConversation.name, PersistedConversation.key).in_(chunk)))
+        session.add_all(PersistedConversation(name=name, key=key, state=entries[(name, key)]) for name, key in chunk if entries[(name, key)] is not None)
+        await session.flush()
+    await session.commit()
+
 # --- Statistics Functions ---
 async def get_new_users_count_since(session: AsyncSession, time_since: datetime.datetime) -> int:
     query = select(func.count(User.id)).filter(User.created_at >= time_since)
@@ -87,6 +277,33 @@ async def get_order_by_id_for_user(session: AsyncSession, order_id: str, user_id
     result = await session.execute(query)
     return result.scalar_one_or_none()
 
+async def get_order_by_idempotency_key(session: AsyncSession, idempotency_key: str) -> Order | None:
+    result = await session.execute(select(Order).filter(Order.idempotency_key == idempotency_key))
+    return result.scalar_one_or_none()
+
+async def create_order(
+    session: AsyncSession, tx_id: str, user_id: int, from_currency: str, from_network: str | None,
+    to_currency: str, to_network: str | None, from_amount: str, to_amount_estimated: str,
+    deposit_address: str, recipient_address: str, idempotency_key: str | None = None
+) -> Order:
+    """Saves a created SwapZone transaction. If another process saved the same idempotency key first, returns its order."""
+    order = Order(
+        id=tx_id, user_id=user_id, from_currency=from_currency, from_network=from_network,
+        to_currency=to_currency, to_network=to_network, from_amount=from_amount,
+        to_amount_estimated=to_amount_estimated, deposit_address=deposit_address,
+        recipient_address=recipient_address, idempotency_key=idempotency_key
+    )
+    session.add(order)
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        existing = await get_order_by_idempotency_key(session, idempotency_key) if idempotency_key else None
+        if existing is None:
+            raise
+        return existing
+    return order
+
 # --- SavedAddress Functions ---
 async def get_saved_addresses_by_user(session: AsyncSession, user_id: int) -> list[SavedAddress]:
     query = select(SavedAddress).filter(SavedAddress.user_id == user_id).order_by(SavedAddress.name)
@@ -162,4 +379,114 @@ async def close_ticket_by_admin(session: AsyncSession, ticket_id: int) -> bool:
     stmt = update(Ticket).where(Ticket.id == ticket_id).values(status=TicketStatus.CLOSED)
     result = await session.execute(stmt)
     await session.commit()
-    return result.rowcount > 0
\ No newline at end of file
+    return result.rowcount > 0
+
+# --- Broadcast Functions ---
+async def create_broadcast_job(
+    session: AsyncSession, admin_id: int, from_chat_id: int, message_id: int, lang: str, total_count: int,
+    segment_language: str | None = None, segment_active_since: datetime.datetime | None = None, owner: str | None = None
+) -> BroadcastJob:
+    job = BroadcastJob(
+        admin_id=admin_id, from_chat_id=from_chat_id, message_id=message_id, lang=lang, total_count=total_count,
+        segment_language=segment_language, segment_active_since=segment_active_since,
+        owner=owner, heartbeat_at=datetime.datetime.now(datetime.timezone.utc) if owner else None
+    )
+    session.add(job)
+    await session.commit()
+    await session.refresh(job)
+    return job
+
+async def get_broadcast_job(session: AsyncSession, job_id: int) -> BroadcastJob | None:
+    return await session.get(BroadcastJob, job_id)
+
+def _broadcast_job_orphaned(stale_before: datetime.datetime):
+    return or_(BroadcastJob.owner.is_(None), BroadcastJob.heartbeat_at.is_(None), BroadcastJob.heartbeat_at < stale_before)
+
+async def get_stale_broadcast_jobs(session: AsyncSession, stale_before: datetime.datetime) -> list[BroadcastJob]:
+    """Pending or running jobs without an owner, or whose owner has not heartbeated since `stale_before`."""
+    query = (
+        select(BroadcastJob)
+        .filter(BroadcastJob.status.in_([BroadcastStatus.PENDING, BroadcastStatus.RUNNING]), _broadcast_job_orphaned(stale_before))
+        .order_by(BroadcastJob.id)
+    )
+    result = await session.execute(query)
+    return result.scalars().all()
+
+async def claim_broadcast_job(session: AsyncSession, job_id: int, owner: str, stale_before: datetime.datetime) -> bool:
+    """Marks a pending or running job as running under `owner`, unless another owner still heartbeats it. A single UPDATE, so one claimer wins."""
+    stmt = (
+        update(BroadcastJob)
+        .where(
+            BroadcastJob.id == job_id,
+            BroadcastJob.status.in_([BroadcastStatus.PENDING, BroadcastStatus.RUNNING]),
+            or_(BroadcastJob.owner == owner, _broadcast_job_orphaned(stale_before)),
+        )
+        .values(status=BroadcastStatus.RUNNING, owner=owner, heartbeat_at=datetime.datetime.now(datetime.timezone.utc))
+    )
+    result = await session.execute(stmt)
+    await session.commit()
+    return result.rowcount > 0
+
+async def release_broadcast_jobs(session: AsyncSession, owner: str) -> int:
+    """Drops `owner` from its unfinished jobs, so the next resume picks them up without waiting for the heartbeat to go stale."""
+    stmt = (
+        update(BroadcastJob)
+        .where(BroadcastJob.owner == owner, BroadcastJob.status.in_([BroadcastStatus.PENDING, BroadcastStatus.RUNNING]))
+        .values(owner=None, heartbeat_at=None)
+    )
+    result = await session.execute(stmt)
+    await session.commit()
+    return result.rowcount
+
+async def update_broadcast_job(
+    session: AsyncSession, job_id: int, only_if_status: list[BroadcastStatus] | None = None, only_if_owner: str | None = None, **values
+) -> bool:
+    stmt = update(BroadcastJob).where(BroadcastJob.id == job_id).values(**values)
+    if only_if_status:
+        stmt = stmt.where(BroadcastJob.status.in_(only_if_status))
+    if only_if_owner:
+        stmt = stmt.where(BroadcastJob.owner == only_if_owner)
+    result = await session.execute(stmt)
+    await session.commit()
+    return result.rowcount > 0
+
+async def delete_finished_broadcast_jobs(session: AsyncSession, finished_before: datetime.datetime) -> int:
+    stmt = delete(BroadcastJob).where(
+        BroadcastJob.status.in_([BroadcastStatus.COMPLETED, BroadcastStatus.CANCELED]),
+        BroadcastJob.finished_at < finished_before,
+    )
+    result = await session.execute(stmt)
+    await session.commit()
+    return result.rowcount
+
+# --- Scheduler Lease Functions ---
+async def acquire_lease(session: AsyncSession, name: str, holder: str, ttl_seconds: float) -> bool:
+    """Takes or renews the lease `name` for `holder` unless another holder's lease is still valid."""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    expires_at = now + datetime.timedelta(seconds=ttl_seconds)
+    result = await session.execute(
+        update(SchedulerLease)
+        .where(SchedulerLease.name == name, or_(SchedulerLease.holder == holder, SchedulerLease.expires_at < now))
+        .values(holder=holder, expires_at=expires_at)
+    )
+    if result.rowcount == 0:
+        try:
+            await session.execute(insert(SchedulerLease).values(name=name, holder=holder, expires_at=expires_at))
+        except IntegrityError:
+            # The lease exists and is held by someone else.
+            await session.rollback()
+            return False
+    await session.commit()
+    return True
+
+async def release_lease(session: AsyncSession, name: str, holder: str) -> bool:
+    result = await session.execute(delete(SchedulerLease).where(SchedulerLease.name == name, SchedulerLease.holder == holder))
+    await session.commit()
+    return result.rowcount > 0
+
+# --- Instrumentation ---
+# Every public crud function is timed (tabadex_crud_seconds); wrapping here, before any module imports
+# the functions by name, covers all call sites.
+for _name, _func in list(globals().items()):
+    if not _name.startswith("_") and inspect.iscoroutinefunction(_func) and _func.__module__ == __name__:
+        globals()[_name] = timed_crud(_func)
@@ -0,0 +1,73 @@
+# tabadex_bot/database/migrations.py
+
+from sqlalchemy import MetaData, false, inspect, text, update
+
+from ..config import logger
+from .models import User
+
+
+def upgrade_schema(sync_conn, metadata: MetaData):
+    """
+    Brings existing tables up to the models; create_all only creates missing tables and never alters one.
+    Runs right after create_all, in the same transaction, and every step is idempotent, so it is safe on
+    a fresh database and on one that is already up to date.
+    """
+    add_missing_columns(sync_conn, metadata)
+    for upgrade in UPGRADES:
+        upgrade(sync_conn)
+
+
+def add_missing_columns(sync_conn, metadata: MetaData):
+    """
+    Adds columns missing from existing tables, with their server default so existing rows get a
+    value instead of NULL, then the indexes over them.
+    """
+    inspector = inspect(sync_conn)
+    compiler = sync_conn.dialect.ddl_compiler(sync_conn.dialect, None)
+    for table in metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        added = set()
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            if not column.nullable and column.server_default is None:
+                logger.warning(f"Column {table.name}.{column.name} is missing, NOT NULL and has no server default; add it by hand")
+                continue
+            # get_column_specification renders the column's server_default as its DEFAULT clause.
+            sync_conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {compiler.get_column_specification(column)}"))
+            added.add(column.name)
+            logger.info(f"Added column {table.name}.{column.name}")
+        # Only the indexes over added columns: expression indexes are not reported by every inspector.
+        for index in table.indexes:
+            if added & {column.name for column in index.columns}:
+                index.create(sync_conn)
+                logger.info(f"Added index {index.name}")
+
+
+def backfill_users_unreachable(sync_conn):
+    # Rows that got users.is_unreachable without its server default (e.g. a column added by hand) hold NULL.
+    result = sync_conn.execute(update(User).where(User.is_unreachable.is_(None)).values(is_unreachable=false()))
+    if result.rowcount:
+        logger.info(f"Backfilled users.is_unreachable of {result.rowcount} users")
+
+
+def rebuild_user_prefix_indexes(sync_conn):
+    # The lower(...) search indexes were first created without text_pattern_ops, which LIKE 'x%' needs on PostgreSQL.
+    if sync_conn.dialect.name != 'postgresql':
+        return
+    for index in User.__table__.indexes:
+        if index.name not in ('ix_users_username_lower', 'ix_users_first_name_lower'):
+            continue
+        definition = sync_conn.execute(
+            text("SELECT indexdef FROM pg_indexes WHERE indexname = :name"), {"name": index.name}
+        ).scalar_one_or_none()
+        if definition is not None and 'text_pattern_ops' not in definition:
+            index.drop(sync_conn)
+            index.create(sync_conn)
+            logger.info(f"Rebuilt index {index.name} with text_pattern_ops")
+
+
+# Data and index upgrades that adding columns cannot express, in the order they were introduced.
+UPGRADES = [rebuild_user_prefix_indexes, backfill_users_unreachable]
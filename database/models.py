@@ -3,7 +3,7 @@
 import enum
 from sqlalchemy import (
     Column, Integer, String, BigInteger, DateTime, ForeignKey,
-    Enum as SQLAlchemyEnum, Text, Boolean, func
+    Enum as SQLAlchemyEnum, Text, Boolean, Index, DDL, event, false, func
 )
 from sqlalchemy.orm import declarative_base, relationship
 
@@ -29,6 +29,18 @@ class TicketStatus(enum.Enum):
     PENDING_USER_REPLY = "pending_user_reply"
     CLOSED = "closed"
 
+class StaffRole(enum.Enum):
+    """نقش‌های کارکنان ربات."""
+    ADMIN = "admin"
+    SUPPORT = "support"
+
+class BroadcastStatus(enum.Enum):
+    """وضعیت‌های مختلف یک ارسال همگانی."""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    CANCELED = "canceled"
+
 # --- مدل‌های اصلی دیتابیس ---
 
 class AppSetting(Base):
@@ -43,6 +55,19 @@ class AppSetting(Base):
     def __repr__(self):
         return f"<AppSetting(key='{self.key}', value='{self.value}')>"
 
+class StaffMember(Base):
+    """
+    کاربرانی که نقش مدیر یا پشتیبان دارند؛ منبع اصلی دسترسی‌ها (ADMIN_IDS فقط برای راه‌اندازی اولیه است).
+    """
+    __tablename__ = 'staff_roles'
+    user_id = Column(BigInteger, primary_key=True)  # No FK: staff may not have started the bot yet
+    role = Column(SQLAlchemyEnum(StaffRole), nullable=False)
+    granted_by = Column(BigInteger)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<StaffMember(user_id={self.user_id}, role='{self.role}')>"
+
 class User(Base):
     """
     مدل مربوط به کاربران ربات.
@@ -56,6 +81,8 @@ class User(Base):
     language_code = Column(String, default='fa')
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     is_blocked = Column(Boolean, default=False)
+    last_seen_at = Column(DateTime(timezone=True), index=True) # آخرین فعالیت، به صورت دسته‌ای به‌روزرسانی می‌شود
+    is_unreachable = Column(Boolean, default=False, server_default=false(), index=True) # ربات را بلاک کرده یا حسابش حذف شده است
 
     # --- Relationships ---
     orders = relationship("Order", back_populates="user", cascade="all, delete-orphan")
@@ -65,6 +92,60 @@ class User(Base):
     def __repr__(self):
         return f"<User(user_id={self.user_id}, username='{self.username}')>"
 
+# --- ایندکس‌های جستجوی کاربران (پنل ادمین) ---
+# Prefix search runs over lower(...): as LIKE 'x%' on PostgreSQL (hence text_pattern_ops), as a range on SQLite.
+Index(
+    'ix_users_username_lower', func.lower(User.username).label('username_lower'),
+    postgresql_ops={'username_lower': 'text_pattern_ops'}
+)
+Index(
+    'ix_users_first_name_lower', func.lower(User.first_name).label('first_name_lower'),
+    postgresql_ops={'first_name_lower': 'text_pattern_ops'}
+)
+
+# Fuzzy search on PostgreSQL is backed by pg_trgm GIN indexes.
+Index(
+    'ix_users_username_trgm', User.username,
+    postgresql_using='gin', postgresql_ops={'username': 'gin_trgm_ops'}
+).ddl_if(dialect='postgresql')
+Index(
+    'ix_users_first_name_trgm', User.first_name,
+    postgresql_using='gin', postgresql_ops={'first_name': 'gin_trgm_ops'}
+).ddl_if(dialect='postgresql')
+event.listen(Base.metadata, 'before_create', DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect='postgresql'))
+
+# On SQLite the same role is played by an external-content FTS5 table with the trigram tokenizer,
+# kept in sync with `users` by triggers.
+USER_SEARCH_FTS_TABLE = 'users_search'
+
+_SQLITE_USER_SEARCH_DDL = [
+    f"CREATE VIRTUAL TABLE {USER_SEARCH_FTS_TABLE} USING fts5("
+    f"username, first_name, content='users', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER {USER_SEARCH_FTS_TABLE}_ai AFTER INSERT ON users BEGIN "
+    f"INSERT INTO {USER_SEARCH_FTS_TABLE}(rowid, username, first_name) VALUES (new.id, new.username, new.first_name); END",
+    f"CREATE TRIGGER {USER_SEARCH_FTS_TABLE}_ad AFTER DELETE ON users BEGIN "
+    f"INSERT INTO {USER_SEARCH_FTS_TABLE}({USER_SEARCH_FTS_TABLE}, rowid, username, first_name) "
+    f"VALUES ('delete', old.id, old.username, old.first_name); END",
+    f"CREATE TRIGGER {USER_SEARCH_FTS_TABLE}_au AFTER UPDATE OF username, first_name ON users BEGIN "
+    f"INSERT INTO {USER_SEARCH_FTS_TABLE}({USER_SEARCH_FTS_TABLE}, rowid, username, first_name) "
+    f"VALUES ('delete', old.id, old.username, old.first_name); "
+    f"INSERT INTO {USER_SEARCH_FTS_TABLE}(rowid, username, first_name) VALUES (new.id, new.username, new.first_name); END",
+]
+
+@event.listens_for(Base.metadata, 'after_create')
+def _create_sqlite_user_search(target, connection, **kw):
+    if connection.dialect.name != 'sqlite':
+        return
+    exists = connection.exec_driver_sql(
+        f"SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = '{USER_SEARCH_FTS_TABLE}'"
+    ).first()
+    if exists:
+        return
+    for statement in _SQLITE_USER_SEARCH_DDL:
+        connection.exec_driver_sql(statement)
+    # Index the users that existed before the search table was introduced.
+    connection.exec_driver_sql(f"INSERT INTO {USER_SEARCH_FTS_TABLE}({USER_SEARCH_FTS_TABLE}) VALUES ('rebuild')")
+
 class Order(Base):
     """
     مدل مربوط به سفارش‌های تبادل ارز.
@@ -74,13 +155,17 @@ class Order(Base):
     id = Column(String, primary_key=True) # شناسه تراکنش از SwapZone
     user_id = Column(BigInteger, ForeignKey('users.user_id'), nullable=False, index=True)
     from_currency = Column(String, nullable=False)
+    from_network = Column(String)
     to_currency = Column(String, nullable=False)
+    to_network = Column(String)
     from_amount = Column(String, nullable=False)
     to_amount_estimated = Column(String, nullable=False) # مقداری که پس از کسر مارکاپ محاسبه شده
     to_amount_actual = Column(String) # مقدار واقعی که پس از انجام تراکنش مشخص می‌شود
     deposit_address = Column(String, nullable=False)
     recipient_address = Column(String, nullable=False)
     status = Column(SQLAlchemyEnum(OrderStatus), default=OrderStatus.PENDING, nullable=False, index=True)
+    # کلید یکتای پیش‌فاکتور؛ ارسال دوباره‌ی همان درخواست سفارش جدیدی نمی‌سازد
+    idempotency_key = Column(String, unique=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -141,4 +226,73 @@ class TicketMessage(Base):
     ticket = relationship("Ticket", back_populates="messages")
     
     def __repr__(self):
-        return f"<TicketMessage(ticket_id={self.ticket_id}, sender_id={self.sender_id})>"
\ No newline at end of file
+        return f"<TicketMessage(ticket_id={self.ticket_id}, sender_id={self.sender_id})>"
+
+class BroadcastJob(Base):
+    """
+    مدل یک ارسال همگانی که پیشرفت آن در دیتابیس ذخیره می‌شود تا پس از ری‌استارت ادامه یابد.
+    """
+    __tablename__ = 'broadcast_jobs'
+
+    id = Column(Integer, primary_key=True)
+    admin_id = Column(BigInteger, nullable=False)
+    from_chat_id = Column(BigInteger, nullable=False)
+    message_id = Column(BigInteger, nullable=False)
+    lang = Column(String, default='fa')
+    # Recipient segment; NULL means no filter.
+    segment_language = Column(String)
+    segment_active_since = Column(DateTime(timezone=True))
+    status = Column(SQLAlchemyEnum(BroadcastStatus), default=BroadcastStatus.PENDING, nullable=False, index=True)
+    # Keyset cursor over users.user_id: every recipient up to and including this id has been processed.
+    cursor_user_id = Column(BigInteger, default=0, nullable=False)
+    total_count = Column(Integer, default=0, nullable=False)
+    success_count = Column(Integer, default=0, nullable=False)
+    failure_count = Column(Integer, default=0, nullable=False)
+    progress_message_id = Column(BigInteger) # پیام پیشرفت که برای ادمین ویرایش می‌شود
+    # Process sending the job ("host:worker-N:pid-nonce") and its last heartbeat; once the heartbeat is stale,
+    # another process may claim the job and resume it from the cursor.
+    owner = Column(String)
+    heartbeat_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True))
+
+    def __repr__(self):
+        return f"<BroadcastJob(id={self.id}, status='{self.status}', cursor={self.cursor_user_id})>"
+
+class PersistedUserData(Base):
+    """
+    user_data هر کاربر به صورت JSON فشرده، تا گفتگوهای نیمه‌کاره پس از ری‌استارت ادامه یابند.
+    """
+    __tablename__ = 'persisted_user_data'
+    user_id = Column(BigInteger, primary_key=True)
+    data = Column(Text, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<PersistedUserData(user_id={self.user_id})>"
+
+class PersistedConversation(Base):
+    """
+    وضعیت فعلی هر گفتگو (ConversationHandler)؛ گفتگوهای پایان‌یافته حذف می‌شوند.
+    """
+    __tablename__ = 'persisted_conversations'
+    name = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)  # JSON list, e.g. [chat_id, user_id]
+    state = Column(Text, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<PersistedConversation(name='{self.name}', key='{self.key}')>"
+
+class SchedulerLease(Base):
+    """
+    قفل اجاره‌ای رهبری زمان‌بند؛ فقط نگه‌دارنده‌ی معتبر آن کارهای یکتا (singleton) را اجرا می‌کند.
+    """
+    __tablename__ = 'scheduler_leases'
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)  # host:worker-N:pid-nonce of the holding process
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<SchedulerLease(name='{self.name}', holder='{self.holder}')>"
@@ -5,6 +5,7 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 
 from tabadex_bot.config import settings
+from ..utils.metrics import metrics
 
 # Create a synchronous engine (optional, can be useful for scripts)
 sync_engine = create_engine(settings.DATABASE_URL)
@@ -21,6 +22,14 @@ AsyncSessionLocal = sessionmaker(
     autoflush=False
 )
 
+def _pool_usage() -> dict:
+    pool = async_engine.pool
+    # Not every pool class (e.g. SQLite's) tracks all of these.
+    readings = {"size": getattr(pool, "size", None), "checked_out": getattr(pool, "checkedout", None), "overflow": getattr(pool, "overflow", None)}
+    return {name: read() for name, read in readings.items() if read is not None}
+
+metrics.collector("tabadex_db_pool_connections", "Database connection pool usage.", _pool_usage, labels=("state",))
+
 async def get_db_session() -> AsyncSession:
     """Dependency to get a new database session."""
     async with AsyncSessionLocal() as session:
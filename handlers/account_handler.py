@@ -7,7 +7,10 @@ from ..config import logger
 from ..database import crud
 from ..keyboards import get_account_menu_keyboard, get_language_selection_keyboard, get_orders_keyboard, get_back_to_orders_keyboard, get_addresses_keyboard, create_currency_keyboard, get_cancel_keyboard
 from ..locales import get_text
+from ..intents import IntentFilter
 from ..utils.swapzone_api import swapzone_api_client
+from ..utils.address_validation import address_validators
+from ..utils.callback_router import CallbackRoute
 
 ORDERS_PER_PAGE = 5
 GET_CURRENCY, GET_ADDRESS, GET_NAME = range(20, 23)
@@ -42,14 +45,14 @@ async def show_orders_page(update: Update, context: ContextTypes.DEFAULT_TYPE, p
 async def orders_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
-    page = int(query.data.split("_")[-1])
+    page = context.args[0]
     context.user_data["current_order_page"] = page
     await show_orders_page(update, context, page_number=page)
 
 async def show_order_details(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query; await query.answer()
     lang, session = context.user_data.get("lang", "fa"), context.db_session
-    order = await crud.get_order_by_id_for_user(session, query.data.split("_")[-1], update.effective_user.id)
+    order = await crud.get_order_by_id_for_user(session, context.args[0], update.effective_user.id)
     if not order: await query.answer(get_text("error_order_not_found", lang), show_alert=True); return
     page = context.user_data.get("current_order_page", 1)
     status_text = get_text(f"order_status_{order.status.name.lower()}", lang)
@@ -65,7 +68,7 @@ async def handle_saved_addresses(update: Update, context: ContextTypes.DEFAULT_T
 async def delete_address(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query; await query.answer()
     lang, session = context.user_data.get("lang", "fa"), context.db_session
-    success = await crud.delete_saved_address(session, int(query.data.split("_")[-1]), update.effective_user.id)
+    success = await crud.delete_saved_address(session, context.args[0], update.effective_user.id)
     if success:
         await query.answer(get_text("address_deleted_success", lang), show_alert=True)
         addresses = await crud.get_saved_addresses_by_user(session, update.effective_user.id)
@@ -95,7 +98,13 @@ async def get_currency_for_address(update: Update, context: ContextTypes.DEFAULT
 
 async def get_address_for_save(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     lang = context.user_data.get("lang", "fa")
-    context.user_data['new_address_string'] = update.message.text.strip()
+    address = update.message.text.strip()
+    # A saved address is kept per currency, so it only has to fit one of the currency's networks.
+    networks = swapzone_api_client.currencies_by_ticker.get(context.user_data.get('new_address_ticker'), {}).get('networks', [])
+    if not address_validators.is_acceptable(networks, address):
+        await update.message.reply_text(get_text("error_invalid_address", lang), reply_markup=get_cancel_keyboard(lang, "cancel_add_address"))
+        return GET_ADDRESS
+    context.user_data['new_address_string'] = address
     await update.message.reply_text(get_text("add_address_enter_name", lang), reply_markup=get_cancel_keyboard(lang, "cancel_add_address"))
     return GET_NAME
 
@@ -125,13 +134,17 @@ add_address_conv_handler = ConversationHandler(
     entry_points=[CallbackQueryHandler(add_address_start, pattern="^add_address_start$")],
     states={GET_CURRENCY: [CallbackQueryHandler(get_currency_for_address, pattern="^add_addr_curr_")], GET_ADDRESS: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_address_for_save)], GET_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_name_and_save_address)]},
     fallbacks=[CallbackQueryHandler(cancel_add_address, pattern="^cancel_add_address$")],
-    per_message=True
+    per_message=True,
+    name="add_address",
+    persistent=True
 )
 account_handlers = [
-    MessageHandler(filters.Regex(f"^({get_text('my_orders_button', 'fa')}|{get_text('my_orders_button', 'en')})$"), handle_orders_list),
-    MessageHandler(filters.Regex(f"^({get_text('saved_addresses_button', 'fa')}|{get_text('saved_addresses_button', 'en')})$"), handle_saved_addresses),
-    MessageHandler(filters.Regex(f"^({get_text('change_language_button', 'fa')}|{get_text('change_language_button', 'en')})$"), handle_change_language),
-    CallbackQueryHandler(orders_page_callback, pattern="^orders_page_"),
-    CallbackQueryHandler(show_order_details, pattern="^view_order_"),
-    CallbackQueryHandler(delete_address, pattern="^delete_address_"),
+    MessageHandler(IntentFilter("my_orders_button"), handle_orders_list),
+    MessageHandler(IntentFilter("saved_addresses_button"), handle_saved_addresses),
+    MessageHandler(IntentFilter("change_language_button"), handle_change_language),
+]
+account_callback_routes = [
+    CallbackRoute("orders_page", orders_page_callback, int),
+    CallbackRoute("view_order", show_order_details, str),
+    CallbackRoute("delete_address", delete_address, int),
 ]
\ No newline at end of file
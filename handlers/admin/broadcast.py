@@ -1,9 +1,8 @@
 # tabadex_bot/handlers/admin/broadcast.py
 
-import asyncio
-from telegram import Update, Message, ReplyKeyboardRemove
+from datetime import datetime, timedelta, timezone
+from telegram import Update, ReplyKeyboardRemove
 from telegram.ext import (
-    Application,
     CallbackQueryHandler,
     ConversationHandler,
     MessageHandler,
@@ -12,11 +11,13 @@ from telegram.ext import (
 )
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ...config import logger
 from ...locales import get_text
+from ...intents import IntentFilter
 from ...database import crud
 from ...keyboards import get_admin_broadcast_confirm_keyboard, get_cancel_keyboard
 from ...utils.decorators import admin_required
+from ...utils.broadcaster import broadcast_engine
+from ...utils.callback_router import CallbackRoute
 # from .panel_handler import admin_panel  # <<<--- این خط حذف می‌شود تا چرخه شکسته شود
 
 # Conversation states
@@ -33,45 +34,60 @@ async def broadcast_start(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     await update.message.reply_text("...", reply_markup=ReplyKeyboardRemove())
     return GET_MESSAGE
 
-# ... (تمام توابع دیگر این فایل مانند _do_send_broadcast, get_broadcast_message و ... بدون تغییر باقی می‌مانند)
-async def _do_send_broadcast(app: Application, admin_id: int, message_to_send: Message, target_user_ids: list[int], lang: str):
-    success_count, failure_count = 0, 0
-    await app.bot.send_message(admin_id, get_text("broadcast_started", lang).format(user_count=len(target_user_ids)))
-    for user_id in target_user_ids:
-        try:
-            await app.bot.copy_message(chat_id=user_id, from_chat_id=message_to_send.chat_id, message_id=message_to_send.message_id)
-            success_count += 1
-        except Exception as e:
-            logger.warning(f"Broadcast failed for user {user_id}: {e}")
-            failure_count += 1
-        await asyncio.sleep(0.05)
-    await app.bot.send_message(admin_id, get_text("broadcast_finished", lang).format(success_count=success_count, failure_count=failure_count))
+BROADCAST_SEGMENT_LANGUAGES = ("fa", "en")
+BROADCAST_SEGMENT_ACTIVE_DAYS = (7, 30)
+
+def _segment_filters(segment: dict) -> dict:
+    active_days = segment.get("active_days")
+    return {
+        "language": segment.get("language"),
+        "active_since": datetime.now(timezone.utc) - timedelta(days=active_days) if active_days else None,
+    }
+
+async def _broadcast_confirm_text(session: AsyncSession, lang: str, segment: dict) -> str:
+    user_count = await crud.count_broadcast_recipients(session, **_segment_filters(segment))
+    return get_text("admin_broadcast_confirm_prompt", lang).format(user_count=user_count)
 
 async def get_broadcast_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     lang = context.user_data.get("lang", "fa")
     session: AsyncSession = context.db_session
     context.user_data['broadcast_message'] = update.message
-    user_ids = await crud.get_all_active_user_ids(session)
-    context.user_data['broadcast_user_ids'] = user_ids
-    text = get_text("admin_broadcast_confirm_prompt", lang).format(user_count=len(user_ids))
+    segment = context.user_data['broadcast_segment'] = {"language": None, "active_days": None}
+    text = await _broadcast_confirm_text(session, lang, segment)
     await update.message.reply_text("👇 " + get_text("preview_title", lang) + " 👇")
     await context.bot.copy_message(chat_id=update.effective_chat.id, from_chat_id=update.message.chat_id, message_id=update.message.message_id)
-    await update.message.reply_text(text=text, reply_markup=get_admin_broadcast_confirm_keyboard(lang))
+    await update.message.reply_text(text=text, reply_markup=get_admin_broadcast_confirm_keyboard(lang, **segment))
+    return CONFIRM_BROADCAST
+
+async def change_broadcast_segment(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Toggles a recipient filter and refreshes the recipient count."""
+    query = update.callback_query
+    await query.answer()
+    lang = context.user_data.get("lang", "fa")
+    segment = context.user_data.setdefault('broadcast_segment', {"language": None, "active_days": None})
+    _, _, field, value = query.data.split("_", 3)
+    if field == "lang":
+        segment["language"] = value if value in BROADCAST_SEGMENT_LANGUAGES else None
+    elif field == "active":
+        segment["active_days"] = int(value) if int(value) in BROADCAST_SEGMENT_ACTIVE_DAYS else None
+    text = await _broadcast_confirm_text(context.db_session, lang, segment)
+    await query.edit_message_text(text=text, reply_markup=get_admin_broadcast_confirm_keyboard(lang, **segment))
     return CONFIRM_BROADCAST
 
 async def confirm_and_send_broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
     lang = context.user_data.get("lang", "fa")
-    message_to_send = context.user_data.get('broadcast_message')
-    user_ids = context.user_data.get('broadcast_user_ids')
-    if not message_to_send or not user_ids:
+    message_to_send = context.user_data.pop('broadcast_message', None)
+    segment = context.user_data.pop('broadcast_segment', None)
+    if not message_to_send or segment is None:
         await query.edit_message_text(get_text("error_broadcast_expired", lang))
         return ConversationHandler.END
     await query.edit_message_text(get_text("admin_broadcast_sending", lang))
-    context.application.create_task(_do_send_broadcast(app=context.application, admin_id=update.effective_user.id, message_to_send=message_to_send, target_user_ids=user_ids, lang=lang))
-    context.user_data.pop('broadcast_message', None)
-    context.user_data.pop('broadcast_user_ids', None)
+    await broadcast_engine.start(
+        context.application, admin_id=update.effective_user.id, message=message_to_send, lang=lang,
+        **_segment_filters(segment)
+    )
     return ConversationHandler.END
 
 @admin_required
@@ -84,19 +100,40 @@ async def cancel_broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     query = update.callback_query
     await query.answer()
     context.user_data.pop('broadcast_message', None)
-    context.user_data.pop('broadcast_user_ids', None)
+    context.user_data.pop('broadcast_segment', None)
     await query.edit_message_text(get_text("admin_broadcast_canceled", lang=context.user_data.get("lang", "fa")))
     
     # بازگشت به منوی ادمین
     await show_admin_panel(update.callback_query, context) # Use callback_query here
     return ConversationHandler.END
 
+@admin_required
+async def cancel_running_broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Cancels a broadcast that is already being sent."""
+    query = update.callback_query
+    lang = context.user_data.get("lang", "fa")
+    job_id = context.args[0]
+    if await broadcast_engine.cancel(job_id):
+        await query.answer(get_text("admin_broadcast_canceled", lang), show_alert=True)
+        await query.edit_message_reply_markup(reply_markup=None)
+    else:
+        await query.answer(get_text("error_generic", lang), show_alert=True)
+
 # Handlers
 broadcast_conv_handler = ConversationHandler(
-    entry_points=[MessageHandler(filters.Regex(f"^({get_text('admin_broadcast', 'fa')}|{get_text('admin_broadcast', 'en')})$"), broadcast_start)],
+    entry_points=[MessageHandler(IntentFilter("admin_broadcast"), broadcast_start)],
     states={
         GET_MESSAGE: [MessageHandler(filters.ALL & ~filters.COMMAND, get_broadcast_message)],
-        CONFIRM_BROADCAST: [CallbackQueryHandler(confirm_and_send_broadcast, pattern="^confirm_broadcast$")],
+        CONFIRM_BROADCAST: [
+            CallbackQueryHandler(confirm_and_send_broadcast, pattern="^confirm_broadcast$"),
+            CallbackQueryHandler(change_broadcast_segment, pattern="^broadcast_segment_"),
+        ],
     },
     fallbacks=[CallbackQueryHandler(cancel_broadcast, pattern="^admin_broadcast_cancel$")],
-)
\ No newline at end of file
+    name="admin_broadcast",
+    persistent=True,
+)
+
+broadcast_callback_routes = [
+    CallbackRoute("broadcast_cancel", cancel_running_broadcast, int),
+]
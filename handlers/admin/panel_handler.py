@@ -1,14 +1,19 @@
 # tabadex_bot/handlers/admin/panel_handler.py
 
 from telegram import Update
-from telegram.ext import ContextTypes, MessageHandler, filters, CallbackQueryHandler
+from telegram.ext import ContextTypes, MessageHandler, CommandHandler
 
 from ...config import settings
-from ...locales import get_text
+from ...locales import get_text, reload_locales, validate_catalog, get_locale_version
+from ...intents import IntentFilter, INTENT_KEYS
 from ...keyboards import get_admin_panel_keyboard
-from ...utils.decorators import admin_required
+from ...utils.decorators import admin_required, staff_required
+from ...utils.roles import role_registry
+from ...utils.callback_router import CallbackRoute
+from ...utils.sharding import cluster_bus
+from ...utils.metrics import metrics, UPDATE_SECONDS, HANDLER_SECONDS, SWAPZONE_REQUEST_SECONDS, CRUD_SECONDS
 
-@admin_required
+@staff_required
 async def show_admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Displays the main admin panel with a ReplyKeyboard."""
     lang = context.user_data.get("lang", "fa")
@@ -17,7 +22,7 @@ async def show_admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # We need to determine how to reply.
     
     text = get_text("admin_panel_title", lang)
-    keyboard = get_admin_panel_keyboard(lang)
+    keyboard = get_admin_panel_keyboard(lang, role_registry.role_of(update.effective_user.id))
     
     if update.callback_query:
         await update.callback_query.answer()
@@ -35,12 +40,61 @@ async def show_admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
             reply_markup=keyboard
         )
 
+@admin_required
+async def reload_locales_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/reload_locales: re-reads the locale files without a restart and reports catalog problems."""
+    try:
+        reload_locales()
+    except Exception as e:
+        await update.message.reply_text(f"Reload failed, keeping the current texts: {e}")
+        return
+    cluster_bus.publish("reload_locales")
+    problems = validate_catalog(extra_keys=INTENT_KEYS)
+    text = f"Locales reloaded (version {get_locale_version()})."
+    if problems:
+        text += f"\n{len(problems)} problem(s):\n" + "\n".join(problems[:20])
+    await update.message.reply_text(text)
+
+def _latency_line(label: str, histogram, *label_values) -> str:
+    count, total = histogram.series[label_values][2], histogram.series[label_values][1]
+    p95 = histogram.quantile(0.95, *label_values)
+    return f"{label}: {count} × avg {total / count * 1000:.0f} ms, p95 ≤ {p95 * 1000:.0f} ms"
+
+def _slowest(histogram, limit: int = 5) -> list[tuple]:
+    return sorted(histogram.series, key=lambda key: histogram.series[key][1] / histogram.series[key][2], reverse=True)[:limit]
+
+def _collector_value(name: str) -> str:
+    value = metrics.get(name).read()
+    if isinstance(value, dict):
+        return ", ".join(f"{key}={item}" for key, item in value.items()) or "-"
+    return str(value)
+
+@admin_required
+async def metrics_summary_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/metrics: a compact view of what the Prometheus endpoint exposes, for this process."""
+    lines = []
+    if () in UPDATE_SECONDS.series:
+        lines.append(_latency_line("Updates", UPDATE_SECONDS))
+    lines.append("\nSlowest handlers:")
+    lines += [_latency_line(f"{key[0]} [{key[1]}:{key[2]}] {key[3]}" if key[1] else f"{key[0]} {key[3]}", HANDLER_SECONDS, *key) for key in _slowest(HANDLER_SECONDS)]
+    lines.append("\nSwapZone:")
+    lines += [_latency_line(f"{key[0]} {key[1]}", SWAPZONE_REQUEST_SECONDS, *key) for key in sorted(SWAPZONE_REQUEST_SECONDS.series)]
+    lines.append("\nSlowest crud functions:")
+    lines += [_latency_line(key[0], CRUD_SECONDS, *key) for key in _slowest(CRUD_SECONDS)]
+    lines.append("")
+    for name in ("tabadex_db_pool_connections", "tabadex_broadcast_queue_depth", "tabadex_updates_in_flight",
+                 "tabadex_flood_dropped_total", "tabadex_blocklist_rejected_total", "tabadex_language_cache_total"):
+        if metrics.get(name):
+            lines.append(f"{name.removeprefix('tabadex_')}: {_collector_value(name)}")
+    await update.message.reply_text("\n".join(lines))
+
 # --- <<< بخش اصلاح شده و حیاتی >>> ---
 # این هندلر برای دکمه‌های شیشه‌ای "بازگشت به پنل ادمین" استفاده می‌شود
-admin_panel_callback_handler = CallbackQueryHandler(show_admin_panel, pattern="^admin_panel$")
+admin_panel_callback_route = CallbackRoute("admin_panel", show_admin_panel)
 
 # این هندلر برای دکمه ثابت "پنل ادمین" در منوی اصلی استفاده می‌شود
-admin_panel_entry_handler = MessageHandler(
-    filters.Regex(f"^({get_text('admin_panel_button', 'fa')}|{get_text('admin_panel_button', 'en')})$"),
-    show_admin_panel
-)
\ No newline at end of file
+admin_panel_entry_handler = MessageHandler(IntentFilter("admin_panel_button"), show_admin_panel)
+
+reload_locales_handler = CommandHandler("reload_locales", reload_locales_command)
+metrics_summary_handler = CommandHandler("metrics", metrics_summary_command)
+cluster_bus.on("reload_locales", lambda _: reload_locales())
\ No newline at end of file
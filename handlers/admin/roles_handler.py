@@ -0,0 +1,65 @@
+# tabadex_bot/handlers/admin/roles_handler.py
+
+from telegram import Update
+from telegram.ext import ContextTypes, CommandHandler
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...database import crud
+from ...database.models import StaffRole
+from ...locales import get_text
+from ...utils.decorators import admin_required
+from ...utils.roles import role_registry
+
+def _is_last_admin(user_id: int) -> bool:
+    return role_registry.admins == {user_id}
+
+@admin_required
+async def list_staff_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/staff: lists admins and support agents."""
+    lang = context.user_data.get("lang", "fa")
+    lines = [f"{user_id}: {role.value}" for user_id, role in sorted(role_registry.roles.items(), key=lambda item: (item[1].value, item[0]))]
+    await update.message.reply_text(
+        get_text("admin_staff_list", lang).format(staff="\n".join(lines)) + "\n\n" + get_text("admin_staff_usage", lang)
+    )
+
+@admin_required
+async def grant_role_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/grant <user_id> admin|support"""
+    lang = context.user_data.get("lang", "fa")
+    try:
+        user_id, role = int(context.args[0]), StaffRole(context.args[1].lower())
+    except (IndexError, ValueError):
+        await update.message.reply_text(get_text("admin_staff_usage", lang))
+        return
+    if role is not StaffRole.ADMIN and _is_last_admin(user_id):
+        await update.message.reply_text(get_text("admin_staff_last_admin", lang))
+        return
+    session: AsyncSession = context.db_session
+    await crud.set_staff_role(session, user_id, role, granted_by=update.effective_user.id)
+    role_registry.apply_change(user_id, role)
+    await update.message.reply_text(get_text("admin_staff_role_granted", lang).format(user_id=user_id, role=role.value))
+
+@admin_required
+async def revoke_role_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/revoke <user_id>"""
+    lang = context.user_data.get("lang", "fa")
+    try:
+        user_id = int(context.args[0])
+    except (IndexError, ValueError):
+        await update.message.reply_text(get_text("admin_staff_usage", lang))
+        return
+    if _is_last_admin(user_id):
+        await update.message.reply_text(get_text("admin_staff_last_admin", lang))
+        return
+    session: AsyncSession = context.db_session
+    if await crud.remove_staff_role(session, user_id):
+        role_registry.apply_change(user_id, None)
+        await update.message.reply_text(get_text("admin_staff_role_revoked", lang).format(user_id=user_id))
+    else:
+        await update.message.reply_text(get_text("admin_staff_no_role", lang).format(user_id=user_id))
+
+staff_roles_handlers = [
+    CommandHandler("staff", list_staff_command),
+    CommandHandler("grant", grant_role_command),
+    CommandHandler("revoke", revoke_role_command),
+]
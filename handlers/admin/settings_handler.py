@@ -7,9 +7,11 @@ from telegram.ext import (
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...locales import get_text
+from ...intents import IntentFilter
 from ...database import crud
 from ...keyboards import get_admin_settings_keyboard, get_cancel_keyboard, get_admin_panel_keyboard
 from ...utils.decorators import admin_required
+from ...utils.app_settings import app_settings
 
 GET_MARKUP = range(60, 61)
 
@@ -17,9 +19,7 @@ GET_MARKUP = range(60, 61)
 async def show_settings_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Displays the main settings menu."""
     lang = context.user_data.get("lang", "fa")
-    session: AsyncSession = context.db_session
-    
-    current_markup = await crud.get_setting(session, "markup_percentage", "0.5")
+    current_markup = app_settings.get("markup_percentage", "0.5")
     
     text = get_text("admin_settings_title", lang)
     keyboard = get_admin_settings_keyboard(lang, current_markup)
@@ -49,6 +49,7 @@ async def get_new_markup(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             raise ValueError("Markup must be between 0 and 100")
             
         await crud.set_setting(session, "markup_percentage", str(new_markup))
+        app_settings.apply_change("markup_percentage", str(new_markup))
         
         await update.message.reply_text(
             get_text("markup_updated_success", lang).format(markup=new_markup)
@@ -73,9 +74,11 @@ async def cancel_set_markup(update: Update, context: ContextTypes.DEFAULT_TYPE)
 set_markup_conv = ConversationHandler(
     entry_points=[CallbackQueryHandler(set_markup_start, pattern="^admin_set_markup_start$")],
     states={GET_MARKUP: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_new_markup)]},
-    fallbacks=[CallbackQueryHandler(cancel_set_markup, pattern="^cancel_set_markup$")]
+    fallbacks=[CallbackQueryHandler(cancel_set_markup, pattern="^cancel_set_markup$")],
+    name="admin_set_markup",
+    persistent=True
 )
 
 admin_settings_handlers = [
-    MessageHandler(filters.Regex(f"^({get_text('admin_settings', 'fa')}|{get_text('admin_settings', 'en')})$"), show_settings_menu)
+    MessageHandler(IntentFilter("admin_settings"), show_settings_menu)
 ]
\ No newline at end of file
@@ -11,11 +11,16 @@ from ...config import logger, settings
 from ...database import crud, models
 from ...keyboards import get_admin_tickets_keyboard, get_admin_ticket_view_keyboard, get_cancel_keyboard, get_admin_panel_keyboard
 from ...locales import get_text
-from ...utils.decorators import admin_required
+from ...intents import IntentFilter
+from ...utils.decorators import staff_required
+from ...utils.logging_setup import SAMPLED
+from ...utils.roles import role_registry
+from ...utils.delivery_feedback import delivery_feedback
+from ...utils.callback_router import CallbackRoute
 
 ADMIN_GET_REPLY = range(30, 31)
 
-@admin_required
+@staff_required
 async def show_admin_tickets_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Displays a list of open tickets for admins."""
     lang = context.user_data.get("lang", "fa")
@@ -30,14 +35,14 @@ async def show_admin_tickets_list(update: Update, context: ContextTypes.DEFAULT_
         await update.message.reply_text(text, reply_markup=get_admin_tickets_keyboard(tickets, lang))
         await update.message.reply_text("...", reply_markup=ReplyKeyboardRemove())
 
-@admin_required
+@staff_required
 async def show_admin_ticket_details(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Shows the full conversation of a ticket to an admin."""
     query = update.callback_query
     await query.answer()
     lang = context.user_data.get("lang", "fa")
     session: AsyncSession = context.db_session
-    ticket_id = int(query.data.split("_")[-1])
+    ticket_id = context.args[0]
 
     ticket = await crud.get_ticket_by_id_for_admin(session, ticket_id)
     if not ticket:
@@ -53,7 +58,7 @@ async def show_admin_ticket_details(update: Update, context: ContextTypes.DEFAUL
     keyboard = get_admin_ticket_view_keyboard(lang, ticket.id, ticket.status.name)
     await query.edit_message_text(message_text, reply_markup=keyboard, parse_mode=ParseMode.HTML)
 
-@admin_required
+@staff_required
 async def admin_reply_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
@@ -78,13 +83,14 @@ async def get_admin_reply_and_save(update: Update, context: ContextTypes.DEFAULT
         return ConversationHandler.END
 
     await crud.add_reply_to_ticket(session, ticket_id, admin_id, reply_text, is_admin=True)
-    await update.message.reply_text(get_text("admin_reply_sent_success", lang), reply_markup=get_admin_panel_keyboard(lang))
+    await update.message.reply_text(get_text("admin_reply_sent_success", lang), reply_markup=get_admin_panel_keyboard(lang, role_registry.role_of(admin_id)))
 
     try:
         user_lang = ticket.user.language_code
         notification_text = get_text("user_notification_new_reply", user_lang).format(ticket_id=ticket_id)
         await context.bot.send_message(chat_id=ticket.user_id, text=notification_text)
     except Exception as e:
+        delivery_feedback.report(ticket.user_id, e)
         logger.error(f"Failed to send notification to user {ticket.user_id}: {e}")
 
     return ConversationHandler.END
@@ -96,12 +102,12 @@ async def admin_cancel_reply(update: Update, context: ContextTypes.DEFAULT_TYPE)
     await query.edit_message_text("Cancelled.")
     return ConversationHandler.END
 
-@admin_required
+@staff_required
 async def admin_close_ticket(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
     session: AsyncSession = context.db_session
-    ticket_id = int(query.data.split("_")[-1])
+    ticket_id = context.args[0]
     success = await crud.close_ticket_by_admin(session, ticket_id)
     if success:
         await query.answer("Ticket closed!", show_alert=True)
@@ -109,12 +115,12 @@ async def admin_close_ticket(update: Update, context: ContextTypes.DEFAULT_TYPE)
     else:
         await query.answer("Error closing ticket.", show_alert=True)
 
-@admin_required
+@staff_required
 async def back_to_tickets_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handler for BACK button to return to tickets list."""
     query = update.callback_query
     await query.answer()
-    logger.info(f"BACK button clicked with callback_data: {query.data}")
+    logger.info("BACK button clicked with callback_data: %s", query.data, extra=SAMPLED)
     await show_admin_tickets_list(update, context)
 
 # --- Handlers ---
@@ -122,11 +128,15 @@ admin_reply_conv = ConversationHandler(
     entry_points=[CallbackQueryHandler(admin_reply_start, pattern="^admin_reply_start_")],
     states={ADMIN_GET_REPLY: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_admin_reply_and_save)]},
     fallbacks=[CallbackQueryHandler(admin_cancel_reply, pattern="^admin_cancel_reply_")],
+    name="admin_ticket_reply",
+    persistent=True,
 )
 
 admin_ticket_handlers = [
-    CallbackQueryHandler(show_admin_ticket_details, pattern="^admin_view_ticket_"),
-    CallbackQueryHandler(admin_close_ticket, pattern="^admin_close_ticket_"),
-    CallbackQueryHandler(back_to_tickets_handler, pattern="^back_to_tickets$"),
-    MessageHandler(filters.Regex(f"^({get_text('admin_ticket_management', 'fa')}|{get_text('admin_ticket_management', 'en')})$"), show_admin_tickets_list)
+    MessageHandler(IntentFilter("admin_ticket_management"), show_admin_tickets_list)
+]
+admin_ticket_callback_routes = [
+    CallbackRoute("admin_view_ticket", show_admin_ticket_details, int),
+    CallbackRoute("admin_close_ticket", admin_close_ticket, int),
+    CallbackRoute("back_to_tickets", back_to_tickets_handler),
 ]
\ No newline at end of file
@@ -0,0 +1,75 @@
+# tabadex_bot/handlers/admin/traces_handler.py
+
+import io
+import json
+
+from telegram import Update
+from telegram.ext import ContextTypes, CommandHandler
+
+from ...utils.decorators import admin_required
+from ...utils.sharding import cluster_bus
+from ...utils.tracing import tracer, Trace
+
+MAX_SPANS_SHOWN = 40
+
+def _summary_line(index: int, trace: Trace) -> str:
+    totals = ", ".join(f"{kind} {count}× {total * 1000:.0f} ms" for kind, (count, total) in sorted(trace.totals().items()))
+    return f"#{index} {trace.duration * 1000:.0f} ms, user {trace.user_id}, {trace.label}\n    {totals or 'no spans'}"
+
+@admin_required
+async def list_traces_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/traces: the slow updates kept in this process's ring buffer, newest first."""
+    traces = list(tracer.slow_traces)[::-1]
+    header = (
+        f"Sampling {tracer.sample_rate:.0%} of updates, keeping those over {tracer.slow_seconds}s "
+        f"({tracer.sampled} sampled, {len(traces)} kept)."
+    )
+    lines = [header] + [_summary_line(index, trace) for index, trace in enumerate(traces, 1)]
+    lines.append("\n/trace <n> shows one trace, /traces_dump sends them all as JSON, /trace_sample <rate> sets sampling.")
+    await update.message.reply_text("\n".join(lines))
+
+@admin_required
+async def show_trace_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/trace <n>: every span of one slow trace (numbered as in /traces)."""
+    traces = list(tracer.slow_traces)[::-1]
+    try:
+        index = int(context.args[0])
+        trace = traces[index - 1]
+        if index < 1:
+            raise IndexError
+    except (IndexError, ValueError):
+        await update.message.reply_text(f"Usage: /trace <1-{len(traces)}>" if traces else "No slow traces yet.")
+        return
+    lines = [_summary_line(index, trace)]
+    for kind, name, offset, duration, detail in trace.spans[:MAX_SPANS_SHOWN]:
+        lines.append(f"+{offset * 1000:.0f} ms {kind} {name} {duration * 1000:.1f} ms" + (f" | {detail[:80]}" if detail else ""))
+    if len(trace.spans) > MAX_SPANS_SHOWN:
+        lines.append(f"... {len(trace.spans) - MAX_SPANS_SHOWN} more, see /traces_dump")
+    await update.message.reply_text("\n".join(lines))
+
+@admin_required
+async def dump_traces_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/traces_dump: all kept traces as a JSON document."""
+    payload = json.dumps([trace.to_dict() for trace in tracer.slow_traces], ensure_ascii=False, indent=1)
+    await update.message.reply_document(io.BytesIO(payload.encode("utf-8")), filename="slow_traces.json")
+
+@admin_required
+async def set_trace_sample_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/trace_sample <rate>: share of updates to trace, 0 to 1 (0 turns tracing off)."""
+    try:
+        rate = float(context.args[0])
+    except (IndexError, ValueError):
+        await update.message.reply_text(f"Usage: /trace_sample <0-1>, currently {tracer.sample_rate}")
+        return
+    tracer.set_sample_rate(rate)
+    cluster_bus.publish("trace_sample_rate", tracer.sample_rate)
+    await update.message.reply_text(f"Tracing {tracer.sample_rate:.0%} of updates.")
+
+cluster_bus.on("trace_sample_rate", tracer.set_sample_rate)
+
+traces_handlers = [
+    CommandHandler("traces", list_traces_command),
+    CommandHandler("trace", show_trace_command),
+    CommandHandler("traces_dump", dump_traces_command),
+    CommandHandler("trace_sample", set_trace_sample_command),
+]
@@ -1,5 +1,6 @@
 # tabadex_bot/handlers/admin/user_management.py
 
+import html
 import math
 from telegram import Update, ReplyKeyboardRemove
 from telegram.ext import (
@@ -9,14 +10,18 @@ from telegram.constants import ParseMode
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...locales import get_text
+from ...intents import IntentFilter
 from ...database import crud
 from ...keyboards import (
     get_admin_user_management_keyboard,
     get_admin_users_list_keyboard,
     get_admin_user_details_keyboard,
+    get_admin_user_search_results_keyboard,
     get_cancel_keyboard
 )
 from ...utils.decorators import admin_required
+from ...utils.callback_router import CallbackRoute
+from ...utils.blocklist import blocklist
 
 USERS_PER_PAGE = 10
 SEARCH_GET_ID = range(40, 41)
@@ -37,7 +42,7 @@ async def list_users(update: Update, context: ContextTypes.DEFAULT_TYPE):
     page = 1
     if update.callback_query:
         await update.callback_query.answer()
-        page = int(update.callback_query.data.split("_")[-1])
+        page = context.args[0]
     
     total_users = await crud.get_total_user_count(session)
     total_pages = math.ceil(total_users / USERS_PER_PAGE)
@@ -58,7 +63,7 @@ async def view_user_details(update: Update, context: ContextTypes.DEFAULT_TYPE,
     user_id = user_id_from_search
     if not user_id and update.callback_query:
         await update.callback_query.answer()
-        user_id = int(update.callback_query.data.split("_")[-1])
+        user_id = context.args[0]
 
     user = await crud.get_user_by_user_id(session, user_id)
     if not user:
@@ -82,39 +87,75 @@ async def view_user_details(update: Update, context: ContextTypes.DEFAULT_TYPE,
     else:
         await update.effective_message.reply_text(text, reply_markup=keyboard, parse_mode=ParseMode.HTML)
 
-@admin_required
-async def toggle_block_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    query = update.callback_query
-    await query.answer()
+async def _set_user_blocked(update: Update, context: ContextTypes.DEFAULT_TYPE, is_blocked: bool):
+    await update.callback_query.answer()
     session: AsyncSession = context.db_session
-    parts = query.data.split("_")
-    action = parts[1]
-    user_id = int(parts[2])
-    await crud.update_user_block_status(session, user_id, is_blocked=(action == "block"))
+    if await crud.update_user_block_status(session, context.args[0], is_blocked=is_blocked):
+        blocklist.apply_change(context.args[0], is_blocked)
     await view_user_details(update, context)
 
+@admin_required
+async def block_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await _set_user_blocked(update, context, is_blocked=True)
+
+@admin_required
+async def unblock_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await _set_user_blocked(update, context, is_blocked=False)
+
 @admin_required
 async def search_user_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    query = update.callback_query
-    await query.answer()
     lang = context.user_data.get("lang", "fa")
-    await query.edit_message_text(
-        text=get_text("admin_enter_user_id_prompt", lang),
-        reply_markup=get_cancel_keyboard(lang, "admin_search_user_cancel")
-    )
+    text = get_text("admin_enter_user_id_prompt", lang)
+    keyboard = get_cancel_keyboard(lang, "admin_search_user_cancel")
+    if update.callback_query:
+        await update.callback_query.answer()
+        await update.callback_query.edit_message_text(text=text, reply_markup=keyboard)
+    else:
+        await update.message.reply_text(text=text, reply_markup=keyboard)
     return SEARCH_GET_ID
 
 async def search_get_id(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     lang = context.user_data.get("lang", "fa")
-    try:
-        user_id = int(update.message.text)
-        await view_user_details(update, context, user_id_from_search=user_id)
-    except (ValueError, TypeError):
+    search_text = update.message.text.strip()
+    if search_text.isdigit():
+        await view_user_details(update, context, user_id_from_search=int(search_text))
+        return ConversationHandler.END
+
+    if not search_text.lstrip('@'):
         await update.message.reply_text(get_text("error_invalid_user_id", lang))
         return SEARCH_GET_ID
-    
+
+    context.user_data['admin_user_search_query'] = search_text
+    await show_user_search_results(update, context, page=1)
     return ConversationHandler.END
 
+@admin_required
+async def show_user_search_results(update: Update, context: ContextTypes.DEFAULT_TYPE, page: int = None):
+    """Shows one page of username / first name search results."""
+    lang = context.user_data.get("lang", "fa")
+    session: AsyncSession = context.db_session
+    if page is None and update.callback_query:
+        await update.callback_query.answer()
+        page = context.args[0]
+
+    # Clamped here as crud does, so the title and the keyboard show the page whose rows are listed.
+    page = max(1, min(page or 1, crud.USER_SEARCH_MAX_PAGE))
+    search_query = context.user_data.get('admin_user_search_query')
+    users, has_more = await crud.search_users(session, search_query or "", page=page, limit=USERS_PER_PAGE)
+    has_more = has_more and page < crud.USER_SEARCH_MAX_PAGE
+    if not users:
+        text = get_text("admin_user_not_found", lang)
+        if update.callback_query: await update.callback_query.edit_message_text(text)
+        else: await update.effective_message.reply_text(text)
+        return
+
+    text = get_text("admin_user_search_results_title", lang).format(query=html.escape(search_query), page=page)
+    keyboard = get_admin_user_search_results_keyboard(users, lang, page, has_more)
+    if update.callback_query:
+        await update.callback_query.edit_message_text(text, reply_markup=keyboard, parse_mode=ParseMode.HTML)
+    else:
+        await update.effective_message.reply_text(text, reply_markup=keyboard, parse_mode=ParseMode.HTML)
+
 async def search_user_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
@@ -122,13 +163,20 @@ async def search_user_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE)
     return ConversationHandler.END
 
 search_user_conv = ConversationHandler(
-    entry_points=[CallbackQueryHandler(search_user_start, pattern="^admin_search_user_start$")],
+    entry_points=[
+        CallbackQueryHandler(search_user_start, pattern="^admin_search_user_start$"),
+        MessageHandler(IntentFilter("admin_search_user"), search_user_start),
+    ],
     states={SEARCH_GET_ID: [MessageHandler(filters.TEXT & ~filters.COMMAND, search_get_id)]},
-    fallbacks=[CallbackQueryHandler(search_user_cancel, pattern="^admin_search_user_cancel$")]
+    fallbacks=[CallbackQueryHandler(search_user_cancel, pattern="^admin_search_user_cancel$")],
+    name="admin_search_user",
+    persistent=True
 )
 
-admin_user_handlers = [
-    CallbackQueryHandler(list_users, pattern="^admin_users_list_"),
-    CallbackQueryHandler(view_user_details, pattern="^admin_view_user_"),
-    CallbackQueryHandler(toggle_block_user, pattern="^admin_(un)?block_"),
+admin_user_callback_routes = [
+    CallbackRoute("admin_users_list", list_users, int),
+    CallbackRoute("admin_view_user", view_user_details, int),
+    CallbackRoute("admin_user_search_page", show_user_search_results, int),
+    CallbackRoute("admin_block", block_user, int),
+    CallbackRoute("admin_unblock", unblock_user, int),
 ]
\ No newline at end of file
@@ -1,8 +1,8 @@
 # tabadex_bot/handlers/base_handler.py
 from telegram.ext import ContextTypes, Application
 from sqlalchemy.ext.asyncio import AsyncSession
-from ..database import crud
-from ..locales import get_text
+from ..locales import format_text
+from ..utils.language import language_resolver
 
 class BaseHandler:
     def __init__(self, application: Application):
@@ -24,10 +24,8 @@ class BaseHandler:
         self.db_session = context.db_session
         self.user_id = context._user_id
         if self.user_id:
-            user = await crud.get_user_by_user_id(self.db_session, self.user_id)
-            if user:
-                self.lang = user.language_code
-                context.user_data["lang"] = self.lang
+            self.lang = await language_resolver.resolve(self.db_session, self.user_id)
+            context.user_data["lang"] = self.lang
     
     def _(self, key: str, **kwargs):
-        return get_text(key, self.lang).format(**kwargs)
\ No newline at end of file
+        return format_text(key, self.lang, **kwargs)
\ No newline at end of file
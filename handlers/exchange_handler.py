@@ -10,13 +10,18 @@ from telegram.ext import (
     ContextTypes,
 )
 from telegram.constants import ParseMode
+import uuid
 from decimal import Decimal, getcontext
 from ..config import logger
 from ..locales import get_text
+from ..intents import IntentFilter
 from ..utils.swapzone_api import swapzone_api_client
-from ..database import crud
+from ..utils.address_validation import address_validators
+from ..utils.app_settings import app_settings
+from ..utils.orders import order_pipeline, QUOTE_KEYS
+from ..utils.prefetch import prefetcher
 from ..database.models import OrderStatus
-from ..keyboards import create_currency_keyboard, create_network_keyboard, get_exchange_preview_keyboard
+from ..keyboards import create_currency_keyboard, create_network_keyboard, get_exchange_preview_keyboard, get_top_currencies_keyboard, get_currency_catalog_pages
 from .start_handler import show_main_menu
 
 getcontext().prec = 18
@@ -27,7 +32,43 @@ getcontext().prec = 18
     ENTER_ADDRESS, ENTER_SEARCH_QUERY, AWAIT_SEARCH
 ) = range(9)
 
-TOP_9_CURRENCIES = ['btc', 'eth', 'usdt', 'bnb', 'sol', 'xrp', 'usdc', 'ada', 'doge']
+TOP_9_CURRENCIES = ('btc', 'eth', 'usdt', 'bnb', 'sol', 'xrp', 'usdc', 'ada', 'doge')
+
+# --- Speculative lookups ---
+# Limits are fetched while the user types the amount, and the rate while they read the network keyboard.
+def _fetch_limits(key: tuple):
+    from_currency, from_network = key
+    return swapzone_api_client._request(
+        'GET',
+        '/min-max-amount',
+        params={
+            'from': from_currency,
+            'fromNetwork': from_network,
+            'to': 'btc',
+            'toNetwork': 'bitcoin'
+        }
+    )
+
+def _limits_key(user_data: dict) -> tuple:
+    return (user_data["from_currency"], user_data["from_network"])
+
+def _rate_key(user_data: dict, to_network: str | None = None) -> tuple:
+    return (
+        user_data["from_currency"], user_data["from_network"], user_data["to_currency"],
+        to_network or user_data["to_network"], user_data["amount"]
+    )
+
+def _fetch_rate(key: tuple):
+    from_currency, from_network, to_currency, to_network, amount = key
+    return swapzone_api_client.get_rate(
+        from_currency=from_currency, from_network=from_network,
+        to_currency=to_currency, to_network=to_network, amount=amount
+    )
+
+def _likely_network(currency_info: dict, networks: list) -> str:
+    """The network a user most likely picks: the currency's own default network if listed, else the first one."""
+    default = currency_info.get('network')
+    return default if default in networks else networks[0]
 
 async def start_exchange_conv(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     lang = context.user_data.get("lang", "fa")
@@ -35,10 +76,8 @@ async def start_exchange_conv(update: Update, context: ContextTypes.DEFAULT_TYPE
         get_text("exchange_started", lang), reply_markup=ReplyKeyboardRemove()
     )
     try:
-        all_currencies = await swapzone_api_client.get_currencies()
-        context.user_data['all_currencies'] = {c['ticker']: c for c in all_currencies}
-        top_currencies = [context.user_data['all_currencies'][ticker] for ticker in TOP_9_CURRENCIES if ticker in context.user_data['all_currencies']]
-        keyboard = create_currency_keyboard(top_currencies, lang, "from")
+        await swapzone_api_client.get_currencies()
+        keyboard = get_top_currencies_keyboard(lang, "from", TOP_9_CURRENCIES)
         await update.message.reply_text(
             get_text("exchange_select_from_currency", lang), reply_markup=keyboard
         )
@@ -50,12 +89,32 @@ async def start_exchange_conv(update: Update, context: ContextTypes.DEFAULT_TYPE
         await show_main_menu(update, context)
         return ConversationHandler.END
 
+async def _currency_info(ticker: str) -> dict | None:
+    # The catalog is empty when the startup warmup failed, or when a persisted conversation resumes first.
+    info = swapzone_api_client.currencies_by_ticker.get(ticker)
+    if info is None:
+        try:
+            await swapzone_api_client.get_currencies()
+        except Exception as e:
+            logger.error(f"Failed to load the currency catalog: {e}")
+        info = swapzone_api_client.currencies_by_ticker.get(ticker)
+    return info
+
+async def _end_without_catalog(update: Update, context: ContextTypes.DEFAULT_TYPE, lang: str) -> int:
+    await update.callback_query.edit_message_text(get_text("error_api_connection", lang))
+    for key in ["from_currency", "from_network", "to_currency", "to_network", "amount", "final_estimated_amount", "quote_id"]:
+        context.user_data.pop(key, None)
+    await show_main_menu(update, context)
+    return ConversationHandler.END
+
 async def get_from_currency(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query; await query.answer()
     lang = context.user_data.get("lang", "fa")
     context.user_data["from_currency"] = query.data.split("_")[1]
 
-    from_currency_info = context.user_data['all_currencies'][context.user_data["from_currency"]]
+    from_currency_info = await _currency_info(context.user_data["from_currency"])
+    if from_currency_info is None:
+        return await _end_without_catalog(update, context, lang)
     networks = from_currency_info.get('networks', [])
 
     if len(networks) == 1:
@@ -70,6 +129,8 @@ async def get_from_network(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     query = update.callback_query; await query.answer()
     lang = context.user_data.get("lang", "fa")
     context.user_data["from_network"] = query.data.split("_")[-1]
+    key = _limits_key(context.user_data)
+    prefetcher.start(update.effective_user.id, "limits", key, lambda: _fetch_limits(key))
 
     await query.edit_message_text(
         get_text("exchange_enter_amount_simple", lang).format(
@@ -84,16 +145,8 @@ async def get_amount(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     context.user_data["amount"] = amount_str
 
     try:
-        minmax_data = await swapzone_api_client._request(
-            'GET',
-            '/min-max-amount',
-            params={
-                'from': context.user_data["from_currency"],
-                'fromNetwork': context.user_data["from_network"],
-                'to': 'btc',
-                'toNetwork': 'bitcoin'
-            }
-        )
+        key = _limits_key(context.user_data)
+        minmax_data = await prefetcher.get(update.effective_user.id, "limits", key, lambda: _fetch_limits(key))
         min_amount = Decimal(str(minmax_data.get("minAmount", "0")))
         max_amount = Decimal(str(minmax_data.get("maxAmount", "100000000")))
 
@@ -115,9 +168,8 @@ async def get_amount(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 
 async def ask_to_currency(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     lang = context.user_data.get("lang", "fa")
-    all_currencies = list(context.user_data.get("all_currencies", {}).values())
-    top_currencies = [c for c in all_currencies if c['ticker'] in TOP_9_CURRENCIES]
-    keyboard = create_currency_keyboard(top_currencies, lang, "to")
+    keyboard = get_top_currencies_keyboard(lang, "to", TOP_9_CURRENCIES)
+    context.user_data['current_step'] = "to"
     await update.message.reply_text(get_text("exchange_select_to_currency", lang), reply_markup=keyboard)
     return SELECT_TO_CURRENCY
 
@@ -126,13 +178,18 @@ async def get_to_currency(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     lang = context.user_data.get("lang", "fa")
     context.user_data["to_currency"] = query.data.split("_")[1]
 
-    to_currency_info = context.user_data['all_currencies'][context.user_data["to_currency"]]
+    to_currency_info = await _currency_info(context.user_data["to_currency"])
+    if to_currency_info is None:
+        return await _end_without_catalog(update, context, lang)
     networks = to_currency_info.get('networks', [])
 
     if len(networks) == 1:
         context.user_data["to_network"] = networks[0]
         return await show_preview(update, context)
 
+    key = _rate_key(context.user_data, _likely_network(to_currency_info, networks))
+    prefetcher.start(update.effective_user.id, "rate", key, lambda: _fetch_rate(key))
+
     keyboard = create_network_keyboard(networks, "to_net", lang)
     await query.edit_message_text(get_text("select_network_prompt", lang).format(currency=to_currency_info['ticker'].upper()), reply_markup=keyboard)
     return SELECT_TO_NETWORK
@@ -149,19 +206,17 @@ async def show_preview(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     message = update.message if update.message else update.callback_query.message
 
     try:
-        rate_data = await swapzone_api_client.get_rate(
-            from_currency=context.user_data["from_currency"], from_network=context.user_data["from_network"],
-            to_currency=context.user_data["to_currency"], to_network=context.user_data["to_network"],
-            amount=context.user_data["amount"]
-        )
+        key = _rate_key(context.user_data)
+        rate_data = await prefetcher.get(update.effective_user.id, "rate", key, lambda: _fetch_rate(key))
         estimated_amount_str = rate_data.get("amountEstimated")
         if not estimated_amount_str:
             await message.reply_text(get_text("error_no_rate_found", lang))
             return await cancel_exchange(update, context)
 
-        markup_str = await crud.get_setting(context.db_session, "markup_percentage", "0.5")
+        markup_str = app_settings.get("markup_percentage", "0.5")
         final_amount = Decimal(estimated_amount_str) * (Decimal(100) - Decimal(markup_str)) / Decimal(100)
         context.user_data["final_estimated_amount"] = str(final_amount)
+        context.user_data["quote_id"] = uuid.uuid4().hex
 
         preview_text = get_text("exchange_preview_details", lang).format(
             amount=context.user_data["amount"], from_currency=context.user_data["from_currency"].upper(),
@@ -187,26 +242,20 @@ async def get_preview_confirmation(update: Update, context: ContextTypes.DEFAULT
 
 async def get_address_and_create_transaction(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     lang = context.user_data.get("lang", "fa")
-    session = context.db_session
     recipient_address = update.message.text.strip()
+    if address_validators.validate(context.user_data["to_network"], recipient_address) is False:
+        await update.message.reply_text(get_text("error_invalid_address", lang))
+        return ENTER_ADDRESS
     await update.message.reply_text(get_text("exchange_creating_transaction", lang))
     try:
-        tx_data = {
-            "from": context.user_data["from_currency"], "fromNetwork": context.user_data["from_network"],
-            "to": context.user_data["to_currency"], "toNetwork": context.user_data["to_network"],
-            "amount": context.user_data["amount"], "recipient": recipient_address,
-            "refundAddress": recipient_address
-        }
-        created_tx = await swapzone_api_client.create_transaction(**tx_data)
-        new_order = await crud.create_order(
-            session=session, tx_id=created_tx['id'], user_id=update.effective_user.id,
-            from_currency=tx_data['from'], from_network=tx_data['fromNetwork'],
-            to_currency=tx_data['to'], to_network=tx_data['toNetwork'],
-            from_amount=tx_data['amount'], to_amount_estimated=context.user_data.get("final_estimated_amount", "0"),
-            deposit_address=created_tx['depositAddress'], recipient_address=recipient_address
+        # Conversations restored from before quotes had an id get a fresh one.
+        context.user_data.setdefault("quote_id", uuid.uuid4().hex)
+        quote = {key: context.user_data[key] for key in QUOTE_KEYS}
+        new_order = await order_pipeline.create(
+            update.effective_user.id, quote, recipient_address, context.user_data.get("final_estimated_amount", "0")
         )
         deposit_text = get_text("exchange_deposit_info", lang).format(
-            amount=tx_data["amount"], from_currency=tx_data["from"].upper(),
+            amount=new_order.from_amount, from_currency=new_order.from_currency.upper(),
             deposit_address=f"<code>{new_order.deposit_address}</code>", tx_id=new_order.id
         )
         await update.message.reply_text(deposit_text, parse_mode=ParseMode.HTML)
@@ -214,19 +263,20 @@ async def get_address_and_create_transaction(update: Update, context: ContextTyp
         logger.error(f"Failed to create transaction in final step: {e}")
         await update.message.reply_text(get_text("error_creating_transaction", lang))
     finally:
-        for key in ["from_currency", "from_network", "to_currency", "to_network", "amount", "all_currencies", "final_estimated_amount"]:
+        for key in ["from_currency", "from_network", "to_currency", "to_network", "amount", "final_estimated_amount", "quote_id"]:
             context.user_data.pop(key, None)
         await show_main_menu(update, context)
     return ConversationHandler.END
 
 async def cancel_exchange(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     lang = context.user_data.get("lang", "fa")
+    prefetcher.cancel(update.effective_user.id)
     if update.callback_query:
         await update.callback_query.answer()
         await update.callback_query.edit_message_text(get_text("exchange_canceled", lang))
     else:
         await update.message.reply_text(get_text("exchange_canceled", lang))
-    for key in ["from_currency", "from_network", "to_currency", "to_network", "amount", "all_currencies", "final_estimated_amount"]:
+    for key in ["from_currency", "from_network", "to_currency", "to_network", "amount", "final_estimated_amount", "quote_id"]:
         context.user_data.pop(key, None)
     await show_main_menu(update, context)
     return ConversationHandler.END
@@ -243,7 +293,7 @@ async def exchange_search_handler(update: Update, context: ContextTypes.DEFAULT_
 async def process_search_query(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     lang = context.user_data.get("lang", "fa")
     search_query = update.message.text.strip().lower()
-    all_currencies = list(context.user_data.get("all_currencies", {}).values())
+    all_currencies = swapzone_api_client.currencies_by_ticker.values()
 
     matched_currencies = [c for c in all_currencies if search_query in c['ticker'].lower() or search_query in c['name'].lower()]
     if not matched_currencies:
@@ -259,35 +309,40 @@ async def process_search_query(update: Update, context: ContextTypes.DEFAULT_TYP
 async def exchange_view_all_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query; await query.answer()
     lang = context.user_data.get("lang", "fa")
-    all_currencies = list(context.user_data.get("all_currencies", {}).values())
-
     step_prefix = context.user_data.get('current_step', 'from')
-    keyboard = create_currency_keyboard(all_currencies, lang, step_prefix, show_extra_buttons=False)
-    await query.edit_message_text(get_text("exchange_select_from_currency", lang) if step_prefix == 'from' else get_text("exchange_select_to_currency", lang), reply_markup=keyboard)
+    await query.edit_message_reply_markup(reply_markup=get_currency_catalog_pages(lang, step_prefix)[0])
+    return SELECT_FROM_CURRENCY if step_prefix == 'from' else SELECT_TO_CURRENCY
 
+async def exchange_catalog_page_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Turns a page of the full catalog; pages are precomputed, so this is a cache hit and one edit."""
+    query = update.callback_query; await query.answer()
+    lang = context.user_data.get("lang", "fa")
+    step_prefix = context.user_data.get('current_step', 'from')
+    pages = get_currency_catalog_pages(lang, step_prefix)
+    page = min(max(int(query.data.split("_")[-1]), 1), len(pages))
+    await query.edit_message_reply_markup(reply_markup=pages[page - 1])
     return SELECT_FROM_CURRENCY if step_prefix == 'from' else SELECT_TO_CURRENCY
 
 # --- Conversation Handler ---
 
 exchange_handler = ConversationHandler(
     entry_points=[
-        MessageHandler(
-            filters.Regex(f"^({get_text('exchange_button', 'fa')}|{get_text('exchange_button', 'en')})$"),
-            start_exchange_conv
-        )
+        MessageHandler(IntentFilter("exchange_button"), start_exchange_conv)
     ],
     states={
         SELECT_FROM_CURRENCY: [
             CallbackQueryHandler(get_from_currency, pattern="^from_"),
             CallbackQueryHandler(exchange_search_handler, pattern="^exchange_search$"),
-            CallbackQueryHandler(exchange_view_all_handler, pattern="^exchange_view_all$")
+            CallbackQueryHandler(exchange_view_all_handler, pattern="^exchange_view_all$"),
+            CallbackQueryHandler(exchange_catalog_page_handler, pattern="^currency_page_")
         ],
         SELECT_FROM_NETWORK: [CallbackQueryHandler(get_from_network, pattern="^from_net_")],
         ENTER_AMOUNT: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_amount)],
         SELECT_TO_CURRENCY: [
             CallbackQueryHandler(get_to_currency, pattern="^to_"),
             CallbackQueryHandler(exchange_search_handler, pattern="^exchange_search$"),
-            CallbackQueryHandler(exchange_view_all_handler, pattern="^exchange_view_all$")
+            CallbackQueryHandler(exchange_view_all_handler, pattern="^exchange_view_all$"),
+            CallbackQueryHandler(exchange_catalog_page_handler, pattern="^currency_page_")
         ],
         SELECT_TO_NETWORK: [CallbackQueryHandler(get_to_network, pattern="^to_net_")],
         CONFIRM_PREVIEW: [CallbackQueryHandler(get_preview_confirmation, pattern="^preview_confirm$")],
@@ -298,4 +353,6 @@ exchange_handler = ConversationHandler(
         CallbackQueryHandler(cancel_exchange, pattern="^preview_cancel$"),
         CommandHandler('cancel', cancel_exchange)
     ],
+    name="exchange",
+    persistent=True,
 )
@@ -1,28 +1,35 @@
 # tabadex_bot/handlers/menu_handler.py
 from telegram import Update
-from telegram.ext import ContextTypes, MessageHandler, filters
-from ..config import settings
+from telegram.ext import ContextTypes, MessageHandler
+from ..intents import IntentFilter, resolve_intent
 from ..locales import get_text
 from .start_handler import show_main_menu
 from .account_handler import show_account_menu
 from .support_handler import show_support_menu
 from .admin.panel_handler import show_admin_panel
+from .admin.statistics import show_statistics
+from .admin.user_management import show_user_management_menu, list_users
 from .exchange_handler import start_exchange_conv
 
-async def main_router(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    lang = context.user_data.get("lang", "fa")
-    text = update.message.text
-    if text == get_text("exchange_button", lang): await start_exchange_conv(update, context)
-    elif text == get_text("buy_tether_button", lang): await update.message.reply_text(get_text("buy_tether_wip", lang))
-    elif text == get_text("account_button", lang): await show_account_menu(update, context)
-    elif text == get_text("support_button", lang): await show_support_menu(update, context)
-    elif text == get_text("admin_panel_button", lang) and update.effective_user.id in settings.ADMIN_ID_SET:
-        await show_admin_panel(update, context)
-    elif text == get_text("back_button", lang): await show_main_menu(update, context)
+async def show_buy_tether_wip(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.reply_text(get_text("buy_tether_wip", context.user_data.get("lang", "fa")))
+
+# Admin-only routes are guarded by @admin_required on the handlers themselves.
+MENU_ROUTES = {
+    "exchange_button": start_exchange_conv,
+    "buy_tether_button": show_buy_tether_wip,
+    "account_button": show_account_menu,
+    "support_button": show_support_menu,
+    "admin_panel_button": show_admin_panel,
+    "admin_statistics": show_statistics,
+    "admin_user_management": show_user_management_menu,
+    "admin_view_all_users": list_users,
+    "back_button": show_main_menu,
+}
 
-def create_main_menu_filter() -> filters.BaseFilter:
-    keys = ["exchange_button", "buy_tether_button", "account_button", "support_button", "admin_panel_button", "back_button"]
-    texts = list(set([get_text(key, lang) for key in keys for lang in ["fa", "en"]]))
-    return filters.Text(texts)
+async def main_router(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    route = MENU_ROUTES.get(resolve_intent(update.message.text))
+    if route:
+        await route(update, context)
 
-menu_handler = MessageHandler(create_main_menu_filter(), main_router)
\ No newline at end of file
+menu_handler = MessageHandler(IntentFilter(*MENU_ROUTES), main_router)
\ No newline at end of file
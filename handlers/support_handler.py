@@ -7,7 +7,7 @@ from telegram.ext import (
 from telegram.constants import ParseMode
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..config import logger, settings
+from ..config import logger
 from ..database import crud, models
 from ..keyboards import (
     get_support_menu_keyboard,
@@ -17,6 +17,9 @@ from ..keyboards import (
     get_cancel_keyboard
 )
 from ..locales import get_text
+from ..intents import IntentFilter
+from ..utils.callback_router import CallbackRoute
+from ..utils.roles import role_registry
 
 GET_TOPIC, GET_MESSAGE, GET_REPLY = range(30, 33)
 
@@ -63,7 +66,8 @@ async def get_ticket_message_and_save(update: Update, context: ContextTypes.DEFA
     new_ticket = await crud.create_ticket(session, update.effective_user.id, title, message_text)
     await update.message.reply_text(get_text("support_ticket_created", lang).format(ticket_id=new_ticket.id))
     
-    for admin_id in settings.ADMIN_ID_SET:
+    # Admins and support agents both handle tickets
+    for admin_id in role_registry.staff:
         admin_user = await crud.get_user_by_user_id(session, admin_id)
         admin_lang = admin_user.language_code if admin_user else "fa"
         
@@ -105,13 +109,13 @@ async def view_my_tickets(update: Update, context: ContextTypes.DEFAULT_TYPE):
         reply_markup=get_user_tickets_keyboard(tickets, lang)
     )
 
-async def show_ticket_details(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def show_ticket_details(update: Update, context: ContextTypes.DEFAULT_TYPE, ticket_id: int = None):
     """Shows the full conversation of a single ticket."""
     query = update.callback_query
     await query.answer()
     lang = context.user_data.get("lang", "fa")
     session: AsyncSession = context.db_session
-    ticket_id = int(query.data.split("_")[-1])
+    ticket_id = ticket_id or context.args[0]
 
     ticket = await crud.get_ticket_with_messages(session, ticket_id, update.effective_user.id)
     if not ticket:
@@ -133,7 +137,7 @@ async def close_ticket(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer()
     lang = context.user_data.get("lang", "fa")
     session: AsyncSession = context.db_session
-    ticket_id = int(query.data.split("_")[-1])
+    ticket_id = context.args[0]
 
     success = await crud.close_ticket_by_user(session, ticket_id, update.effective_user.id)
     if success:
@@ -166,15 +170,14 @@ async def get_reply_and_save(update: Update, context: ContextTypes.DEFAULT_TYPE)
     await crud.add_reply_to_ticket(session, ticket_id, user_id, reply_text, is_admin=False)
     
     class MockQuery:
-        def __init__(self, t_id, message):
-            self.data = f"view_ticket_{t_id}"
+        def __init__(self, message):
             self.message = message
         async def answer(self): pass
         async def edit_message_text(self, *args, **kwargs):
             await self.message.reply_text(*args, **kwargs)
 
-    mock_update = Update(update.update_id, message=update.message, callback_query=MockQuery(ticket_id, update.message))
-    await show_ticket_details(mock_update, context)
+    mock_update = Update(update.update_id, message=update.message, callback_query=MockQuery(update.message))
+    await show_ticket_details(mock_update, context, ticket_id=ticket_id)
 
     return ConversationHandler.END
 
@@ -182,7 +185,7 @@ async def cancel_reply(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     query = update.callback_query
     await query.answer()
     context.user_data.pop('reply_ticket_id', None)
-    await show_ticket_details(update, context)
+    await show_ticket_details(update, context, ticket_id=int(query.data.split("_")[-1]))
     return ConversationHandler.END
 
 async def back_to_support_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -194,23 +197,29 @@ async def back_to_support_menu(update: Update, context: ContextTypes.DEFAULT_TYP
 
 # --- Handlers ---
 create_ticket_conv = ConversationHandler(
-    entry_points=[MessageHandler(filters.Regex(f"^({get_text('create_new_ticket_button', 'fa')}|{get_text('create_new_ticket_button', 'en')})$"), create_ticket_start)],
+    entry_points=[MessageHandler(IntentFilter("create_new_ticket_button"), create_ticket_start)],
     states={
         GET_TOPIC: [CallbackQueryHandler(get_ticket_topic, pattern="^topic_")],
         GET_MESSAGE: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_ticket_message_and_save)],
     },
     fallbacks=[CallbackQueryHandler(cancel_ticket_creation, pattern="^cancel_ticket_creation$")],
-    per_message=True
+    per_message=True,
+    name="create_ticket",
+    persistent=True
 )
 reply_ticket_conv = ConversationHandler(
     entry_points=[CallbackQueryHandler(reply_to_ticket_start, pattern=r"^reply_ticket_")],
     states={GET_REPLY: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_reply_and_save)]},
     fallbacks=[CallbackQueryHandler(cancel_reply, pattern=r"^cancel_reply_")],
-    per_message=True
+    per_message=True,
+    name="reply_ticket",
+    persistent=True
 )
 support_handlers = [
-    MessageHandler(filters.Regex(f"^({get_text('view_my_tickets_button', 'fa')}|{get_text('view_my_tickets_button', 'en')})$"), view_my_tickets),
-    CallbackQueryHandler(show_ticket_details, pattern="^view_ticket_"),
-    CallbackQueryHandler(close_ticket, pattern="^close_ticket_"),
-    CallbackQueryHandler(back_to_support_menu, pattern="^back_to_support_menu$"),
+    MessageHandler(IntentFilter("view_my_tickets_button"), view_my_tickets),
+]
+support_callback_routes = [
+    CallbackRoute("view_ticket", show_ticket_details, int),
+    CallbackRoute("close_ticket", close_ticket, int),
+    CallbackRoute("back_to_support_menu", back_to_support_menu),
 ]
\ No newline at end of file
@@ -0,0 +1,61 @@
+# tabadex_bot/intents.py
+
+from telegram import Message
+from telegram.ext import filters
+
+from .config import logger
+from .locales import translations, on_reload
+
+# Locale keys of every reply-keyboard button that routes somewhere. The key doubles as the intent name.
+INTENT_KEYS = (
+    # Main menu
+    "exchange_button", "buy_tether_button", "account_button", "support_button", "admin_panel_button", "back_button",
+    # Account menu
+    "my_orders_button", "saved_addresses_button", "change_language_button",
+    # Support menu
+    "create_new_ticket_button", "view_my_tickets_button",
+    # Admin panel
+    "admin_user_management", "admin_ticket_management", "admin_statistics", "admin_broadcast", "admin_settings",
+    "admin_view_all_users", "admin_search_user",
+)
+
+# Buttons that are not translated (they have to be readable before a language is chosen).
+LANGUAGE_BUTTONS = {"fa": "🇮🇷 فارسی (Persian)", "en": "🇬🇧 English"}
+
+_intent_index: dict[str, str] = {}
+
+
+def build_intent_index() -> dict[str, str]:
+    """Maps every button label, in every language, to its intent. Rebuilt whenever locales change."""
+    index = {label: f"language_{lang}" for lang, label in LANGUAGE_BUTTONS.items()}
+    for lang, texts in translations.items():
+        for key in INTENT_KEYS:
+            label = texts.get(key)
+            if not label:
+                continue
+            existing = index.setdefault(label, key)
+            if existing != key:
+                logger.warning(f"Button label '{label}' ({lang}) is shared by intents '{existing}' and '{key}'; keeping '{existing}'")
+    _intent_index.clear()
+    _intent_index.update(index)
+    return _intent_index
+
+
+def resolve_intent(text: str | None) -> str | None:
+    return _intent_index.get(text) if text else None
+
+
+class IntentFilter(filters.MessageFilter):
+    """Matches text messages whose button label resolves to one of the given intents (one dict lookup)."""
+    __slots__ = ("intents",)
+
+    def __init__(self, *intents: str):
+        super().__init__(name=f"IntentFilter({', '.join(intents)})")
+        self.intents = frozenset(intents)
+
+    def filter(self, message: Message) -> bool:
+        return resolve_intent(message.text) in self.intents
+
+
+build_intent_index()
+on_reload(build_intent_index)
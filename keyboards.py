@@ -1,40 +1,78 @@
 # tabadex_bot/keyboards.py
+from functools import wraps
+from itertools import groupby
 from typing import List, Dict, Any
 from telegram import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
 
-from .locales import get_text
-from .database.models import User, Order, SavedAddress, Ticket, TicketStatus
+from .locales import get_text, get_locale_version
+from .intents import LANGUAGE_BUTTONS
+from .utils.callback_router import pack_callback_data
+from .utils.swapzone_api import swapzone_api_client
+from .database.models import User, Order, SavedAddress, StaffRole, Ticket, TicketStatus
+
+# --- Keyboard cache ---
+# Markups are immutable once built, so static and semi-static keyboards are built once per
+# (builder, arguments) and shared. Entries are only valid for the locale and currency catalog
+# versions they were built from; the cache is dropped as soon as either version changes.
+_keyboard_cache: Dict[tuple, Any] = {}
+_keyboard_cache_versions: tuple = ()
+
+def memoized_keyboard(builder):
+    """Caches a keyboard builder whose arguments are few and hashable (lang, role, a fixed prefix...)."""
+    @wraps(builder)
+    def wrapped(*args, **kwargs):
+        global _keyboard_cache_versions
+        versions = (get_locale_version(), swapzone_api_client.catalog_version)
+        if versions != _keyboard_cache_versions:
+            _keyboard_cache.clear()
+            _keyboard_cache_versions = versions
+        key = (builder.__name__, args, tuple(sorted(kwargs.items())))
+        markup = _keyboard_cache.get(key)
+        if markup is None:
+            markup = _keyboard_cache[key] = builder(*args, **kwargs)
+        return markup
+    return wrapped
 
 # --- Reply Keyboards (دکمه‌های ثابت) ---
 
-def get_main_menu_keyboard(lang: str, is_admin: bool) -> ReplyKeyboardMarkup:
+@memoized_keyboard
+def get_main_menu_keyboard(lang: str, role: StaffRole | None = None) -> ReplyKeyboardMarkup:
     """کیبورد منوی اصلی با دکمه‌های Reply."""
     keyboard = [
         [KeyboardButton(get_text("exchange_button", lang)), KeyboardButton(get_text("buy_tether_button", lang))],
         [KeyboardButton(get_text("account_button", lang)), KeyboardButton(get_text("support_button", lang))]
     ]
-    if is_admin:
+    if role:
         keyboard.append([KeyboardButton(get_text("admin_panel_button", lang))])
     return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
 
+@memoized_keyboard
 def get_language_selection_keyboard() -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup([
-        [KeyboardButton("🇮🇷 فارسی (Persian)"), KeyboardButton("🇬🇧 English")]
+        [KeyboardButton(LANGUAGE_BUTTONS["fa"]), KeyboardButton(LANGUAGE_BUTTONS["en"])]
     ], resize_keyboard=True, one_time_keyboard=True)
 
+@memoized_keyboard
 def get_account_menu_keyboard(lang: str) -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup([
         [KeyboardButton(get_text("my_orders_button", lang)), KeyboardButton(get_text("saved_addresses_button", lang))],
         [KeyboardButton(get_text("change_language_button", lang)), KeyboardButton(get_text("back_button", lang))]
     ], resize_keyboard=True)
 
+@memoized_keyboard
 def get_support_menu_keyboard(lang: str) -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup([
         [KeyboardButton(get_text("create_new_ticket_button", lang)), KeyboardButton(get_text("view_my_tickets_button", lang))],
         [KeyboardButton(get_text("back_button", lang))]
     ], resize_keyboard=True)
 
-def get_admin_panel_keyboard(lang: str) -> ReplyKeyboardMarkup:
+@memoized_keyboard
+def get_admin_panel_keyboard(lang: str, role: StaffRole = StaffRole.ADMIN) -> ReplyKeyboardMarkup:
+    if role is StaffRole.SUPPORT:
+        return ReplyKeyboardMarkup([
+            [KeyboardButton(get_text("admin_ticket_management", lang))],
+            [KeyboardButton(get_text("back_button", lang))]
+        ], resize_keyboard=True)
     return ReplyKeyboardMarkup([
         [KeyboardButton(get_text("admin_user_management", lang))],
         [KeyboardButton(get_text("admin_ticket_management", lang))],
@@ -42,6 +80,7 @@ def get_admin_panel_keyboard(lang: str) -> ReplyKeyboardMarkup:
         [KeyboardButton(get_text("admin_settings", lang)), KeyboardButton(get_text("back_button", lang))]
     ], resize_keyboard=True)
 
+@memoized_keyboard
 def get_admin_user_management_keyboard(lang: str) -> ReplyKeyboardMarkup:
     """Keyboard for the main user management menu."""
     return ReplyKeyboardMarkup([
@@ -63,40 +102,90 @@ def create_currency_keyboard(currencies: list, lang: str, callback_prefix: str,
         ])
     return InlineKeyboardMarkup(keyboard)
 
+@memoized_keyboard
+def get_top_currencies_keyboard(lang: str, callback_prefix: str, tickers: tuple, show_extra_buttons: bool = True) -> InlineKeyboardMarkup:
+    """The featured-currencies keyboard, built from the client's cached catalog (fetch it before calling)."""
+    catalog = swapzone_api_client.currencies_by_ticker
+    return create_currency_keyboard([catalog[t] for t in tickers if t in catalog], lang, callback_prefix, show_extra_buttons)
+
+CATALOG_PAGE_SIZE = 24  # 8 rows of 3
+
+def _catalog_group(currency: dict) -> str:
+    first = currency['ticker'][:1].upper()
+    return first if first.isalpha() else "#"
+
+def _paginate_by_group(currencies: list, size: int) -> list:
+    """Splits a sorted list into pages, breaking between letter groups whenever the next group does not fit."""
+    pages, current = [], []
+    for _, group in groupby(currencies, key=_catalog_group):
+        group = list(group)
+        if current and len(current) + len(group) > size:
+            pages.append(current)
+            current = []
+        while len(group) > size:
+            pages.append(group[:size])
+            group = group[size:]
+        current.extend(group)
+    if current or not pages:
+        pages.append(current)
+    return pages
+
+@memoized_keyboard
+def get_currency_catalog_pages(lang: str, callback_prefix: str) -> tuple:
+    """Every page of the full catalog, sorted and grouped by ticker. Built once per language, step and catalog version."""
+    currencies = sorted(swapzone_api_client.currencies_by_ticker.values(), key=lambda c: c['ticker'].lower())
+    chunks = _paginate_by_group(currencies, CATALOG_PAGE_SIZE)
+    pages = []
+    for number, chunk in enumerate(chunks, start=1):
+        buttons = [InlineKeyboardButton(f"{c.get('name') or c['ticker']} ({c['ticker'].upper()})", callback_data=f"{callback_prefix}_{c['ticker']}") for c in chunk]
+        keyboard = [buttons[i:i+3] for i in range(0, len(buttons), 3)]
+        letters = sorted({_catalog_group(c) for c in chunk})
+        label = f"{letters[0]}–{letters[-1]}" if len(letters) > 1 else (letters[0] if letters else "–")
+        navigation_row = []
+        if number > 1: navigation_row.append(InlineKeyboardButton("«", callback_data=f"currency_page_{number - 1}"))
+        navigation_row.append(InlineKeyboardButton(f"{label}  ({number}/{len(chunks)})", callback_data="noop"))
+        if number < len(chunks): navigation_row.append(InlineKeyboardButton("»", callback_data=f"currency_page_{number + 1}"))
+        keyboard.append(navigation_row)
+        keyboard.append([InlineKeyboardButton("🔍 " + get_text("search_currency_button", lang), callback_data="exchange_search")])
+        pages.append(InlineKeyboardMarkup(keyboard))
+    return tuple(pages)
+
 def create_network_keyboard(networks: list, lang: str, callback_prefix: str) -> InlineKeyboardMarkup:
     buttons = [InlineKeyboardButton(network.upper(), callback_data=f"{callback_prefix}_{network}") for network in networks]
     return InlineKeyboardMarkup([buttons[i:i+2] for i in range(0, len(buttons), 2)])
 
+@memoized_keyboard
 def get_exchange_preview_keyboard(lang: str) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup([[InlineKeyboardButton(get_text("confirm_rate_button", lang), callback_data="preview_confirm"), InlineKeyboardButton(get_text("cancel_button", lang), callback_data="preview_cancel")]])
 
 def get_orders_keyboard(orders: list, lang: str, page: int, total_pages: int) -> InlineKeyboardMarkup:
-    keyboard = [[InlineKeyboardButton(f"#{o.id[:8]}.. | {o.from_amount} {o.from_currency.upper()} ➡️ {o.to_currency.upper()}", callback_data=f"view_order_{o.id}")] for o in orders]
+    keyboard = [[InlineKeyboardButton(f"#{o.id[:8]}.. | {o.from_amount} {o.from_currency.upper()} ➡️ {o.to_currency.upper()}", callback_data=pack_callback_data("view_order", o.id))] for o in orders]
     pagination_row = []
-    if page > 1: pagination_row.append(InlineKeyboardButton("«", callback_data=f"orders_page_{page-1}"))
-    if page < total_pages: pagination_row.append(InlineKeyboardButton("»", callback_data=f"orders_page_{page+1}"))
+    if page > 1: pagination_row.append(InlineKeyboardButton("«", callback_data=pack_callback_data("orders_page", page - 1)))
+    if page < total_pages: pagination_row.append(InlineKeyboardButton("»", callback_data=pack_callback_data("orders_page", page + 1)))
     if pagination_row: keyboard.append(pagination_row)
     keyboard.append([InlineKeyboardButton(get_text("back_button", lang), callback_data="back_to_account_menu")])
     return InlineKeyboardMarkup(keyboard)
 
 def get_back_to_orders_keyboard(lang: str, page: int) -> InlineKeyboardMarkup:
-    return InlineKeyboardMarkup([[InlineKeyboardButton(get_text("back_button", lang), callback_data=f"orders_page_{page}")]])
+    return InlineKeyboardMarkup([[InlineKeyboardButton(get_text("back_button", lang), callback_data=pack_callback_data("orders_page", page))]])
     
 def get_addresses_keyboard(addresses: list, lang: str) -> InlineKeyboardMarkup:
-    keyboard = [[InlineKeyboardButton(f"{addr.name} ({addr.currency_ticker.upper()})", callback_data="noop"), InlineKeyboardButton("🗑️", callback_data=f"delete_address_{addr.id}")] for addr in addresses]
+    keyboard = [[InlineKeyboardButton(f"{addr.name} ({addr.currency_ticker.upper()})", callback_data="noop"), InlineKeyboardButton("🗑️", callback_data=pack_callback_data("delete_address", addr.id))] for addr in addresses]
     keyboard.append([InlineKeyboardButton("➕ " + get_text("add_address_button", lang), callback_data="add_address_start")])
     keyboard.append([InlineKeyboardButton(get_text("back_button", lang), callback_data="back_to_account_menu")])
     return InlineKeyboardMarkup(keyboard)
 
+@memoized_keyboard
 def get_support_topics_keyboard(lang: str) -> InlineKeyboardMarkup:
-    topics = {"problem_with_order": get_text("topic_order_problem"), "deposit_issue": get_text("topic_deposit_issue"), "general_question": get_text("topic_general_question"), "other": get_text("topic_other")}
+    topics = {"problem_with_order": get_text("topic_order_problem", lang), "deposit_issue": get_text("topic_deposit_issue", lang), "general_question": get_text("topic_general_question", lang), "other": get_text("topic_other", lang)}
     keyboard = [[InlineKeyboardButton(text, callback_data=f"topic_{key}")] for key, text in topics.items()]
     keyboard.append([InlineKeyboardButton(get_text("cancel_button", lang), callback_data="cancel_ticket_creation")])
     return InlineKeyboardMarkup(keyboard)
 
 def get_user_tickets_keyboard(tickets: list, lang: str) -> InlineKeyboardMarkup:
     status_map = {'OPEN': '🔵', 'ANSWERED': '🟢', 'PENDING_USER_REPLY': '🟡', 'CLOSED': '⚫️'}
-    keyboard = [[InlineKeyboardButton(f"{status_map.get(t.status.name, '⚪️')} #{t.id} - {t.title}", callback_data=f"view_ticket_{t.id}")] for t in tickets]
+    keyboard = [[InlineKeyboardButton(f"{status_map.get(t.status.name, '⚪️')} #{t.id} - {t.title}", callback_data=pack_callback_data("view_ticket", t.id))] for t in tickets]
     keyboard.append([InlineKeyboardButton(get_text("back_button", lang), callback_data="back_to_support_menu")])
     return InlineKeyboardMarkup(keyboard)
 
@@ -104,43 +193,73 @@ def get_ticket_view_keyboard(lang: str, ticket_id: int, status_name: str) -> Inl
     keyboard = []
     if status_name != 'CLOSED':
         keyboard.append([InlineKeyboardButton("✍️ " + get_text("reply_to_ticket_button", lang), callback_data=f"reply_ticket_{ticket_id}")])
-        keyboard.append([InlineKeyboardButton("☑️ " + get_text("close_ticket_button", lang), callback_data=f"close_ticket_{ticket_id}")])
+        keyboard.append([InlineKeyboardButton("☑️ " + get_text("close_ticket_button", lang), callback_data=pack_callback_data("close_ticket", ticket_id))])
     keyboard.append([InlineKeyboardButton(get_text("back_button", lang), callback_data="back_to_ticket_list")])
     return InlineKeyboardMarkup(keyboard)
 
 def get_admin_tickets_keyboard(tickets: list, lang: str) -> InlineKeyboardMarkup:
     status_map = {'OPEN': '🔵', 'PENDING_USER_REPLY': '🟡'}
-    keyboard = [[InlineKeyboardButton(f"{status_map.get(ticket.status.name, '⚪️')} #{ticket.id} - User: {ticket.user_id}", callback_data=f"admin_view_ticket_{ticket.id}")] for ticket in tickets]
+    keyboard = [[InlineKeyboardButton(f"{status_map.get(ticket.status.name, '⚪️')} #{ticket.id} - User: {ticket.user_id}", callback_data=pack_callback_data("admin_view_ticket", ticket.id))] for ticket in tickets]
     return InlineKeyboardMarkup(keyboard)
 
 def get_admin_ticket_view_keyboard(lang: str, ticket_id: int, status_name: str) -> InlineKeyboardMarkup:
     keyboard = []
     if status_name != 'CLOSED':
         keyboard.append([InlineKeyboardButton("✍️ " + get_text("admin_reply_button", lang), callback_data=f"admin_reply_start_{ticket_id}")])
-        keyboard.append([InlineKeyboardButton("☑️ " + get_text("admin_close_ticket_button", lang), callback_data=f"admin_close_ticket_{ticket_id}")])
+        keyboard.append([InlineKeyboardButton("☑️ " + get_text("admin_close_ticket_button", lang), callback_data=pack_callback_data("admin_close_ticket", ticket_id))])
     keyboard.append([InlineKeyboardButton(get_text("back_button", lang), callback_data="back_to_tickets")])
     return InlineKeyboardMarkup(keyboard)
 
 def get_admin_users_list_keyboard(users: list, lang: str, page: int, total_pages: int) -> InlineKeyboardMarkup:
-    keyboard = [[InlineKeyboardButton(f"{'🔴' if user.is_blocked else '🟢'} {user.first_name or 'N/A'} (@{user.username or 'N/A'})", callback_data=f"admin_view_user_{user.user_id}")] for user in users]
+    keyboard = [[InlineKeyboardButton(f"{'🔴' if user.is_blocked else '🟢'} {user.first_name or 'N/A'} (@{user.username or 'N/A'})", callback_data=pack_callback_data("admin_view_user", user.user_id))] for user in users]
     pagination_row = []
-    if page > 1: pagination_row.append(InlineKeyboardButton("<<", callback_data=f"admin_users_list_{page - 1}"))
-    if page < total_pages: pagination_row.append(InlineKeyboardButton(">>", callback_data=f"admin_users_list_{page + 1}"))
+    if page > 1: pagination_row.append(InlineKeyboardButton("<<", callback_data=pack_callback_data("admin_users_list", page - 1)))
+    if page < total_pages: pagination_row.append(InlineKeyboardButton(">>", callback_data=pack_callback_data("admin_users_list", page + 1)))
     if pagination_row: keyboard.append(pagination_row)
     keyboard.append([InlineKeyboardButton(get_text("back_button", lang), callback_data="admin_users_main_inline")])
     return InlineKeyboardMarkup(keyboard)
     
+def get_admin_user_search_results_keyboard(users: list, lang: str, page: int, has_more: bool) -> InlineKeyboardMarkup:
+    keyboard = [[InlineKeyboardButton(f"{'🔴' if user.is_blocked else '🟢'} {user.first_name or 'N/A'} (@{user.username or 'N/A'})", callback_data=pack_callback_data("admin_view_user", user.user_id))] for user in users]
+    pagination_row = []
+    if page > 1: pagination_row.append(InlineKeyboardButton("<<", callback_data=pack_callback_data("admin_user_search_page", page - 1)))
+    if has_more: pagination_row.append(InlineKeyboardButton(">>", callback_data=pack_callback_data("admin_user_search_page", page + 1)))
+    if pagination_row: keyboard.append(pagination_row)
+    keyboard.append([InlineKeyboardButton(get_text("back_button", lang), callback_data="admin_users_list_1")])
+    return InlineKeyboardMarkup(keyboard)
+
 def get_admin_user_details_keyboard(lang: str, user_id: int, is_blocked: bool) -> InlineKeyboardMarkup:
     block_text = get_text("admin_unblock_user", lang) if is_blocked else get_text("admin_block_user", lang)
-    block_callback = f"admin_unblock_{user_id}" if is_blocked else f"admin_block_{user_id}"
+    block_callback = pack_callback_data("admin_unblock" if is_blocked else "admin_block", user_id)
     return InlineKeyboardMarkup([[InlineKeyboardButton(block_text, callback_data=block_callback)], [InlineKeyboardButton(get_text("back_button", lang), callback_data="admin_users_list_1")]])
 
 def get_admin_settings_keyboard(lang: str, markup: str) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup([[InlineKeyboardButton(get_text("current_markup", lang).format(markup=markup), callback_data="noop")], [InlineKeyboardButton("✏️ " + get_text("change_markup_button", lang), callback_data="set_markup_start")]])
 
-def get_admin_broadcast_confirm_keyboard(lang: str) -> InlineKeyboardMarkup:
-    return InlineKeyboardMarkup([[InlineKeyboardButton("✅ " + get_text("admin_broadcast_send", lang), callback_data="confirm_broadcast"), InlineKeyboardButton("❌ " + get_text("cancel_button", lang), callback_data="cancel_broadcast")]])
+@memoized_keyboard
+def get_admin_broadcast_confirm_keyboard(lang: str, language: str | None = None, active_days: int | None = None) -> InlineKeyboardMarkup:
+    """Confirm/cancel buttons plus recipient segment toggles (language, recent activity)."""
+    def mark(label: str, selected: bool) -> str:
+        return f"• {label} •" if selected else label
+    language_row = [
+        InlineKeyboardButton(mark("🌐", language is None), callback_data="broadcast_segment_lang_all"),
+        InlineKeyboardButton(mark("🇮🇷 FA", language == "fa"), callback_data="broadcast_segment_lang_fa"),
+        InlineKeyboardButton(mark("🇬🇧 EN", language == "en"), callback_data="broadcast_segment_lang_en"),
+    ]
+    activity_row = [
+        InlineKeyboardButton(mark("🕒 ∞", active_days is None), callback_data="broadcast_segment_active_0"),
+        InlineKeyboardButton(mark("🕒 7d", active_days == 7), callback_data="broadcast_segment_active_7"),
+        InlineKeyboardButton(mark("🕒 30d", active_days == 30), callback_data="broadcast_segment_active_30"),
+    ]
+    return InlineKeyboardMarkup([
+        language_row, activity_row,
+        [InlineKeyboardButton("✅ " + get_text("admin_broadcast_send", lang), callback_data="confirm_broadcast"), InlineKeyboardButton("❌ " + get_text("cancel_button", lang), callback_data="admin_broadcast_cancel")]
+    ])
+
+def get_broadcast_progress_keyboard(lang: str, job_id: int) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup([[InlineKeyboardButton("❌ " + get_text("cancel_button", lang), callback_data=pack_callback_data("broadcast_cancel", job_id))]])
 
+@memoized_keyboard
 def get_back_to_admin_panel_keyboard(lang: str) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup([[InlineKeyboardButton(get_text("back_button", lang), callback_data="admin_panel")]])
 
@@ -1,36 +1,149 @@
 # tabadex_bot/locales.py
 
+import ast
 import json
 from pathlib import Path
+from string import Formatter
+from typing import Callable, Iterable
+
+from .config import logger
 
 # Path to the locales directory
 LOCALE_DIR = Path(__file__).parent.parent / 'locales'
+PACKAGE_DIR = Path(__file__).parent
+
+DEFAULT_LANG = 'fa'
 
-# Load all available translations
+# Raw translations exactly as in the locale files (empty strings included)
 translations = {}
-for file in LOCALE_DIR.glob('*.json'):
-    lang_code = file.stem
-    with open(file, 'r', encoding='utf-8') as f:
-        translations[lang_code] = json.load(f)
 
-DEFAULT_LANG = 'fa'
+# Compiled catalog: per language, every key with the default-language fallback already merged in,
+# and the placeholder names of every template, parsed once.
+_catalog: dict[str, dict[str, str]] = {}
+_template_fields: dict[str, dict[str, frozenset]] = {}
+_default_catalog: dict[str, str] = {}
+_version = 0
+_reload_listeners: list[Callable[[], None]] = []
+_reported_missing: set[str] = set()
+
+def _parse_fields(template: str) -> frozenset:
+    try:
+        return frozenset(field.split('.')[0].split('[')[0] for _, field, _, _ in Formatter().parse(template) if field)
+    except ValueError:
+        logger.warning(f"Locale template is not a valid format string: {template!r}")
+        return frozenset()
+
+def load_translations():
+    """(Re)loads and compiles every locale file, then bumps the locale version, invalidating cached keyboards."""
+    global _default_catalog, _version
+    loaded = {}
+    for file in LOCALE_DIR.glob('*.json'):
+        with open(file, 'r', encoding='utf-8') as f:
+            loaded[file.stem] = json.load(f)
+
+    default = {key: text for key, text in loaded.get(DEFAULT_LANG, {}).items() if text}
+    catalog, fields = {}, {}
+    for lang_code, texts in loaded.items():
+        merged = dict(default)
+        merged.update((key, text) for key, text in texts.items() if text)
+        catalog[lang_code] = merged
+        fields[lang_code] = {key: _parse_fields(text) for key, text in merged.items() if '{' in text}
+
+    translations.clear()
+    translations.update(loaded)
+    _catalog.clear()
+    _catalog.update(catalog)
+    _template_fields.clear()
+    _template_fields.update(fields)
+    _default_catalog = catalog.get(DEFAULT_LANG, {})
+    _reported_missing.clear()
+    _version += 1
+
+def get_locale_version() -> int:
+    return _version
+
+def on_reload(listener: Callable[[], None]):
+    """Registers a callback to run after every hot reload (e.g. to rebuild indexes built from the texts)."""
+    _reload_listeners.append(listener)
+
+def reload_locales():
+    """Hot reload: re-reads the locale files without a restart and notifies everything derived from them."""
+    load_translations()
+    for listener in _reload_listeners:
+        listener()
+    logger.info(f"Locales reloaded (version {_version}, languages: {', '.join(sorted(translations))})")
 
 def get_text(key: str, lang_code: str = DEFAULT_LANG) -> str:
     """
     Fetches a translated text string for a given key and language.
-    Falls back to the default language if the key is not found in the specified language.
+    Fallbacks to the default language are merged at load time, so this is a single lookup.
+    If the key is not found anywhere, the key itself is returned.
     """
-    lang_code = lang_code if lang_code in translations else DEFAULT_LANG
-    
-    # Try to get from the selected language
-    text = translations.get(lang_code, {}).get(key)
-    if text:
-        return text
+    text = (_catalog.get(lang_code) or _default_catalog).get(key)
+    if text is None:
+        if key not in _reported_missing:
+            _reported_missing.add(key)
+            logger.warning(f"Missing locale key '{key}'")
+        return key
+    return text
+
+class _KeepMissing(dict):
+    def __missing__(self, key):
+        return '{' + key + '}'
 
-    # Fallback to default language
-    text = translations.get(DEFAULT_LANG, {}).get(key)
-    if text:
+def format_text(key: str, lang_code: str = DEFAULT_LANG, **values) -> str:
+    """
+    `get_text(key, lang).format(**values)` that never raises on a placeholder the caller did not pass:
+    the template's fields are known from load time, and missing ones are logged and left as-is.
+    """
+    text = get_text(key, lang_code)
+    fields = (_template_fields.get(lang_code) or _template_fields.get(DEFAULT_LANG, {})).get(key)
+    if not fields:
         return text
+    if fields.issubset(values):
+        return text.format(**values)
+    logger.warning(f"Locale key '{key}' ({lang_code}) rendered without {sorted(fields.difference(values))}")
+    return text.format_map(_KeepMissing(values))
+
+def find_used_keys(root: Path = PACKAGE_DIR) -> dict[str, set[str]]:
+    """Literal keys passed to get_text/format_text anywhere in the package, mapped to the files using them."""
+    used: dict[str, set[str]] = {}
+    for path in root.rglob('*.py'):
+        try:
+            tree = ast.parse(path.read_text(encoding='utf-8'))
+        except (SyntaxError, UnicodeDecodeError):
+            continue
+        for node in ast.walk(tree):
+            if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in ('get_text', 'format_text')):
+                continue
+            if node.args and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str):
+                used.setdefault(node.args[0].value, set()).add(str(path.relative_to(root)))
+    return used
+
+def validate_catalog(extra_keys: Iterable[str] = ()) -> list[str]:
+    """
+    Checks that every key used in the code (plus `extra_keys`, for keys built dynamically) exists in every
+    language, and that each template has the same placeholders in every language. Returns the problems found.
+    """
+    used = find_used_keys()
+    for key in extra_keys:
+        used.setdefault(key, set())
+
+    problems = []
+    for lang_code, texts in sorted(translations.items()):
+        missing = sorted(key for key in used if not texts.get(key))
+        for key in missing:
+            where = f" (used in {', '.join(sorted(used[key]))})" if used[key] else ""
+            problems.append(f"[{lang_code}] missing key '{key}'{where}")
+
+    default_fields = _template_fields.get(DEFAULT_LANG, {})
+    for lang_code, fields in sorted(_template_fields.items()):
+        if lang_code == DEFAULT_LANG:
+            continue
+        for key in fields.keys() | default_fields.keys():
+            names, expected = fields.get(key, frozenset()), default_fields.get(key, frozenset())
+            if names != expected and translations.get(lang_code, {}).get(key):
+                problems.append(f"[{lang_code}] placeholders of '{key}' are {sorted(names)}, {DEFAULT_LANG} has {sorted(expected)}")
+    return problems
 
-    # If key is not found anywhere, return the key itself
-    return key
\ No newline at end of file
+load_translations()
@@ -1,24 +1,48 @@
 # tabadex_bot/main.py
 
+import datetime
+
 from telegram import Update
-from telegram.ext import Application, ApplicationBuilder, ContextTypes, TypeHandler
+from telegram.error import TelegramError
+from telegram.ext import Application, ApplicationBuilder, ApplicationHandlerStop, ContextTypes, TypeHandler
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .config import settings, logger
 from .database.session import AsyncSessionLocal, async_engine
-from .database.models import Base
+from .database.models import Base, OrderStatus
+from .locales import validate_catalog
+from .intents import INTENT_KEYS
 from .utils.swapzone_api import swapzone_api_client
+from .utils.update_processor import PerUserUpdateProcessor
+from .utils.broadcaster import BroadcastEngine, broadcast_engine
+from .utils.activity import activity_tracker, ActivityTracker
+from .utils.delivery_feedback import delivery_feedback, DeliveryFeedback
+from .utils.scheduler import scheduler
+from .utils.leader import leader_lease
+from .utils.callback_router import CallbackRouter, CallbackRouterHandler
+from .utils.flood_control import flood_control
+from .utils.blocklist import blocklist
+from .utils.roles import role_registry
+from .utils.language import language_resolver
+from .utils.persistence import DatabasePersistence
+from .utils.sharding import cluster_bus, run_cluster
+from .utils.metrics import metrics, MetricsServer, instrument_application
+from .utils.tracing import traced_bot_request
+from .utils.startup import startup_report, ensure_schema, warm_pool, warm_caches
+from .database import crud
 
 # --- Import All Handlers with correct names ---
 from .handlers.start_handler import start_handler, language_handler
 from .handlers.menu_handler import menu_handler
 from .handlers.exchange_handler import exchange_handler
-from .handlers.account_handler import add_address_conv_handler, account_handlers
-from .handlers.support_handler import create_ticket_conv, reply_ticket_conv, support_handlers
-from .handlers.admin.panel_handler import admin_panel_callback_handler, admin_panel_entry_handler
-from .handlers.admin.ticket_management import admin_reply_conv, admin_ticket_handlers
-from .handlers.admin.user_management import search_user_conv, admin_user_handlers
-from .handlers.admin.broadcast import broadcast_conv_handler
+from .handlers.account_handler import add_address_conv_handler, account_handlers, account_callback_routes
+from .handlers.support_handler import create_ticket_conv, reply_ticket_conv, support_handlers, support_callback_routes
+from .handlers.admin.panel_handler import admin_panel_callback_route, admin_panel_entry_handler, reload_locales_handler, metrics_summary_handler
+from .handlers.admin.roles_handler import staff_roles_handlers
+from .handlers.admin.traces_handler import traces_handlers
+from .handlers.admin.ticket_management import admin_reply_conv, admin_ticket_handlers, admin_ticket_callback_routes
+from .handlers.admin.user_management import search_user_conv, admin_user_callback_routes
+from .handlers.admin.broadcast import broadcast_conv_handler, broadcast_callback_routes
 from .handlers.admin.settings_handler import set_markup_conv, admin_settings_handlers
 
 class DBSessionContext(ContextTypes.DEFAULT_TYPE):
@@ -36,26 +60,116 @@ class DBSessionContext(ContextTypes.DEFAULT_TYPE):
     def db_session(self, value: AsyncSession):
         self._db_session = value
 
+async def blocklist_middleware(update: Update, context: DBSessionContext):
+    """Rejects updates from users blocked by an admin with one set lookup (admins are never rejected)."""
+    user = update.effective_user
+    if user and blocklist.is_blocked(user.id) and not role_registry.is_admin(user.id):
+        blocklist.rejected += 1
+        raise ApplicationHandlerStop
+
+async def flood_middleware(update: Update, context: DBSessionContext):
+    """Drops updates over the sender's rate limit before any session is opened or handler runs."""
+    if not flood_control.allow(update):
+        if update.callback_query:
+            # Otherwise the button keeps spinning until Telegram gives up on it.
+            try:
+                await update.callback_query.answer()
+            except TelegramError:
+                pass
+        raise ApplicationHandlerStop
+
 async def db_middleware(update: Update, context: DBSessionContext):
+    if update.effective_user:
+        activity_tracker.touch(update.effective_user.id)
     async with AsyncSessionLocal() as session:
         context.db_session = session
+        # "lang" is not persisted with user_data (DatabasePersistence.TRANSIENT_USER_DATA_KEYS); it comes from the resolver, not "fa".
+        if update.effective_user and "lang" not in context.user_data:
+            context.user_data["lang"] = await language_resolver.resolve(session, update.effective_user.id)
+
+def check_locales():
+    """Fails fast (LOCALE_STRICT) or warns when a key used by the handlers is missing from a language."""
+    dynamic_keys = [*INTENT_KEYS, *(f"order_status_{status.name.lower()}" for status in OrderStatus)]
+    problems = validate_catalog(extra_keys=dynamic_keys)
+    for problem in problems:
+        logger.warning(f"Locale catalog: {problem}")
+    if problems and settings.LOCALE_STRICT:
+        raise RuntimeError(f"Locale catalog has {len(problems)} problem(s); see the log above.")
+
+async def prepare_database():
+    """Creates missing tables when the models changed and seeds the first admins. Sharded, it runs once before the workers start."""
+    if await ensure_schema(async_engine, Base.metadata):
+        logger.info("Database schema changed since the last start; missing tables and indexes were created.")
+    async with AsyncSessionLocal() as session:
+        if await crud.bootstrap_admins(session, settings.ADMIN_ID_SET):
+            logger.info("No admins in the database yet; seeded them from ADMIN_IDS.")
+
+async def delete_old_broadcasts():
+    before = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=settings.BROADCAST_RETENTION_DAYS)
+    async with AsyncSessionLocal() as session:
+        deleted = await crud.delete_finished_broadcast_jobs(session, before)
+    if deleted:
+        logger.info(f"Deleted {deleted} finished broadcast jobs older than {settings.BROADCAST_RETENTION_DAYS} days")
+
+def schedule_jobs(app: Application):
+    """Registers the periodic jobs. Singleton jobs run only in the process holding the leader lease."""
+    scheduler.leader = leader_lease
+    scheduler.set_limit("maintenance", settings.SCHEDULER_MAINTENANCE_CONCURRENCY)
+    scheduler.set_limit("broadcast", settings.BROADCAST_MAX_JOBS)
+    scheduler.every("leader-lease", leader_lease.renew_interval, leader_lease.renew, kind="lease", jitter=0)
+    scheduler.every("activity-flush", ActivityTracker.FLUSH_INTERVAL_SECONDS, activity_tracker.flush)
+    scheduler.every("delivery-feedback", DeliveryFeedback.FLUSH_INTERVAL_SECONDS, delivery_feedback.flush)
+    scheduler.every("catalog-refresh", settings.CATALOG_REFRESH_SECONDS, lambda: swapzone_api_client.get_currencies(use_cache=False))
+    scheduler.every("broadcast-retention", 24 * 3600, delete_old_broadcasts, singleton=True, run_at_start=True)
+    scheduler.every(
+        "broadcast-resume", BroadcastEngine.RESUME_INTERVAL_SECONDS, lambda: broadcast_engine.resume_stale(app),
+        singleton=True, run_at_start=True
+    )
 
 async def on_startup(app: Application):
-    async with async_engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    logger.info("Database tables created and bot started.")
+    startup_report.mark("init")
+    with startup_report.phase("locales"):
+        check_locales()
+    # Sharded, the ingress prepared the database before starting the workers; they must not race on it.
+    if cluster_bus.worker_count == 1:
+        with startup_report.phase("schema"):
+            await prepare_database()
+    with startup_report.phase("pool"):
+        await warm_pool(async_engine, settings.DB_POOL_WARMUP_CONNECTIONS)
+    with startup_report.phase("warmup"):
+        await warm_caches(AsyncSessionLocal, startup_report, settings.LANGUAGE_PRELOAD_DAYS)
+    await leader_lease.renew()
+    schedule_jobs(app)
+    scheduler.start()
+    if settings.METRICS_PORT:
+        app.bot_data["metrics_server"] = MetricsServer(metrics, settings.METRICS_HOST, settings.METRICS_PORT + cluster_bus.worker_index)
+        await app.bot_data["metrics_server"].start()
+    logger.info(f"Bot started: {startup_report.finish()}")
 
 async def on_shutdown(app: Application):
+    await broadcast_engine.shutdown()
+    await scheduler.shutdown(settings.SCHEDULER_DRAIN_SECONDS)
+    await activity_tracker.flush()
+    await delivery_feedback.flush()
+    await leader_lease.release()
+    if "metrics_server" in app.bot_data:
+        await app.bot_data.pop("metrics_server").stop()
     await swapzone_api_client.close_session()
     logger.info("Bot shutdown tasks completed.")
 
-def main() -> None:
+def build_application(builder: ApplicationBuilder | None = None) -> Application:
     context_types = ContextTypes(context=DBSessionContext)
+    builder = builder or ApplicationBuilder().token(settings.BOT_TOKEN).request(traced_bot_request())
     application = (
-        ApplicationBuilder().token(settings.BOT_TOKEN).context_types(context_types)
+        builder.context_types(context_types)
+        .persistence(DatabasePersistence(settings.PERSISTENCE_FLUSH_SECONDS))
+        .concurrent_updates(PerUserUpdateProcessor(settings.CONCURRENT_UPDATES))
         .post_init(on_startup).post_shutdown(on_shutdown).build()
     )
     
+    # Pre-handler middlewares; only one handler runs per group, so each middleware gets its own group.
+    application.add_handler(TypeHandler(Update, blocklist_middleware), group=-3)
+    application.add_handler(TypeHandler(Update, flood_middleware), group=-2)
     application.add_handler(TypeHandler(Update, db_middleware), group=-1)
 
     # Conversation Handlers
@@ -69,20 +183,60 @@ def main() -> None:
     # Command & Basic Handlers
     application.add_handler(start_handler)
     application.add_handler(language_handler)
+    application.add_handler(reload_locales_handler)
+    application.add_handler(metrics_summary_handler)
+    application.add_handlers(staff_roles_handlers)
+    application.add_handlers(traces_handlers)
 
-    # All other CallbackQueryHandlers and MessageHandlers from submenus
+    # Standalone callback queries: one trie lookup instead of a regex per handler
+    callback_router = CallbackRouter(
+        *account_callback_routes, *support_callback_routes, admin_panel_callback_route,
+        *admin_ticket_callback_routes, *admin_user_callback_routes, *broadcast_callback_routes
+    )
+    application.add_handler(CallbackRouterHandler(callback_router))
+
+    # All other MessageHandlers from submenus
     all_other_handlers = [
-        *account_handlers, *support_handlers,
-        admin_panel_callback_handler, admin_panel_entry_handler,
-        *admin_ticket_handlers, *admin_user_handlers, *admin_settings_handlers
+        *account_handlers, *support_handlers, admin_panel_entry_handler,
+        *admin_ticket_handlers, *admin_settings_handlers
     ]
     application.add_handlers(all_other_handlers)
 
     # Central Menu Router (must be one of the last handlers)
     application.add_handler(menu_handler)
-    
-    logger.info("Bot is now polling for updates...")
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+
+    instrument_application(application)
+    return application
+
+def webhook_options() -> dict:
+    if not settings.WEBHOOK_URL:
+        raise ValueError("WEBHOOK_URL must be set when RUN_MODE is 'webhook'.")
+    return dict(
+        listen=settings.WEBHOOK_LISTEN,
+        port=settings.WEBHOOK_PORT,
+        url_path=settings.WEBHOOK_PATH,
+        webhook_url=f"{settings.WEBHOOK_URL.rstrip('/')}/{settings.WEBHOOK_PATH}",
+        secret_token=settings.WEBHOOK_SECRET_TOKEN,
+    )
+
+def main() -> None:
+    if settings.WORKER_PROCESSES > 1:
+        logger.info(f"Starting {settings.WORKER_PROCESSES} worker processes, sharded by user id...")
+        run_cluster(
+            build_application, settings.WORKER_PROCESSES, prepare=prepare_database,
+            webhook_options=webhook_options() if settings.RUN_MODE == "webhook" else None,
+        )
+        return
+
+    application = build_application()
+
+    if settings.RUN_MODE == "webhook":
+        options = webhook_options()
+        logger.info(f"Bot is now listening for webhook updates on {settings.WEBHOOK_LISTEN}:{settings.WEBHOOK_PORT}...")
+        application.run_webhook(**options, allowed_updates=Update.ALL_TYPES)
+    else:
+        logger.info("Bot is now polling for updates...")
+        application.run_polling(allowed_updates=Update.ALL_TYPES)
 
 if __name__ == "__main__":
-    main()
+    main()
\ No newline at end of file
@@ -0,0 +1,35 @@
+# tabadex_bot/utils/activity.py
+
+import datetime
+
+from ..config import logger
+from ..database import crud
+from ..database.session import AsyncSessionLocal
+
+
+class ActivityTracker:
+    """
+    Remembers which users sent updates and writes their `last_seen_at` in one batched UPDATE
+    per interval (the scheduler's activity-flush job), so activity tracking costs no per-update database work.
+    """
+    FLUSH_INTERVAL_SECONDS = 60
+
+    def __init__(self):
+        self._seen: set[int] = set()
+
+    def touch(self, user_id: int):
+        self._seen.add(user_id)
+
+    async def flush(self):
+        if not self._seen:
+            return
+        user_ids, self._seen = self._seen, set()
+        try:
+            async with AsyncSessionLocal() as session:
+                await crud.mark_users_seen(session, list(user_ids), datetime.datetime.now(datetime.timezone.utc))
+        except Exception as e:
+            logger.error(f"Failed to record activity of {len(user_ids)} users: {e}")
+            self._seen |= user_ids
+
+
+activity_tracker = ActivityTracker()
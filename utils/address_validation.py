@@ -0,0 +1,237 @@
+# tabadex_bot/utils/address_validation.py
+
+import hashlib
+import re
+from collections import OrderedDict
+from typing import Callable, Iterable
+
+from ..config import settings
+from .metrics import metrics
+
+# --- Base58 / Base58Check ---
+BITCOIN_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+RIPPLE_ALPHABET = "rpshnaf39wBUDNEGHJKLM4PQRST7VWXYZ2bcdeCg65jkm8oFqi1tuvAxyz"
+_BASE58_INDEXES = {alphabet: {char: index for index, char in enumerate(alphabet)} for alphabet in (BITCOIN_ALPHABET, RIPPLE_ALPHABET)}
+
+
+def base58_decode(text: str, alphabet: str = BITCOIN_ALPHABET) -> bytes | None:
+    indexes = _BASE58_INDEXES[alphabet]
+    number = 0
+    for char in text:
+        index = indexes.get(char)
+        if index is None:
+            return None
+        number = number * 58 + index
+    body = number.to_bytes((number.bit_length() + 7) // 8, "big")
+    leading_zeros = len(text) - len(text.lstrip(alphabet[0]))
+    return b"\x00" * leading_zeros + body
+
+def base58check_decode(text: str, alphabet: str = BITCOIN_ALPHABET) -> bytes | None:
+    """The payload (version byte included) if the 4-byte double-SHA256 checksum matches."""
+    raw = base58_decode(text, alphabet)
+    if raw is None or len(raw) < 5:
+        return None
+    payload, checksum = raw[:-4], raw[-4:]
+    if hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4] != checksum:
+        return None
+    return payload
+
+
+# --- Bech32 / Bech32m (BIP-173, BIP-350) ---
+_BECH32_CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+_BECH32_INDEXES = {char: index for index, char in enumerate(_BECH32_CHARSET)}
+_BECH32_CONST, _BECH32M_CONST = 1, 0x2BC830A3
+
+
+def _bech32_polymod(values: Iterable[int]) -> int:
+    generator = (0x3B6A57B2, 0x26508E6D, 0x1EA119FA, 0x3D4233DD, 0x2A1462B3)
+    checksum = 1
+    for value in values:
+        top = checksum >> 25
+        checksum = (checksum & 0x1FFFFFF) << 5 ^ value
+        for i in range(5):
+            checksum ^= generator[i] if (top >> i) & 1 else 0
+    return checksum
+
+def bech32_decode(text: str) -> tuple[str, list[int], int] | None:
+    """(hrp, data without checksum, checksum constant) of a well-formed bech32 or bech32m string."""
+    if len(text) > 90 or (text.lower() != text and text.upper() != text):
+        return None
+    text = text.lower()
+    separator = text.rfind("1")
+    if separator < 1 or separator + 7 > len(text):
+        return None
+    hrp = text[:separator]
+    data = [_BECH32_INDEXES.get(char) for char in text[separator + 1:]]
+    if None in data:
+        return None
+    expanded = [ord(char) >> 5 for char in hrp] + [0] + [ord(char) & 31 for char in hrp]
+    constant = _bech32_polymod(expanded + data)
+    if constant not in (_BECH32_CONST, _BECH32M_CONST):
+        return None
+    return hrp, data[:-6], constant
+
+def _convert_bits(data: list[int], from_bits: int, to_bits: int) -> bytes | None:
+    accumulator = bits = 0
+    result = bytearray()
+    for value in data:
+        accumulator = (accumulator << from_bits) | value
+        bits += from_bits
+        while bits >= to_bits:
+            bits -= to_bits
+            result.append((accumulator >> bits) & ((1 << to_bits) - 1))
+    if bits >= from_bits or (accumulator << (to_bits - bits)) & ((1 << to_bits) - 1):
+        return None
+    return bytes(result)
+
+def is_segwit_address(text: str, hrp: str) -> bool:
+    decoded = bech32_decode(text)
+    if decoded is None or decoded[0] != hrp or not decoded[1]:
+        return False
+    _, data, constant = decoded
+    version, program = data[0], _convert_bits(data[1:], 5, 8)
+    if version > 16 or program is None or not 2 <= len(program) <= 40:
+        return False
+    if version == 0:
+        return constant == _BECH32_CONST and len(program) in (20, 32)
+    return constant == _BECH32M_CONST
+
+
+# --- Keccak-256 (the pre-standard SHA-3 Ethereum uses; hashlib.sha3_256 pads differently) ---
+_KECCAK_ROUND_CONSTANTS = (
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+)
+_KECCAK_ROTATIONS = ((0, 36, 3, 41, 18), (1, 44, 10, 45, 2), (62, 6, 43, 15, 61), (28, 55, 25, 21, 56), (27, 20, 39, 8, 14))
+_MASK_64 = (1 << 64) - 1
+_KECCAK_RATE = 136
+
+
+def _rotate_left(value: int, shift: int) -> int:
+    return ((value << shift) | (value >> (64 - shift))) & _MASK_64 if shift else value
+
+def _keccak_f(state: list[int]) -> list[int]:
+    for round_constant in _KECCAK_ROUND_CONSTANTS:
+        columns = [state[x] ^ state[x + 5] ^ state[x + 10] ^ state[x + 15] ^ state[x + 20] for x in range(5)]
+        deltas = [columns[(x - 1) % 5] ^ _rotate_left(columns[(x + 1) % 5], 1) for x in range(5)]
+        state = [lane ^ deltas[i % 5] for i, lane in enumerate(state)]
+        moved = [0] * 25
+        for x in range(5):
+            for y in range(5):
+                moved[y + 5 * ((2 * x + 3 * y) % 5)] = _rotate_left(state[x + 5 * y], _KECCAK_ROTATIONS[x][y])
+        state = [
+            moved[x + 5 * y] ^ (~moved[(x + 1) % 5 + 5 * y] & moved[(x + 2) % 5 + 5 * y])
+            for y in range(5) for x in range(5)
+        ]
+        state[0] ^= round_constant
+    return state
+
+def keccak256(data: bytes) -> bytes:
+    padded = bytearray(data) + b"\x01" + b"\x00" * (-(len(data) + 1) % _KECCAK_RATE)
+    padded[-1] |= 0x80
+    state = [0] * 25
+    for offset in range(0, len(padded), _KECCAK_RATE):
+        block = padded[offset:offset + _KECCAK_RATE]
+        for i in range(_KECCAK_RATE // 8):
+            state[i] ^= int.from_bytes(block[i * 8:i * 8 + 8], "little")
+        state = _keccak_f(state)
+    return b"".join(lane.to_bytes(8, "little") for lane in state[:4])
+
+
+# --- Per-format validators ---
+_EVM_PATTERN = re.compile(r"^0x[0-9a-fA-F]{40}$")
+
+
+def is_evm_address(text: str) -> bool:
+    """0x + 40 hex digits; mixed-case addresses must carry a valid EIP-55 checksum."""
+    if not _EVM_PATTERN.match(text):
+        return False
+    digits = text[2:]
+    if digits.islower() or digits.isupper():
+        return True
+    digest = keccak256(digits.lower().encode()).hex()
+    return all(
+        char.isupper() == (int(nibble, 16) >= 8) for char, nibble in zip(digits, digest) if char.isalpha()
+    )
+
+def base58check_validator(versions: tuple[int, ...], payload_length: int = 21, alphabet: str = BITCOIN_ALPHABET) -> Callable[[str], bool]:
+    def validate(text: str) -> bool:
+        payload = base58check_decode(text, alphabet)
+        return payload is not None and len(payload) == payload_length and payload[0] in versions
+    return validate
+
+def segwit_validator(hrp: str) -> Callable[[str], bool]:
+    return lambda text: is_segwit_address(text, hrp)
+
+def any_of(*validators: Callable[[str], bool]) -> Callable[[str], bool]:
+    return lambda text: any(validator(text) for validator in validators)
+
+def is_solana_address(text: str) -> bool:
+    # Ed25519 public keys: 32 bytes, base58 without a checksum.
+    decoded = base58_decode(text) if 32 <= len(text) <= 44 else None
+    return decoded is not None and len(decoded) == 32
+
+
+class AddressValidatorRegistry:
+    """
+    Address format checks per network, run before any SwapZone call, so a mistyped address is
+    rejected at once instead of after a full /create round trip and its retries. Networks without
+    a registered validator are not checked (the API remains the judge for those). Verdicts are
+    cached per (network, address) in a bounded LRU.
+    """
+    def __init__(self, cache_size: int):
+        self.cache_size = cache_size
+        self._validators: dict[str, Callable[[str], bool]] = {}
+        self._verdicts: OrderedDict[tuple[str, str], bool] = OrderedDict()
+        self.rejected = 0
+
+    def register(self, networks: Iterable[str], validator: Callable[[str], bool]):
+        for network in networks:
+            self._validators[network.lower()] = validator
+
+    def validate(self, network: str, address: str) -> bool | None:
+        """True or False for a known network, None when the network has no validator."""
+        network = network.lower()
+        validator = self._validators.get(network)
+        if validator is None:
+            return None
+        key = (network, address)
+        verdict = self._verdicts.get(key)
+        if verdict is None:
+            verdict = self._verdicts[key] = validator(address)
+            if len(self._verdicts) > self.cache_size:
+                self._verdicts.popitem(last=False)
+        else:
+            self._verdicts.move_to_end(key)
+        if not verdict:
+            self.rejected += 1
+        return verdict
+
+    def is_acceptable(self, networks: Iterable[str], address: str) -> bool:
+        """For a currency on several networks (e.g. a saved address): False only if every network rejects it."""
+        verdicts = [self.validate(network, address) for network in networks]
+        return not verdicts or any(verdict is not False for verdict in verdicts)
+
+
+address_validators = AddressValidatorRegistry(settings.ADDRESS_CACHE_SIZE)
+address_validators.register(
+    ("btc", "bitcoin"), any_of(base58check_validator((0x00, 0x05)), segwit_validator("bc"))
+)
+address_validators.register(
+    ("ltc", "litecoin"), any_of(base58check_validator((0x30, 0x32, 0x05)), segwit_validator("ltc"))
+)
+address_validators.register(("doge", "dogecoin"), base58check_validator((0x1E, 0x16)))
+address_validators.register(("trx", "tron", "trc20"), base58check_validator((0x41,)))
+address_validators.register(("xrp", "ripple"), base58check_validator((0x00,), alphabet=RIPPLE_ALPHABET))
+address_validators.register(("sol", "solana", "spl"), is_solana_address)
+address_validators.register(
+    ("eth", "ethereum", "erc20", "bsc", "bep20", "polygon", "matic", "arbitrum", "optimism", "base", "avaxc"),
+    is_evm_address,
+)
+metrics.collector(
+    "tabadex_address_rejected_total", "Addresses rejected by the local format check.", lambda: address_validators.rejected, "counter"
+)
@@ -0,0 +1,32 @@
+# tabadex_bot/utils/app_settings.py
+
+from ..config import logger
+from .sharding import cluster_bus
+
+
+class AppSettingsCache:
+    """
+    In-memory copy of the app_settings table (e.g. the markup), read on every exchange preview.
+    Loaded at startup; whoever calls crud.set_setting calls apply_change. Reading a setting is a dict lookup.
+    """
+    def __init__(self):
+        self._values: dict[str, str] = {}
+
+    def replace(self, values: dict[str, str]):
+        self._values = dict(values)
+        logger.info(f"App settings loaded: {len(self._values)} keys")
+
+    def set(self, key: str, value: str):
+        self._values[key] = value
+
+    def apply_change(self, key: str, value: str):
+        """Applies a change committed to the database here and relays it to the other workers."""
+        self.set(key, value)
+        cluster_bus.publish("setting", (key, value))
+
+    def get(self, key: str, default: str | None = None) -> str | None:
+        return self._values.get(key, default)
+
+
+app_settings = AppSettingsCache()
+cluster_bus.on("setting", lambda change: app_settings.set(*change))
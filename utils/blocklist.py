@@ -0,0 +1,42 @@
+# tabadex_bot/utils/blocklist.py
+
+from ..config import logger
+from .sharding import cluster_bus
+from .metrics import metrics
+
+
+class Blocklist:
+    """
+    In-memory copy of the users blocked by admins, so their updates are rejected with one set lookup
+    before any session is opened. Loaded at startup; whoever changes users.is_blocked calls apply_change.
+    """
+    def __init__(self):
+        self._blocked: set[int] = set()
+        self.rejected = 0
+
+    def replace(self, user_ids):
+        self._blocked = set(user_ids)
+        logger.info(f"Blocklist loaded: {len(self._blocked)} blocked users")
+
+    def set_blocked(self, user_id: int, is_blocked: bool):
+        if is_blocked:
+            self._blocked.add(user_id)
+        else:
+            self._blocked.discard(user_id)
+
+    def apply_change(self, user_id: int, is_blocked: bool):
+        """Applies a change committed to the database here and relays it to the other workers."""
+        self.set_blocked(user_id, is_blocked)
+        cluster_bus.publish("blocklist", (user_id, is_blocked))
+
+    def is_blocked(self, user_id: int) -> bool:
+        return user_id in self._blocked
+
+    def __len__(self) -> int:
+        return len(self._blocked)
+
+
+blocklist = Blocklist()
+cluster_bus.on("blocklist", lambda change: blocklist.set_blocked(*change))
+metrics.collector("tabadex_blocklist_rejected_total", "Updates rejected from blocked users.", lambda: blocklist.rejected, "counter")
+metrics.collector("tabadex_blocklist_size", "Blocked users.", lambda: len(blocklist))
@@ -0,0 +1,287 @@
+# tabadex_bot/utils/broadcaster.py
+
+import asyncio
+import datetime
+from collections import deque
+
+from telegram import Message
+from telegram.error import BadRequest, RetryAfter, TimedOut
+from telegram.ext import Application
+
+from ..config import logger, settings
+from ..database import crud
+from ..database.models import BroadcastJob, BroadcastStatus
+from ..database.session import AsyncSessionLocal
+from ..keyboards import get_broadcast_progress_keyboard
+from ..locales import get_text
+from .delivery_feedback import delivery_feedback
+from .leader import leader_lease
+from .rate_limit import TokenBucket
+from .sharding import cluster_bus
+from .metrics import metrics
+from .logging_setup import SAMPLED
+from .scheduler import scheduler
+
+RESUMABLE_STATUSES = [BroadcastStatus.PENDING, BroadcastStatus.RUNNING]
+
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    retry_after = error.retry_after
+    return retry_after.total_seconds() if isinstance(retry_after, datetime.timedelta) else float(retry_after)
+
+
+class _JobProgress:
+    """In-memory progress of a running job, with a low-watermark cursor over completed user ids."""
+    def __init__(self, job: BroadcastJob):
+        self.total = job.total_count
+        self.success = job.success_count
+        self.failure = job.failure_count
+        self.cursor = job.cursor_user_id
+        self._in_flight: deque[int] = deque()
+        self._completed: set[int] = set()
+
+    @property
+    def done(self) -> int:
+        return self.success + self.failure
+
+    @property
+    def queued(self) -> int:
+        return len(self._in_flight)
+
+    def enqueue(self, user_id: int):
+        self._in_flight.append(user_id)
+
+    def complete(self, user_id: int, delivered: bool):
+        if delivered:
+            self.success += 1
+        else:
+            self.failure += 1
+        self._completed.add(user_id)
+        # Only advance the cursor over a contiguous prefix, so a restart never skips a recipient.
+        while self._in_flight and self._in_flight[0] in self._completed:
+            self.cursor = self._in_flight.popleft()
+            self._completed.discard(self.cursor)
+
+
+class BroadcastEngine:
+    """
+    Sends broadcasts with bounded concurrency under one global messages-per-second token bucket.
+    Jobs and their keyset cursors live in the database, so a restart resumes where it stopped.
+    A running job is owned by one process, which heartbeats it with every progress flush; the leader
+    periodically resumes jobs whose heartbeat went stale (their process died or hung).
+    """
+    FETCH_BATCH_SIZE = 500
+    PROGRESS_INTERVAL_SECONDS = 3
+    MAX_SEND_ATTEMPTS = 3
+    HEARTBEAT_TIMEOUT_SECONDS = 60
+    RESUME_INTERVAL_SECONDS = 30
+
+    def __init__(self, rate_per_second: float, concurrency: int):
+        self.bucket = TokenBucket(rate_per_second)
+        self.concurrency = concurrency
+        self._tasks: dict[int, asyncio.Task] = {}
+        self._progress: dict[int, _JobProgress] = {}
+
+    @property
+    def queue_depth(self) -> int:
+        """Recipients still waiting to be sent across all running jobs."""
+        return sum(max(0, p.total - p.done) for p in self._progress.values())
+
+    @property
+    def owner(self) -> str:
+        # The leader lease holder id: unique per process, so a restarted process never mistakes the old one's jobs for its own.
+        return leader_lease.holder
+
+    def _stale_before(self) -> datetime.datetime:
+        return datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=self.HEARTBEAT_TIMEOUT_SECONDS)
+
+    async def start(
+        self, app: Application, admin_id: int, message: Message, lang: str,
+        language: str | None = None, active_since: datetime.datetime | None = None
+    ) -> int:
+        async with AsyncSessionLocal() as session:
+            total = await crud.count_broadcast_recipients(session, language=language, active_since=active_since)
+            job = await crud.create_broadcast_job(
+                session, admin_id=admin_id, from_chat_id=message.chat_id,
+                message_id=message.message_id, lang=lang, total_count=total,
+                segment_language=language, segment_active_since=active_since, owner=self.owner
+            )
+        self._spawn(app, job.id)
+        return job.id
+
+    async def resume_stale(self, app: Application):
+        """Resumes unfinished jobs nobody heartbeats anymore. Runs as a singleton job; claiming in _run keeps it safe anyway."""
+        async with AsyncSessionLocal() as session:
+            jobs = await crud.get_stale_broadcast_jobs(session, self._stale_before())
+        for job in jobs:
+            if job.id in self._tasks:
+                continue
+            logger.info(f"Resuming broadcast {job.id} after user {job.cursor_user_id} ({job.success_count + job.failure_count}/{job.total_count} done)")
+            self._spawn(app, job.id)
+
+    async def cancel(self, job_id: int) -> bool:
+        async with AsyncSessionLocal() as session:
+            canceled = await crud.update_broadcast_job(
+                session, job_id, only_if_status=RESUMABLE_STATUSES,
+                status=BroadcastStatus.CANCELED, finished_at=datetime.datetime.now(datetime.timezone.utc)
+            )
+        self._cancel_task(job_id)
+        # The job may be running in another worker process (e.g. resumed by worker 0 after a restart).
+        cluster_bus.publish("broadcast_cancel", job_id)
+        return canceled
+
+    def _cancel_task(self, job_id: int):
+        task = self._tasks.get(job_id)
+        if task:
+            task.cancel()
+
+    async def shutdown(self):
+        """Stops running jobs; their cursors are flushed and they are released, so the leader resumes them right away."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if not tasks:
+            return
+        try:
+            async with AsyncSessionLocal() as session:
+                await crud.release_broadcast_jobs(session, self.owner)
+        except Exception as e:
+            logger.error(f"Failed to release broadcast jobs: {e}")
+
+    def _spawn(self, app: Application, job_id: int):
+        if job_id in self._tasks:
+            return
+        task = scheduler.spawn(f"broadcast-{job_id}", self._run(app, job_id), kind="broadcast")
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def _run(self, app: Application, job_id: int):
+        async with AsyncSessionLocal() as session:
+            # Finished, canceled, or running in another process that still heartbeats it.
+            if not await crud.claim_broadcast_job(session, job_id, self.owner, self._stale_before()):
+                return
+            job = await crud.get_broadcast_job(session, job_id)
+
+        progress = self._progress[job_id] = _JobProgress(job)
+        if job.progress_message_id is None:
+            sent = await app.bot.send_message(
+                job.admin_id, self._progress_text(job, progress),
+                reply_markup=get_broadcast_progress_keyboard(job.lang, job.id)
+            )
+            job.progress_message_id = sent.message_id
+            async with AsyncSessionLocal() as session:
+                await crud.update_broadcast_job(session, job_id, progress_message_id=sent.message_id)
+
+        queue: asyncio.Queue[int | None] = asyncio.Queue(maxsize=self.concurrency * 4)
+        workers = [asyncio.create_task(self._worker(app, job, progress, queue)) for _ in range(self.concurrency)]
+        reporter = asyncio.create_task(self._report_progress(app, job, progress))
+        try:
+            after_user_id = job.cursor_user_id
+            while True:
+                async with AsyncSessionLocal() as session:
+                    user_ids = await crud.get_broadcast_recipient_ids_after(
+                        session, after_user_id, self.FETCH_BATCH_SIZE,
+                        language=job.segment_language, active_since=job.segment_active_since
+                    )
+                if not user_ids:
+                    break
+                for user_id in user_ids:
+                    progress.enqueue(user_id)
+                    await queue.put(user_id)
+                after_user_id = user_ids[-1]
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            reporter.cancel()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(reporter, *workers, return_exceptions=True)
+            await asyncio.shield(self._flush(job_id, progress))
+            self._progress.pop(job_id, None)
+
+        async with AsyncSessionLocal() as session:
+            await crud.update_broadcast_job(
+                session, job_id, only_if_status=[BroadcastStatus.RUNNING],
+                status=BroadcastStatus.COMPLETED, finished_at=datetime.datetime.now(datetime.timezone.utc)
+            )
+        await self._edit_progress(app, job, get_text("broadcast_finished", job.lang).format(
+            success_count=progress.success, failure_count=progress.failure
+        ), final=True)
+        logger.info(f"Broadcast {job_id} finished: {progress.success} sent, {progress.failure} failed")
+
+    async def _worker(self, app: Application, job: BroadcastJob, progress: _JobProgress, queue: asyncio.Queue):
+        while True:
+            user_id = await queue.get()
+            if user_id is None:
+                return
+            progress.complete(user_id, await self._send(app, job, user_id))
+
+    async def _send(self, app: Application, job: BroadcastJob, user_id: int) -> bool:
+        for attempt in range(1, self.MAX_SEND_ATTEMPTS + 1):
+            await self.bucket.acquire()
+            try:
+                await app.bot.copy_message(chat_id=user_id, from_chat_id=job.from_chat_id, message_id=job.message_id)
+                return True
+            except RetryAfter as e:
+                delay = _retry_after_seconds(e)
+                logger.warning(f"Broadcast {job.id}: flood limit hit, pausing all sends for {delay}s")
+                self.bucket.pause(delay)
+            except TimedOut:
+                logger.warning(f"Broadcast {job.id}: timed out sending to {user_id}, attempt {attempt}/{self.MAX_SEND_ATTEMPTS}")
+            except Exception as e:
+                if delivery_feedback.report(user_id, e):
+                    logger.info("Broadcast %s: user %s is unreachable (%s)", job.id, user_id, e, extra=SAMPLED)
+                else:
+                    logger.warning(f"Broadcast {job.id} failed for user {user_id}: {e}")
+                return False
+        return False
+
+    async def _report_progress(self, app: Application, job: BroadcastJob, progress: _JobProgress):
+        while True:
+            await asyncio.sleep(self.PROGRESS_INTERVAL_SECONDS)
+            if not await self._flush(job.id, progress):
+                logger.warning(f"Broadcast {job.id} was taken over by another process; stopping here")
+                self._cancel_task(job.id)
+                return
+            await self._edit_progress(app, job, self._progress_text(job, progress))
+
+    async def _flush(self, job_id: int, progress: _JobProgress) -> bool:
+        """Persists progress and heartbeats the job; False once another process owns it."""
+        try:
+            async with AsyncSessionLocal() as session:
+                return await crud.update_broadcast_job(
+                    session, job_id, only_if_owner=self.owner, cursor_user_id=progress.cursor,
+                    success_count=progress.success, failure_count=progress.failure,
+                    heartbeat_at=datetime.datetime.now(datetime.timezone.utc)
+                )
+        except Exception as e:
+            logger.error(f"Failed to persist progress of broadcast {job_id}: {e}")
+            return True
+
+    async def _edit_progress(self, app: Application, job: BroadcastJob, text: str, final: bool = False):
+        if job.progress_message_id is None:
+            return
+        try:
+            await app.bot.edit_message_text(
+                text, chat_id=job.admin_id, message_id=job.progress_message_id,
+                reply_markup=None if final else get_broadcast_progress_keyboard(job.lang, job.id)
+            )
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                logger.warning(f"Could not update progress of broadcast {job.id}: {e}")
+        except Exception as e:
+            logger.warning(f"Could not update progress of broadcast {job.id}: {e}")
+
+    @staticmethod
+    def _progress_text(job: BroadcastJob, progress: _JobProgress) -> str:
+        return (
+            get_text("broadcast_started", job.lang).format(user_count=progress.total)
+            + f"\n\n⏳ {progress.done}/{progress.total}   ✅ {progress.success}   ❌ {progress.failure}"
+        )
+
+
+broadcast_engine = BroadcastEngine(rate_per_second=settings.BROADCAST_RATE_PER_SECOND, concurrency=settings.BROADCAST_CONCURRENCY)
+cluster_bus.on("broadcast_cancel", broadcast_engine._cancel_task)
+metrics.collector("tabadex_broadcast_queue_depth", "Broadcast recipients still waiting to be sent.", lambda: broadcast_engine.queue_depth)
@@ -0,0 +1,132 @@
+# tabadex_bot/utils/callback_router.py
+
+from typing import Any, Awaitable, Callable, NamedTuple
+
+from telegram import Update
+from telegram.ext import Application, BaseHandler
+
+# Callback data is "<prefix>_<arg>_<arg>...": prefix segments and arguments share one separator, and the
+# last argument takes whatever is left, so it may itself contain separators (e.g. order ids).
+SEPARATOR = "_"
+MAX_CALLBACK_DATA_BYTES = 64  # Telegram's limit for InlineKeyboardButton.callback_data
+
+
+class CallbackDataError(ValueError):
+    """Raised when arguments cannot be packed into valid callback data."""
+
+
+def pack_callback_data(prefix: str, *args: Any) -> str:
+    """Builds callback data for a route; the inverse of what CallbackRouter.match parses."""
+    fields = [str(arg) for arg in args]
+    if any(SEPARATOR in field for field in fields[:-1]):
+        raise CallbackDataError(f"Only the last argument of '{prefix}' may contain '{SEPARATOR}': {fields}")
+    data = SEPARATOR.join((prefix, *fields))
+    if len(data.encode("utf-8")) > MAX_CALLBACK_DATA_BYTES:
+        raise CallbackDataError(f"Callback data '{data}' is longer than {MAX_CALLBACK_DATA_BYTES} bytes")
+    return data
+
+
+class CallbackRoute:
+    """`prefix` followed by exactly one field per type in `arg_types`; no types means the data must equal the prefix."""
+    __slots__ = ("prefix", "callback", "arg_types")
+
+    def __init__(self, prefix: str, callback: Callable[..., Awaitable[Any]], *arg_types: Callable[[str], Any]):
+        self.prefix = prefix
+        self.callback = callback
+        self.arg_types = arg_types
+
+    def __repr__(self) -> str:
+        return f"CallbackRoute({self.prefix!r}, {getattr(self.callback, '__name__', self.callback)}, {len(self.arg_types)} args)"
+
+
+class CallbackMatch(NamedTuple):
+    route: CallbackRoute
+    args: tuple
+
+
+class _TrieNode:
+    __slots__ = ("children", "exact", "parametric")
+
+    def __init__(self):
+        self.children: dict[str, _TrieNode] = {}
+        self.exact: CallbackRoute | None = None
+        self.parametric: CallbackRoute | None = None
+
+
+class CallbackRouter:
+    """
+    Compiles route prefixes into a trie keyed by separator-delimited segments. Matching splits the data
+    once, walks at most one node per segment and tries the longest matching prefix first, so the cost
+    does not grow with the number of routes. Arguments are converted with the route's types; data whose
+    arguments fail to convert does not match.
+    """
+    def __init__(self, *routes: CallbackRoute):
+        self._root = _TrieNode()
+        self.routes: list[CallbackRoute] = []
+        for route in routes:
+            self.add(route)
+
+    def add(self, route: CallbackRoute):
+        node = self._root
+        for segment in route.prefix.split(SEPARATOR):
+            node = node.children.setdefault(segment, _TrieNode())
+        slot = "parametric" if route.arg_types else "exact"
+        existing = getattr(node, slot)
+        if existing is not None:
+            raise ValueError(f"Callback prefix '{route.prefix}' is already routed to {existing}")
+        setattr(node, slot, route)
+        self.routes.append(route)
+
+    def match(self, data: str) -> CallbackMatch | None:
+        fields = data.split(SEPARATOR)
+        node = self._root
+        candidates = []
+        for depth, field in enumerate(fields, start=1):
+            node = node.children.get(field)
+            if node is None:
+                break
+            if node.exact or node.parametric:
+                candidates.append((depth, node))
+
+        for depth, node in reversed(candidates):
+            rest = fields[depth:]
+            if not rest:
+                if node.exact:
+                    return CallbackMatch(node.exact, ())
+                continue
+            route = node.parametric
+            if route is None or len(rest) < len(route.arg_types):
+                continue
+            last = len(route.arg_types) - 1
+            raw = rest[:last] + [SEPARATOR.join(rest[last:])]
+            try:
+                return CallbackMatch(route, tuple(convert(value) for convert, value in zip(route.arg_types, raw)))
+            except ValueError:
+                continue
+        return None
+
+    async def dispatch(self, match: CallbackMatch, update: Update, context) -> Any:
+        """Runs a matched route's callback with its typed arguments as `context.args`."""
+        context.args = list(match.args)
+        return await match.route.callback(update, context)
+
+
+class CallbackRouterHandler(BaseHandler[Update, Any, Any]):
+    """
+    A single handler for every routed callback query. The typed arguments are passed to the route's
+    callback as `context.args`.
+    """
+    __slots__ = ("router",)
+
+    def __init__(self, router: CallbackRouter, block: bool = True):
+        # BaseHandler's callback is never called directly: handle_update passes the match from check_update to the router.
+        super().__init__(router.dispatch, block=block)
+        self.router = router
+
+    def check_update(self, update: object) -> CallbackMatch | None:
+        if isinstance(update, Update) and update.callback_query and isinstance(update.callback_query.data, str):
+            return self.router.match(update.callback_query.data)
+        return None
+
+    async def handle_update(self, update: Update, application: Application, check_result: CallbackMatch, context) -> Any:
+        return await self.router.dispatch(check_result, update, context)
@@ -4,18 +4,14 @@ from functools import wraps
 from telegram import Update
 from telegram.ext import ContextTypes
 
-from ..config import settings
 from ..locales import get_text
+from .roles import role_registry
 
-def admin_required(func):
-    """
-    دکوریتوری برای محدود کردن دسترسی به هندلرها فقط برای کاربران ادمین.
-    این دکوریتور بررسی می‌کند که آیا آیدی کاربر در لیست ADMIN_IDS تعریف شده در کانفیگ وجود دارد یا خیر.
-    """
+def _require_membership(get_members, func):
     @wraps(func)
     async def wrapped(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
         user_id = update.effective_user.id
-        if user_id not in settings.ADMIN_ID_SET:
+        if user_id not in get_members():
             lang = context.user_data.get('lang', 'fa')
             # اگر آپدیت از نوع کلیک روی دکمه بود، با یک پیام به آن پاسخ می‌دهیم
             if update.callback_query:
@@ -28,4 +24,15 @@ def admin_required(func):
         
         # اگر کاربر ادمین بود، هندلر اصلی را اجرا می‌کنیم
         return await func(update, context, *args, **kwargs)
-    return wrapped
\ No newline at end of file
+    return wrapped
+
+def admin_required(func):
+    """
+    دکوریتوری برای محدود کردن دسترسی به هندلرها فقط برای کاربران ادمین.
+    نقش‌ها از دیتابیس خوانده شده و در حافظه نگه داشته می‌شوند؛ بررسی فقط یک جستجو در مجموعه است.
+    """
+    return _require_membership(lambda: role_registry.admins, func)
+
+def staff_required(func):
+    """Like admin_required, but also lets support agents through (ticket handling)."""
+    return _require_membership(lambda: role_registry.staff, func)
\ No newline at end of file
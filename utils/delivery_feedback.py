@@ -0,0 +1,68 @@
+# tabadex_bot/utils/delivery_feedback.py
+
+from telegram.error import BadRequest, Forbidden
+
+from ..config import logger
+from ..database import crud
+from ..database.session import AsyncSessionLocal
+from .scheduler import scheduler
+
+# BadRequest descriptions that mean the chat is gone for good, as opposed to a bad message.
+UNREACHABLE_DESCRIPTIONS = (
+    "chat not found",
+    "user not found",
+    "user is deactivated",
+    "peer_id_invalid",
+    "bot can't initiate conversation",
+)
+
+
+def is_unreachable_error(error: Exception) -> bool:
+    """True when a send failed because the recipient can never be reached (blocked bot, deleted account, ...)."""
+    if isinstance(error, Forbidden):
+        return True
+    if isinstance(error, BadRequest):
+        description = str(error).lower()
+        return any(marker in description for marker in UNREACHABLE_DESCRIPTIONS)
+    return False
+
+
+class DeliveryFeedback:
+    """
+    Collects recipients whose sends failed permanently and flags them as unreachable in batched
+    UPDATEs (the scheduler's delivery-feedback job, or sooner once FLUSH_THRESHOLD users are pending),
+    so recipient queries stop spending API calls and rate-limit budget on them.
+    Users are flagged reachable again as soon as they send the bot an update.
+    """
+    FLUSH_INTERVAL_SECONDS = 10
+    FLUSH_THRESHOLD = 500
+
+    def __init__(self):
+        self._unreachable: set[int] = set()
+        self._flush_task = None
+        self.flagged_total = 0
+
+    def report(self, user_id: int, error: Exception) -> bool:
+        """Records a failed send. Returns True if the user was classified as unreachable."""
+        if not is_unreachable_error(error):
+            return False
+        self._unreachable.add(user_id)
+        if len(self._unreachable) >= self.FLUSH_THRESHOLD and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = scheduler.spawn("delivery-feedback-flush", self.flush())
+        return True
+
+    async def flush(self):
+        if not self._unreachable:
+            return
+        user_ids, self._unreachable = self._unreachable, set()
+        try:
+            async with AsyncSessionLocal() as session:
+                await crud.mark_users_unreachable(session, list(user_ids))
+            self.flagged_total += len(user_ids)
+            logger.info(f"Flagged {len(user_ids)} users as unreachable")
+        except Exception as e:
+            logger.error(f"Failed to flag {len(user_ids)} unreachable users: {e}")
+            self._unreachable |= user_ids
+
+
+delivery_feedback = DeliveryFeedback()
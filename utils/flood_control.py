@@ -0,0 +1,95 @@
+# tabadex_bot/utils/flood_control.py
+
+import time
+from collections import Counter
+
+from telegram import Update
+
+from ..config import logger, settings
+from .rate_limit import TokenBucket
+from .roles import role_registry
+from .metrics import metrics
+
+
+def update_kind(update: Update) -> str:
+    if update.callback_query:
+        return "callback_query"
+    if update.message or update.edited_message:
+        return "message"
+    return "other"
+
+
+class FloodControl:
+    """
+    Per-user token buckets, one per update kind, checked before any database or API work.
+    Updates over the limit are dropped, and repeated presses of the same button within the
+    debounce window are dropped even when the bucket has room (double taps, impatient re-clicks).
+    Idle buckets are pruned so memory stays proportional to the users currently active.
+    """
+    PRUNE_EVERY = 1000
+
+    def __init__(self, limits: dict[str, tuple[float, float]], callback_debounce_seconds: float, exempt_user_ids=frozenset()):
+        self.limits = limits
+        self.callback_debounce_seconds = callback_debounce_seconds
+        self.exempt_user_ids = exempt_user_ids
+        self._buckets: dict[tuple[int, str], TokenBucket] = {}
+        self._last_callback: dict[int, tuple[str, float]] = {}
+        self._throttled: set[tuple[int, str]] = set()
+        self._checks = 0
+        self.dropped: Counter[str] = Counter()
+        self.debounced = 0
+
+    def allow(self, update: Update) -> bool:
+        user = update.effective_user
+        if user is None or user.id in self.exempt_user_ids:
+            return True
+        kind = update_kind(update)
+        self._checks += 1
+        if self._checks % self.PRUNE_EVERY == 0:
+            self._prune()
+
+        if kind == "callback_query" and self._is_repeat_press(user.id, update.callback_query.data):
+            self.debounced += 1
+            return False
+
+        limit = self.limits.get(kind)
+        if limit is None:
+            return True
+        bucket = self._buckets.get((user.id, kind))
+        if bucket is None:
+            bucket = self._buckets[(user.id, kind)] = TokenBucket(*limit)
+        if bucket.try_acquire():
+            self._throttled.discard((user.id, kind))
+            return True
+
+        self.dropped[kind] += 1
+        if (user.id, kind) not in self._throttled:
+            self._throttled.add((user.id, kind))
+            logger.warning(f"Throttling user {user.id}: {kind} updates over {limit[0]}/s (burst {limit[1]})")
+        return False
+
+    def _is_repeat_press(self, user_id: int, data: str | None) -> bool:
+        now = time.monotonic()
+        last = self._last_callback.get(user_id)
+        self._last_callback[user_id] = (data, now)
+        return last is not None and last[0] == data and now - last[1] < self.callback_debounce_seconds
+
+    def _prune(self):
+        for key in [key for key, bucket in self._buckets.items() if bucket.is_full()]:
+            del self._buckets[key]
+        self._throttled &= self._buckets.keys()
+        cutoff = time.monotonic() - self.callback_debounce_seconds
+        for user_id in [user_id for user_id, (_, pressed_at) in self._last_callback.items() if pressed_at < cutoff]:
+            del self._last_callback[user_id]
+
+
+flood_control = FloodControl(
+    limits={
+        "message": (settings.FLOOD_MESSAGE_RATE, settings.FLOOD_MESSAGE_BURST),
+        "callback_query": (settings.FLOOD_CALLBACK_RATE, settings.FLOOD_CALLBACK_BURST),
+    },
+    callback_debounce_seconds=settings.FLOOD_CALLBACK_DEBOUNCE_SECONDS,
+)
+role_registry.subscribe(lambda roles: setattr(flood_control, "exempt_user_ids", roles.admins))
+metrics.collector("tabadex_flood_dropped_total", "Updates dropped by flood control.", lambda: dict(flood_control.dropped), "counter", ("kind",))
+metrics.collector("tabadex_flood_debounced_total", "Repeated button presses dropped.", lambda: flood_control.debounced, "counter")
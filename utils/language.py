@@ -0,0 +1,72 @@
+# tabadex_bot/utils/language.py
+
+import datetime
+from collections import OrderedDict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import logger, settings
+from ..database import crud
+from .sharding import cluster_bus
+from .metrics import metrics
+
+DEFAULT_LANGUAGE = "fa"
+
+
+class LanguageResolver:
+    """
+    Bounded LRU of user id -> language, so the language chosen with /start survives restarts
+    without a database query per update. Recently active users are preloaded at startup, anyone
+    else costs one small query on first contact, and set_language_and_show_menu writes through.
+    """
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._languages: OrderedDict[int, str] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _store(self, user_id: int, language: str):
+        self._languages[user_id] = language
+        self._languages.move_to_end(user_id)
+        if len(self._languages) > self.max_size:
+            self._languages.popitem(last=False)
+
+    def set(self, user_id: int, language: str):
+        self._store(user_id, language)
+
+    def get(self, user_id: int) -> str | None:
+        language = self._languages.get(user_id)
+        if language is not None:
+            self._languages.move_to_end(user_id)
+        return language
+
+    async def resolve(self, session: AsyncSession, user_id: int) -> str:
+        language = self.get(user_id)
+        if language is not None:
+            self.hits += 1
+            return language
+        self.misses += 1
+        language = await crud.get_user_language(session, user_id) or DEFAULT_LANGUAGE
+        self._store(user_id, language)
+        return language
+
+    async def preload(self, session: AsyncSession, active_days: int):
+        since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=active_days)
+        languages = await crud.get_recent_user_languages(session, since, limit=self.max_size)
+        if cluster_bus.worker_count > 1:
+            # Only this worker's share of the users will ever reach it.
+            languages = [row for row in languages if row[0] % cluster_bus.worker_count == cluster_bus.worker_index]
+        # Most recently active last, so they are the last to be evicted.
+        for user_id, language in reversed(languages):
+            self._store(user_id, language or DEFAULT_LANGUAGE)
+        logger.info(f"Preloaded the language of {len(languages)} users active in the last {active_days} days")
+
+    def __len__(self) -> int:
+        return len(self._languages)
+
+
+language_resolver = LanguageResolver(settings.LANGUAGE_CACHE_SIZE)
+metrics.collector(
+    "tabadex_language_cache_total", "Language lookups by outcome.",
+    lambda: {"hit": language_resolver.hits, "miss": language_resolver.misses}, "counter", ("outcome",),
+)
@@ -0,0 +1,60 @@
+# tabadex_bot/utils/leader.py
+
+import os
+import socket
+import uuid
+
+from ..config import logger, settings
+from ..database import crud
+from ..database.session import AsyncSessionLocal
+from .metrics import metrics
+from .sharding import cluster_bus
+
+
+class LeaderLease:
+    """
+    Leader election through a row in scheduler_leases: the holder renews it every ttl/3 seconds,
+    and another process takes it over only after it has expired. Renewal is a single UPDATE, so
+    it works the same on every backend and across hosts sharing the database.
+    """
+    def __init__(self, name: str, ttl_seconds: float):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.is_leader = False
+        self._nonce = uuid.uuid4().hex[:8]
+
+    @property
+    def holder(self) -> str:
+        # Unique per process: two processes with the same host and worker index (a restart overlapping the old
+        # process, two single-process instances) must not both match the holder. Leases are released on shutdown.
+        return f"{socket.gethostname()}:worker-{cluster_bus.worker_index}:{os.getpid()}-{self._nonce}"
+
+    @property
+    def renew_interval(self) -> float:
+        return self.ttl_seconds / 3
+
+    async def renew(self):
+        try:
+            async with AsyncSessionLocal() as session:
+                leader = await crud.acquire_lease(session, self.name, self.holder, self.ttl_seconds)
+        except Exception as e:
+            # Without a renewal the lease may be taken over, so singleton jobs stop here first.
+            logger.error(f"Could not renew the '{self.name}' lease: {e}")
+            leader = False
+        if leader != self.is_leader:
+            logger.info(f"{'Acquired' if leader else 'Lost'} the '{self.name}' lease as {self.holder}")
+        self.is_leader = leader
+
+    async def release(self):
+        if not self.is_leader:
+            return
+        self.is_leader = False
+        try:
+            async with AsyncSessionLocal() as session:
+                await crud.release_lease(session, self.name, self.holder)
+        except Exception as e:
+            logger.error(f"Could not release the '{self.name}' lease: {e}")
+
+
+leader_lease = LeaderLease("scheduler", settings.SCHEDULER_LEASE_SECONDS)
+metrics.collector("tabadex_scheduler_leader", "1 while this process runs the singleton jobs.", lambda: int(leader_lease.is_leader))
@@ -0,0 +1,105 @@
+# tabadex_bot/utils/logging_setup.py
+
+import atexit
+import json
+import logging
+import logging.handlers
+import multiprocessing
+import queue
+import random
+from datetime import datetime, timezone
+
+# Pass as `extra=` on high-volume info logs (per-request payloads); they are kept at LOG_SAMPLE_RATE.
+SAMPLED = {"sampled": True}
+
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra=` fields are included as top-level keys."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.processName,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key != "sampled":
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a `rate` share of INFO and lower records marked with SAMPLED; everything else passes."""
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or not getattr(record, "sampled", False):
+            return True
+        if self.rate >= 1 or random.random() < self.rate:
+            return True
+        self.dropped += 1
+        return False
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    # The stock prepare() runs the full formatter (timestamp, traceback, JSON) on the caller's thread.
+    # Here only the message is rendered, so a mutable payload cannot change before the writer thread
+    # gets to it; formatting the line is left to the listener.
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args:
+            record.msg, record.args = record.getMessage(), None
+        return record
+
+
+def _file_handler(path: str, max_bytes: int, rotate_when: str | None, backup_count: int) -> logging.Handler:
+    if rotate_when:
+        return logging.handlers.TimedRotatingFileHandler(path, when=rotate_when, backupCount=backup_count, encoding="utf-8", delay=True)
+    return logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+
+
+def _worker_file(path: str) -> str:
+    # Worker processes of a sharded deployment each write their own file; rotating a shared one is not safe.
+    name = multiprocessing.current_process().name
+    if name == "MainProcess":
+        return path
+    stem, dot, suffix = path.rpartition(".")
+    return f"{stem}.{name}.{suffix}" if dot else f"{path}.{name}"
+
+
+def configure_logging(
+    level: str, path: str, max_bytes: int, rotate_when: str | None, backup_count: int, json_output: bool, sample_rate: float,
+) -> logging.handlers.QueueListener:
+    """
+    Routes all logging through an in-memory queue: callers only enqueue the record, and a background
+    thread formats it and writes it to stderr and a rotating file. Rotation is by size, or by time when
+    `rotate_when` is set (e.g. "midnight"). The listener is flushed and stopped at interpreter exit.
+    """
+    if json_output:
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    writers = [logging.StreamHandler(), _file_handler(_worker_file(path), max_bytes, rotate_when, backup_count)]
+    for writer in writers:
+        writer.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_rate))
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+
+    listener = logging.handlers.QueueListener(log_queue, *writers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,235 @@
+# tabadex_bot/utils/metrics.py
+
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Iterable
+
+from aiohttp import web
+from telegram.ext import Application, ApplicationHandlerStop, ConversationHandler
+
+from ..config import logger
+from .callback_router import CallbackRouterHandler
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Iterable[str], values: Iterable, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help_text, labels
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in self.values.items()]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help_text, labels, buckets
+        # label values -> [per-bucket counts (last one is +Inf), sum, count]
+        self.series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def time(self, *label_values) -> "_Timer":
+        return _Timer(self, label_values)
+
+    def quantile(self, q: float, *label_values) -> float | None:
+        """Upper bound of the bucket holding the q-quantile (inf if it is past the last bucket)."""
+        series = self.series.get(label_values)
+        if not series or not series[2]:
+            return None
+        target, seen = q * series[2], 0
+        for bound, count in zip((*self.buckets, float("inf")), series[0]):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in self.series.items():
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "label_values", "started")
+
+    def __init__(self, histogram: Histogram, label_values: tuple):
+        self.histogram, self.label_values = histogram, label_values
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, *self.label_values)
+
+
+class Collector:
+    """A value read only when the metrics are scraped, e.g. a counter some module already keeps."""
+    def __init__(self, name: str, help_text: str, kind: str, read: Callable, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.kind, self.read, self.labels = name, help_text, kind, read, labels
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            value = self.read()
+        except Exception as e:
+            logger.error(f"Metric {self.name} could not be read: {e}")
+            return []
+        values = value if isinstance(value, dict) else {(): value}
+        for key, item in values.items():
+            key = key if isinstance(key, tuple) else (key,)
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {item}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics, rendered in the Prometheus text format. Recording is a dict update,
+    so instrumentation stays on even when nothing scrapes the endpoint.
+    """
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram | Collector] = {}
+
+    def _register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def collector(self, name: str, help_text: str, read: Callable, kind: str = "gauge", labels: tuple[str, ...] = ()) -> Collector:
+        return self._register(Collector(name, help_text, kind, read, labels))
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+UPDATE_SECONDS = metrics.histogram("tabadex_update_seconds", "Time from an update being scheduled to all its handlers finishing.")
+HANDLER_SECONDS = metrics.histogram(
+    "tabadex_handler_seconds", "Handler callback latency.", ("handler", "conversation", "state", "outcome")
+)
+SWAPZONE_REQUEST_SECONDS = metrics.histogram(
+    "tabadex_swapzone_request_seconds", "SwapZone API request latency, one observation per attempt.", ("endpoint", "status")
+)
+CRUD_SECONDS = metrics.histogram(
+    "tabadex_crud_seconds", "Latency of each crud function.", ("function",),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+
+# --- Instrumentation helpers ---
+def timed_crud(func):
+    @wraps(func)
+    async def wrapped(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            CRUD_SECONDS.observe(time.perf_counter() - started, func.__name__)
+    return wrapped
+
+def _timed_callback(callback, conversation: str, state: str):
+    name = getattr(callback, "__name__", type(callback).__name__)
+
+    @wraps(callback)
+    async def wrapped(update, context, *args, **kwargs):
+        started, outcome = time.perf_counter(), "ok"
+        try:
+            return await callback(update, context, *args, **kwargs)
+        except ApplicationHandlerStop:
+            outcome = "stop"
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - started, name, conversation, state, outcome)
+    return wrapped
+
+def _instrument_handler(handler, conversation: str = "", state: str = ""):
+    if isinstance(handler, ConversationHandler):
+        name = handler.name or ""
+        for entry in handler.entry_points:
+            _instrument_handler(entry, name, "entry")
+        for state_value, handlers in handler.states.items():
+            for state_handler in handlers:
+                _instrument_handler(state_handler, name, str(state_value))
+        for fallback in handler.fallbacks:
+            _instrument_handler(fallback, name, "fallback")
+        return
+    if isinstance(handler, CallbackRouterHandler):
+        for route in handler.router.routes:
+            route.callback = _timed_callback(route.callback, conversation, state)
+        return
+    handler.callback = _timed_callback(handler.callback, conversation, state)
+
+def instrument_application(application: Application):
+    """Wraps every registered handler callback (conversation states and callback routes included) with a latency timer."""
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            _instrument_handler(handler)
+
+
+class MetricsServer:
+    """Serves GET /metrics in the Prometheus text format; bind it to localhost or a private network only."""
+    def __init__(self, registry: MetricsRegistry, host: str, port: int):
+        self.registry, self.host, self.port = registry, host, port
+        self._runner: web.AppRunner | None = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.registry.render(), content_type="text/plain", charset="utf-8")
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Metrics are served on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,82 @@
+# tabadex_bot/utils/orders.py
+
+import asyncio
+import hashlib
+
+from ..config import logger
+from ..database import crud
+from ..database.models import Order
+from ..database.session import AsyncSessionLocal
+from .metrics import metrics
+from .scheduler import scheduler
+from .swapzone_api import swapzone_api_client
+
+# The conversation's quote: what the user confirmed on the preview.
+QUOTE_KEYS = ("quote_id", "from_currency", "from_network", "to_currency", "to_network", "amount")
+
+
+def idempotency_key(user_id: int, quote: dict) -> str:
+    """One key per confirmed quote: the same quote can never create a second SwapZone transaction."""
+    material = "|".join([str(user_id), *(str(quote.get(key, "")) for key in QUOTE_KEYS)])
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class OrderPipeline:
+    """
+    Creates SwapZone transactions idempotently:
+
+    - a request whose quote already has an order gets that order back from the database;
+    - duplicate requests arriving while the first is still running (a double-sent address,
+      a retried update) wait for it and share its result instead of calling the API again.
+
+    The creation itself runs as a scheduler task, so it is not lost when the first caller is
+    cancelled and it is drained on shutdown.
+    """
+    def __init__(self):
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self.coalesced = 0
+        self.replayed = 0
+
+    async def create(self, user_id: int, quote: dict, recipient_address: str, to_amount_estimated: str) -> Order:
+        key = idempotency_key(user_id, quote)
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            logger.warning(f"Duplicate order request of user {user_id} joined the one in flight")
+        else:
+            task = scheduler.spawn(
+                f"order-{key[:12]}", self._create(key, user_id, quote, recipient_address, to_amount_estimated), kind="order"
+            )
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _create(self, key: str, user_id: int, quote: dict, recipient_address: str, to_amount_estimated: str) -> Order:
+        # No session is held across the API call: with its retries it can take long enough to drain the pool.
+        async with AsyncSessionLocal() as session:
+            existing = await crud.get_order_by_idempotency_key(session, key)
+        if existing is not None:
+            self.replayed += 1
+            logger.warning(f"Order request of user {user_id} was already fulfilled by order {existing.id}")
+            return existing
+        created_tx = await swapzone_api_client.create_transaction(**{
+            "from": quote["from_currency"], "fromNetwork": quote["from_network"],
+            "to": quote["to_currency"], "toNetwork": quote["to_network"],
+            "amount": quote["amount"], "recipient": recipient_address, "refundAddress": recipient_address,
+        })
+        async with AsyncSessionLocal() as session:
+            return await crud.create_order(
+                session=session, tx_id=created_tx['id'], user_id=user_id,
+                from_currency=quote["from_currency"], from_network=quote["from_network"],
+                to_currency=quote["to_currency"], to_network=quote["to_network"],
+                from_amount=quote["amount"], to_amount_estimated=to_amount_estimated,
+                deposit_address=created_tx['depositAddress'], recipient_address=recipient_address,
+                idempotency_key=key,
+            )
+
+
+order_pipeline = OrderPipeline()
+metrics.collector(
+    "tabadex_order_duplicates_total", "Order requests served without a new SwapZone transaction.",
+    lambda: {"in_flight": order_pipeline.coalesced, "already_created": order_pipeline.replayed}, "counter", ("outcome",),
+)
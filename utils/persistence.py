@@ -0,0 +1,204 @@
+# tabadex_bot/utils/persistence.py
+
+import asyncio
+import json
+
+import telegram
+from telegram import TelegramObject
+from telegram.ext import BasePersistence, PersistenceInput
+
+from ..config import logger
+from ..database import crud
+from ..database.models import PersistedUserData, PersistedConversation
+from ..database.session import AsyncSessionLocal, async_engine
+
+
+class DatabasePersistence(BasePersistence):
+    """
+    Keeps conversation states and user_data in our own database, so users mid-exchange survive a restart.
+
+    - user_data is loaded lazily: the first update of a user after startup reads their one row.
+      Conversation states are small (finished conversations are deleted) and are read once at startup,
+      because ConversationHandler looks them up before any handler runs.
+    - Only changed entries are written: PTB hands over every user seen in the interval, and entries
+      whose serialized form did not change are skipped. Everything changed is written in one batch.
+    - State is stored as compact JSON; Telegram objects (e.g. a broadcast draft) are stored as their dict.
+    """
+    # Derived from users.language_code by the language resolver; persisting it would only duplicate it.
+    TRANSIENT_USER_DATA_KEYS = frozenset({"lang"})
+    RETRY_DELAY_SECONDS = 1.0
+    MAX_RETRY_DELAY_SECONDS = 60.0
+
+    def __init__(self, update_interval: float):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self._tables_ready = False
+        self._loaded_users: set[int] = set()
+        self._stored_digests: dict[int, int] = {}
+        self._pending_user_data: dict[int, str | None] = {}
+        self._pending_conversations: dict[tuple[str, str], str | None] = {}
+        self._write_task: asyncio.Task | None = None
+        self._write_lock = asyncio.Lock()
+
+    # --- Serialization ---
+    @staticmethod
+    def _encode_object(obj):
+        if isinstance(obj, TelegramObject):
+            return {"__telegram__": type(obj).__name__, "data": obj.to_dict()}
+        raise TypeError(f"{type(obj).__name__} is not serializable")
+
+    def _decode_object(self, obj: dict):
+        if "__telegram__" in obj:
+            return getattr(telegram, obj["__telegram__"]).de_json(obj["data"], self.bot)
+        return obj
+
+    def _encode(self, value) -> str:
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=self._encode_object)
+
+    def _decode(self, text: str):
+        return json.loads(text, object_hook=self._decode_object)
+
+    # --- Loading ---
+    async def _ensure_tables(self):
+        # Conversations are loaded in Application.initialize, before on_startup creates the schema.
+        if not self._tables_ready:
+            async with async_engine.begin() as conn:
+                for table in (PersistedUserData.__table__, PersistedConversation.__table__):
+                    await conn.run_sync(table.create, checkfirst=True)
+            self._tables_ready = True
+
+    async def get_user_data(self) -> dict:
+        return {}  # Loaded per user in refresh_user_data
+
+    async def get_chat_data(self) -> dict:
+        return {}
+
+    async def get_bot_data(self) -> dict:
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name: str) -> dict:
+        await self._ensure_tables()
+        async with AsyncSessionLocal() as session:
+            rows = await crud.get_persisted_conversations(session, name)
+        conversations = {tuple(json.loads(key)): self._decode(state) for key, state in rows}
+        if conversations:
+            logger.info(f"Restored {len(conversations)} '{name}' conversations")
+        return conversations
+
+    async def refresh_user_data(self, user_id: int, user_data: dict):
+        if user_id in self._loaded_users:
+            return
+        try:
+            async with AsyncSessionLocal() as session:
+                stored = await crud.get_persisted_user_data(session, user_id)
+        except Exception as e:
+            # Not marked as loaded, so nothing is written for this user until a load succeeds.
+            logger.error(f"Failed to load persisted user_data of user {user_id}: {e}")
+            return
+        self._loaded_users.add(user_id)
+        self._stored_digests[user_id] = hash(stored)
+        if stored:
+            for key, value in self._decode(stored).items():
+                user_data.setdefault(key, value)
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict):
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict):
+        pass
+
+    # --- Writing ---
+    async def update_user_data(self, user_id: int, data: dict):
+        if user_id not in self._loaded_users:
+            return
+        state = {key: value for key, value in data.items() if key not in self.TRANSIENT_USER_DATA_KEYS}
+        try:
+            blob = self._encode(state) if state else None
+        except (TypeError, ValueError) as e:
+            logger.error(f"user_data of user {user_id} is not serializable, not persisting it: {e}")
+            return
+        digest = hash(blob)
+        if self._stored_digests.get(user_id) == digest:
+            return
+        self._stored_digests[user_id] = digest
+        self._pending_user_data[user_id] = blob
+        self._schedule_write()
+
+    async def drop_user_data(self, user_id: int):
+        self._stored_digests[user_id] = hash(None)
+        self._pending_user_data[user_id] = None
+        self._schedule_write()
+
+    async def update_conversation(self, name: str, key: tuple, new_state):
+        try:
+            state = None if new_state is None else self._encode(new_state)
+        except (TypeError, ValueError) as e:
+            logger.error(f"State of '{name}' conversation {key} is not serializable, not persisting it: {e}")
+            return
+        self._pending_conversations[(name, self._encode(list(key)))] = state
+        self._schedule_write()
+
+    async def update_chat_data(self, chat_id: int, data: dict):
+        pass
+
+    async def drop_chat_data(self, chat_id: int):
+        pass
+
+    async def update_bot_data(self, data: dict):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    def _schedule_write(self):
+        # PTB calls update_* for every entry of a run back to back; a single task writes them all.
+        if self._write_task is None or self._write_task.done():
+            self._write_task = asyncio.create_task(self._write_pending(), name="persistence-writer")
+
+    async def _write_pending(self):
+        # The writer runs until nothing is pending: entries queued while a batch is being written (the task is
+        # still running, so _schedule_write starts no other) and batches that failed are written by it too.
+        delay = self.RETRY_DELAY_SECONDS
+        while self._pending_user_data or self._pending_conversations:
+            if await self._write_batch():
+                delay = self.RETRY_DELAY_SECONDS
+            else:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.MAX_RETRY_DELAY_SECONDS)
+
+    async def _write_batch(self) -> bool:
+        async with self._write_lock:
+            user_data, self._pending_user_data = self._pending_user_data, {}
+            conversations, self._pending_conversations = self._pending_conversations, {}
+            if not user_data and not conversations:
+                return True
+            written = False
+            try:
+                async with AsyncSessionLocal() as session:
+                    if user_data:
+                        await crud.save_persisted_user_data(session, user_data)
+                    if conversations:
+                        await crud.save_persisted_conversations(session, conversations)
+                written = True
+            except Exception as e:
+                logger.error(f"Failed to persist {len(user_data)} user_data and {len(conversations)} conversation entries: {e}")
+            finally:
+                if not written:
+                    # Queued again (also when cancelled) unless a newer value has been queued in the meantime.
+                    for user_id, blob in user_data.items():
+                        self._pending_user_data.setdefault(user_id, blob)
+                    for key, state in conversations.items():
+                        self._pending_conversations.setdefault(key, state)
+            return written
+
+    async def flush(self):
+        # One last attempt: a writer waiting for the database to come back must not hold up shutdown.
+        if self._write_task and not self._write_task.done():
+            self._write_task.cancel()
+            await asyncio.gather(self._write_task, return_exceptions=True)
+        await self._write_batch()
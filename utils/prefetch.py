@@ -0,0 +1,72 @@
+# tabadex_bot/utils/prefetch.py
+
+import asyncio
+import time
+from collections import Counter
+from typing import Awaitable, Callable
+
+from ..config import logger, settings
+from .metrics import metrics
+from .scheduler import scheduler
+
+
+class Prefetcher:
+    """
+    Speculative lookups for conversation steps: a step starts the lookup the next step will most
+    likely need, and the next step takes the result if the inputs match (a hit) or fetches it itself
+    (a miss). One lookup per user and kind is kept; starting another or cancelling discards the old one.
+    Results older than `max_age_seconds` are never used, so a stale rate is never shown.
+    """
+    PRUNE_ABOVE = 10_000
+
+    def __init__(self, max_age_seconds: float):
+        self.max_age_seconds = max_age_seconds
+        self._pending: dict[tuple[int, str], tuple[tuple, float, asyncio.Task]] = {}
+        self.outcomes: Counter[tuple[str, str]] = Counter()
+
+    def start(self, user_id: int, kind: str, key: tuple, fetch: Callable[[], Awaitable]):
+        self._discard(user_id, kind)
+        if len(self._pending) > self.PRUNE_ABOVE:
+            self._prune()
+        task = scheduler.spawn(f"prefetch-{kind}-{user_id}", fetch(), kind="prefetch")
+        self._pending[(user_id, kind)] = (key, time.monotonic(), task)
+
+    async def get(self, user_id: int, kind: str, key: tuple, fetch: Callable[[], Awaitable]):
+        entry = self._pending.pop((user_id, kind), None)
+        if entry is not None:
+            prefetched_key, started, task = entry
+            if prefetched_key == key and time.monotonic() - started <= self.max_age_seconds:
+                try:
+                    result = await task
+                    self.outcomes[(kind, "hit")] += 1
+                    return result
+                except Exception as e:
+                    logger.warning(f"Prefetched {kind} of user {user_id} failed, fetching it again: {e}")
+            else:
+                task.cancel()
+                self.outcomes[(kind, "wasted")] += 1
+        self.outcomes[(kind, "miss")] += 1
+        return await fetch()
+
+    def cancel(self, user_id: int):
+        for kind in [kind for pending_user_id, kind in self._pending if pending_user_id == user_id]:
+            self._discard(user_id, kind)
+
+    def _discard(self, user_id: int, kind: str):
+        entry = self._pending.pop((user_id, kind), None)
+        if entry is not None:
+            entry[2].cancel()
+            self.outcomes[(kind, "wasted")] += 1
+
+    def _prune(self):
+        # Conversations abandoned without /cancel leave their lookups behind.
+        cutoff = time.monotonic() - self.max_age_seconds
+        for user_id, kind in [key for key, (_, started, _) in self._pending.items() if started < cutoff]:
+            self._discard(user_id, kind)
+
+
+prefetcher = Prefetcher(settings.PREFETCH_MAX_AGE_SECONDS)
+metrics.collector(
+    "tabadex_prefetch_total", "Speculative lookups by outcome (hit, miss, wasted).",
+    lambda: dict(prefetcher.outcomes), "counter", ("kind", "outcome"),
+)
@@ -0,0 +1,67 @@
+# tabadex_bot/utils/roles.py
+
+from types import MappingProxyType
+from typing import Callable
+
+from ..config import logger
+from ..database.models import StaffRole
+from .sharding import cluster_bus
+
+
+class RoleRegistry:
+    """
+    Staff roles as immutable snapshots: every change builds new frozensets and swaps them in at once,
+    so authorization checks are plain set lookups that never see a half-applied change.
+    The database (staff_roles) is the source of truth; whoever changes it calls apply_change, and
+    subscribers are notified after every change.
+    """
+    def __init__(self):
+        self._listeners: list[Callable[["RoleRegistry"], None]] = []
+        self._publish({})
+
+    def _publish(self, roles: dict[int, StaffRole]):
+        self.roles = MappingProxyType(dict(roles))
+        self.admins = frozenset(user_id for user_id, role in roles.items() if role is StaffRole.ADMIN)
+        self.support = frozenset(user_id for user_id, role in roles.items() if role is StaffRole.SUPPORT)
+        self.staff = self.admins | self.support
+        for listener in self._listeners:
+            try:
+                listener(self)
+            except Exception as e:
+                logger.error(f"Role change listener {listener} failed: {e}")
+
+    def subscribe(self, listener: Callable[["RoleRegistry"], None]):
+        """Calls `listener(registry)` now and after every change."""
+        self._listeners.append(listener)
+        listener(self)
+
+    def replace(self, roles: dict[int, StaffRole]):
+        self._publish(roles)
+        logger.info(f"Roles loaded: {len(self.admins)} admins, {len(self.support)} support agents")
+
+    def set_role(self, user_id: int, role: StaffRole | None):
+        roles = dict(self.roles)
+        if role is None:
+            roles.pop(user_id, None)
+        else:
+            roles[user_id] = role
+        self._publish(roles)
+        logger.info(f"Role of user {user_id} is now {role.value if role else 'none'}")
+
+    def apply_change(self, user_id: int, role: StaffRole | None):
+        """Applies a change committed to the database here and relays it to the other workers."""
+        self.set_role(user_id, role)
+        cluster_bus.publish("role", (user_id, role))
+
+    def role_of(self, user_id: int) -> StaffRole | None:
+        return self.roles.get(user_id)
+
+    def is_admin(self, user_id: int) -> bool:
+        return user_id in self.admins
+
+    def is_staff(self, user_id: int) -> bool:
+        return user_id in self.staff
+
+
+role_registry = RoleRegistry()
+cluster_bus.on("role", lambda change: role_registry.set_role(*change))
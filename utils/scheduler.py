@@ -0,0 +1,142 @@
+# tabadex_bot/utils/scheduler.py
+
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Protocol
+
+from ..config import logger
+from .metrics import metrics
+
+
+class Leadership(Protocol):
+    is_leader: bool
+
+
+class _PeriodicJob:
+    __slots__ = ("name", "func", "interval", "kind", "singleton", "jitter", "max_backoff", "run_at_start",
+                 "runs", "failures", "consecutive_failures", "last_duration")
+
+    def __init__(self, name, func, interval, kind, singleton, jitter, max_backoff, run_at_start):
+        self.name, self.func, self.interval, self.kind = name, func, interval, kind
+        self.singleton, self.jitter, self.max_backoff, self.run_at_start = singleton, jitter, max_backoff, run_at_start
+        self.runs = self.failures = self.consecutive_failures = 0
+        self.last_duration = 0.0
+
+    def next_delay(self) -> float:
+        # Failures back off exponentially; jitter keeps workers and deployments from running in lockstep.
+        delay = self.interval
+        if self.consecutive_failures:
+            delay = min(self.interval * 2 ** self.consecutive_failures, max(self.max_backoff, self.interval))
+        return max(0.0, delay * (1 + random.uniform(-self.jitter, self.jitter)))
+
+
+class Scheduler:
+    """
+    Owns every background task of the process: named periodic jobs and tracked one-off tasks.
+
+    - Jobs of the same kind share a concurrency limit (set_limit); kinds without one are unlimited.
+    - Singleton jobs run only while this process holds leadership (see utils/leader.py),
+      so they run once per deployment however many processes there are.
+    - shutdown() stops the periodic jobs and drains the one-off tasks, cancelling what is left after a timeout.
+    """
+    def __init__(self):
+        self.leader: Leadership | None = None
+        self._jobs: dict[str, _PeriodicJob] = {}
+        self._limits: dict[str, asyncio.Semaphore] = {}
+        self._loops: list[asyncio.Task] = []
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def is_leader(self) -> bool:
+        return self.leader is None or self.leader.is_leader
+
+    def set_limit(self, kind: str, concurrency: int):
+        self._limits[kind] = asyncio.Semaphore(concurrency)
+
+    def every(
+        self, name: str, interval: float, func: Callable[[], Awaitable], kind: str = "maintenance",
+        singleton: bool = False, jitter: float = 0.1, max_backoff: float = 600, run_at_start: bool = False,
+    ):
+        """Runs `func()` every `interval` seconds once the scheduler is started."""
+        self._jobs[name] = _PeriodicJob(name, func, interval, kind, singleton, jitter, max_backoff, run_at_start)
+
+    def spawn(self, name: str, coro: Awaitable, kind: str = "task") -> asyncio.Task:
+        """Runs a coroutine as a tracked task under its kind's concurrency limit."""
+        task = asyncio.create_task(self._limited(kind, coro), name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Background task {task.get_name()} failed: {task.exception()!r}")
+
+    async def _limited(self, kind: str, coro: Awaitable):
+        semaphore = self._limits.get(kind)
+        if semaphore is None:
+            return await coro
+        async with semaphore:
+            return await coro
+
+    def start(self):
+        for job in self._jobs.values():
+            self._loops.append(asyncio.create_task(self._loop(job), name=f"job-{job.name}"))
+
+    async def _loop(self, job: _PeriodicJob):
+        if job.run_at_start:
+            await self._run(job)
+        while True:
+            await asyncio.sleep(job.next_delay())
+            await self._run(job)
+
+    async def _run(self, job: _PeriodicJob) -> bool:
+        if job.singleton and not self.is_leader:
+            return True
+        started = time.perf_counter()
+        try:
+            await self._limited(job.kind, job.func())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.failures += 1
+            job.consecutive_failures += 1
+            logger.error(f"Job {job.name} failed ({job.consecutive_failures} in a row): {e}")
+            return False
+        finally:
+            job.runs += 1
+            job.last_duration = time.perf_counter() - started
+        job.consecutive_failures = 0
+        return True
+
+    async def shutdown(self, drain_seconds: float):
+        for loop in self._loops:
+            loop.cancel()
+        await asyncio.gather(*self._loops, return_exceptions=True)
+        self._loops.clear()
+        if self._tasks:
+            pending = list(self._tasks)
+            logger.info(f"Waiting up to {drain_seconds}s for {len(pending)} background tasks")
+            _, still_running = await asyncio.wait(pending, timeout=drain_seconds)
+            for task in still_running:
+                logger.warning(f"Background task {task.get_name()} did not finish in time, cancelling it")
+                task.cancel()
+            await asyncio.gather(*still_running, return_exceptions=True)
+
+    def running_tasks(self) -> int:
+        return len(self._tasks)
+
+    def status(self) -> list[tuple[str, int, int, float]]:
+        """(name, runs, failures, last duration) of every periodic job."""
+        return [(job.name, job.runs, job.failures, job.last_duration) for job in self._jobs.values()]
+
+
+scheduler = Scheduler()
+metrics.collector(
+    "tabadex_job_runs_total", "Periodic job runs.", lambda: {name: runs for name, runs, _, _ in scheduler.status()}, "counter", ("job",)
+)
+metrics.collector(
+    "tabadex_job_failures_total", "Periodic job failures.", lambda: {name: failures for name, _, failures, _ in scheduler.status()}, "counter", ("job",)
+)
+metrics.collector("tabadex_background_tasks", "One-off background tasks running or waiting for their kind's limit.", scheduler.running_tasks)
@@ -0,0 +1,273 @@
+# tabadex_bot/utils/sharding.py
+
+import asyncio
+import multiprocessing
+import queue
+import signal
+import threading
+from typing import Awaitable, Callable
+
+from telegram import Bot, Update
+from telegram.ext import Application, ApplicationBuilder, Updater
+
+from ..config import logger, settings
+from .update_processor import ordering_key
+from .tracing import traced_bot_request
+from .scheduler import scheduler
+
+_STOP = ("stop",)
+_WAKE = ("wake",)  # Ingress-only: unblocks a sender thread waiting on the outbox of a dead worker
+WORKER_STOP_TIMEOUT_SECONDS = 30
+# Updates queued for a worker while it restarts; beyond this they are dropped rather than held in memory.
+WORKER_OUTBOX_LIMIT = 10_000
+WORKER_SUPERVISE_INTERVAL_SECONDS = 1.0
+WORKER_MAX_RESTARTS = 3
+WORKER_RESTART_WINDOW_SECONDS = 60
+
+
+def shard_for(update: Update, worker_count: int) -> int:
+    """Every update of a user goes to the same worker, keeping their updates ordered and their state local."""
+    key = ordering_key(update)
+    return key % worker_count if key is not None else 0
+
+
+class ClusterBus:
+    """
+    Relays changes to per-process in-memory state (blocklist, roles, locale reloads, broadcast cancels)
+    to the other workers. Modules register a handler per topic with on(); whoever changes the state
+    applies it locally and publish()es it. In single-process mode publish() does nothing.
+    """
+    def __init__(self):
+        self.worker_index = 0
+        self.worker_count = 1
+        self._conn = None
+        self._handlers: dict[str, Callable] = {}
+
+    def attach(self, worker_index: int, worker_count: int, conn):
+        self.worker_index, self.worker_count, self._conn = worker_index, worker_count, conn
+
+    def on(self, topic: str, handler: Callable):
+        self._handlers[topic] = handler
+
+    def publish(self, topic: str, payload=None):
+        if self._conn is not None:
+            self._conn.send(("event", topic, payload))
+
+    def deliver(self, topic: str, payload):
+        handler = self._handlers.get(topic)
+        if handler is None:
+            logger.warning(f"No handler for cluster event '{topic}'")
+            return
+        try:
+            result = handler(payload)
+            if asyncio.iscoroutine(result):
+                scheduler.spawn(f"cluster-{topic}", result)
+        except Exception as e:
+            logger.error(f"Cluster event '{topic}' failed: {e}")
+
+
+cluster_bus = ClusterBus()
+
+
+# --- Worker process ---
+def _worker_main(build_application: Callable[..., Application], worker_index: int, worker_count: int, conn):
+    # Ctrl+C reaches the whole process group; workers stop when the ingress tells them to.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_serve_worker(build_application, worker_index, worker_count, conn))
+
+async def _serve_worker(build_application, worker_index: int, worker_count: int, conn):
+    cluster_bus.attach(worker_index, worker_count, conn)
+    application = build_application(ApplicationBuilder().token(settings.BOT_TOKEN).request(traced_bot_request()).updater(None))
+    loop = asyncio.get_running_loop()
+    stopped = asyncio.Event()
+
+    def enqueue(data: dict):
+        application.update_queue.put_nowait(Update.de_json(data, application.bot))
+
+    def receive():
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                message = _STOP
+            if message[0] == "update":
+                loop.call_soon_threadsafe(enqueue, message[1])
+            elif message[0] == "event":
+                loop.call_soon_threadsafe(cluster_bus.deliver, message[1], message[2])
+            else:
+                loop.call_soon_threadsafe(stopped.set)
+                return
+
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+    threading.Thread(target=receive, name=f"worker-{worker_index}-receiver", daemon=True).start()
+    logger.info(f"Worker {worker_index + 1}/{worker_count} is handling updates")
+
+    await stopped.wait()
+    await application.stop()
+    if application.post_stop:
+        await application.post_stop(application)
+    await application.shutdown()
+    if application.post_shutdown:
+        await application.post_shutdown(application)
+
+
+# --- Ingress process ---
+class WorkerCrashLoop(RuntimeError):
+    """Raised in the ingress when a worker keeps dying, so the whole cluster stops instead of silently losing a shard."""
+
+
+class _WorkerLink:
+    """
+    The ingress side of one worker: a sender thread draining a bounded outbox, and a receiver relaying
+    events. The outbox outlives the worker process, so a restarted worker picks up what queued meanwhile.
+    """
+    def __init__(self, index: int, spawn: Callable[[int], tuple]):
+        self.index = index
+        self._spawn = spawn
+        self.process = self.conn = None
+        self.outbox: queue.Queue = queue.Queue(WORKER_OUTBOX_LIMIT)
+        self._sender: threading.Thread | None = None
+        self._unsent = None  # The message whose send failed, sent first after a restart
+        self.restarts: list[float] = []
+
+    def start(self, links: list["_WorkerLink"]):
+        self.process, self.conn = self._spawn(self.index)
+        self._sender = threading.Thread(target=self._send_loop, args=(self.conn,), name=f"worker-{self.index}-sender", daemon=True)
+        self._sender.start()
+        threading.Thread(target=self._receive_loop, args=(self.conn, links), name=f"worker-{self.index}-events", daemon=True).start()
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive() and self._sender.is_alive()
+
+    def restart(self, links: list["_WorkerLink"]):
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.conn.close()
+        # The old sender may still wait on the outbox; it has to stop before the new one starts, or they would race.
+        if self._sender.is_alive():
+            self.outbox.put(_WAKE)
+            self._sender.join()
+        self.start(links)
+
+    def put(self, message) -> bool:
+        try:
+            self.outbox.put_nowait(message)
+            return True
+        except queue.Full:
+            return False
+
+    def _send_loop(self, conn):
+        while True:
+            message = self._unsent if self._unsent is not None else self.outbox.get()
+            if message is _WAKE:
+                if conn.closed:
+                    return
+                continue
+            try:
+                conn.send(message)
+            except (BrokenPipeError, OSError) as e:
+                # The supervisor restarts the worker; nothing more is taken from the outbox until then.
+                logger.error(f"Worker {self.index} is gone: {e}")
+                self._unsent = message
+                return
+            self._unsent = None
+            if message is _STOP:
+                return
+
+    def _receive_loop(self, conn, links: list["_WorkerLink"]):
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                return
+            for link in links:
+                if link is not self and not link.put(message):
+                    logger.error(f"Outbox of worker {link.index} is full; dropped cluster event '{message[1]}'")
+
+async def _supervise(links: list[_WorkerLink]):
+    """Restarts dead workers; a worker dying WORKER_MAX_RESTARTS times within WORKER_RESTART_WINDOW_SECONDS stops the cluster."""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(WORKER_SUPERVISE_INTERVAL_SECONDS)
+        for link in links:
+            if link.is_alive():
+                continue
+            now = loop.time()
+            link.restarts = [at for at in link.restarts if now - at < WORKER_RESTART_WINDOW_SECONDS] + [now]
+            if len(link.restarts) > WORKER_MAX_RESTARTS:
+                raise WorkerCrashLoop(
+                    f"Worker {link.index} died {len(link.restarts)} times in {WORKER_RESTART_WINDOW_SECONDS}s (exit code {link.process.exitcode})"
+                )
+            logger.error(f"Worker {link.index} died (exit code {link.process.exitcode}); restarting it with {link.outbox.qsize()} messages queued")
+            await asyncio.to_thread(link.restart, links)
+
+async def _ingress(links: list[_WorkerLink], webhook_options: dict | None):
+    update_queue: asyncio.Queue = asyncio.Queue()
+    updater = Updater(Bot(settings.BOT_TOKEN), update_queue)
+    supervisor = asyncio.create_task(_supervise(links))
+    async with updater:
+        if webhook_options:
+            await updater.start_webhook(**webhook_options, allowed_updates=Update.ALL_TYPES)
+        else:
+            await updater.start_polling(allowed_updates=Update.ALL_TYPES)
+        try:
+            while True:
+                get_update = asyncio.ensure_future(update_queue.get())
+                await asyncio.wait((get_update, supervisor), return_when=asyncio.FIRST_COMPLETED)
+                if supervisor.done():
+                    get_update.cancel()
+                    supervisor.result()  # Raises WorkerCrashLoop
+                update = get_update.result()
+                link = links[shard_for(update, len(links))]
+                if not link.put(("update", update.to_dict())):
+                    logger.error(f"Outbox of worker {link.index} is full; dropped update {update.update_id}")
+        finally:
+            supervisor.cancel()
+            await updater.stop()
+
+def run_cluster(
+    build_application: Callable[..., Application], worker_count: int,
+    prepare: Callable[[], Awaitable[None]] | None = None, webhook_options: dict | None = None,
+):
+    """
+    Runs one ingress process that receives updates (polling, or the webhook when `webhook_options` is given)
+    and `worker_count` worker processes, each running the full handler set on its share of the users.
+    `prepare` runs once before the workers start (e.g. creating the schema, so workers do not race on it).
+    Workers that die are restarted; one that keeps dying stops the cluster with WorkerCrashLoop.
+    """
+    if prepare:
+        asyncio.run(prepare())
+
+    context = multiprocessing.get_context("spawn")
+
+    def spawn(index: int):
+        parent_conn, child_conn = context.Pipe()
+        process = context.Process(
+            target=_worker_main, args=(build_application, index, worker_count, child_conn), name=f"tabadex-worker-{index}"
+        )
+        process.start()
+        child_conn.close()
+        return process, parent_conn
+
+    links = [_WorkerLink(index, spawn) for index in range(worker_count)]
+    for link in links:
+        link.start(links)
+
+    try:
+        asyncio.run(_ingress(links, webhook_options))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info("Stopping workers...")
+        for link in links:
+            if not link.put(_STOP):
+                link.process.terminate()
+        for link in links:
+            link.process.join(WORKER_STOP_TIMEOUT_SECONDS)
+            if link.process.is_alive():
+                logger.warning(f"Worker {link.index} did not stop in time, terminating it")
+                link.process.terminate()
@@ -0,0 +1,170 @@
+# tabadex_bot/utils/startup.py
+
+import asyncio
+import hashlib
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import MetaData, delete, insert, select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from ..config import logger
+from ..database import crud
+from ..database.migrations import upgrade_schema
+from ..database.models import AppSetting
+from .app_settings import app_settings
+from .blocklist import blocklist
+from .language import language_resolver
+from .metrics import metrics
+from .roles import role_registry
+from .swapzone_api import swapzone_api_client
+
+SCHEMA_FINGERPRINT_KEY = "schema_fingerprint"
+# SwapZone retries with backoff; startup does not wait that long for it.
+CATALOG_WARMUP_TIMEOUT_SECONDS = 10
+
+
+class StartupReport:
+    """Wall time of each startup phase. Phases run concurrently overlap, so they do not add up to the total."""
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: dict[str, float] = {}
+        self.total: float | None = None
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    async def timed(self, name: str, awaitable):
+        with self.phase(name):
+            return await awaitable
+
+    def mark(self, name: str):
+        """Records the time from the start of the report until now as phase `name`."""
+        self.phases[name] = time.perf_counter() - self.started
+
+    def finish(self) -> str:
+        self.total = time.perf_counter() - self.started
+        phases = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.phases.items())
+        return f"{phases}; total {self.total * 1000:.0f}ms"
+
+
+# Started on import, so the first phase covers imports and Application.initialize too.
+startup_report = StartupReport()
+metrics.collector(
+    "tabadex_startup_phase_seconds", "Duration of each startup phase.", lambda: dict(startup_report.phases), labels=("phase",)
+)
+
+
+# --- Schema ---
+def schema_fingerprint(metadata: MetaData, dialect) -> str:
+    """Hash of the CREATE statements of every table and index, as the given dialect renders them."""
+    digest = hashlib.sha256()
+    for table in sorted(metadata.tables.values(), key=lambda t: t.name):
+        digest.update(str(CreateTable(table).compile(dialect=dialect)).encode())
+        for index in sorted(table.indexes, key=lambda i: i.name or ""):
+            digest.update(str(CreateIndex(index).compile(dialect=dialect)).encode())
+    return digest.hexdigest()
+
+async def ensure_schema(engine: AsyncEngine, metadata: MetaData) -> bool:
+    """
+    Runs create_all only when the models changed since the last run that did, which saves a
+    table-by-table existence check on every boot. Returns whether DDL ran. Existing tables are
+    brought up to the models by database/migrations.py in the same transaction.
+    """
+    fingerprint = schema_fingerprint(metadata, engine.dialect)
+    try:
+        async with engine.connect() as conn:
+            stored = (await conn.execute(
+                select(AppSetting.value).where(AppSetting.key == SCHEMA_FINGERPRINT_KEY)
+            )).scalar_one_or_none()
+    except DBAPIError:
+        stored = None  # A fresh database: app_settings does not exist yet
+    if stored == fingerprint:
+        return False
+
+    async with engine.begin() as conn:
+        await conn.run_sync(metadata.create_all)
+        await conn.run_sync(upgrade_schema, metadata)
+        await conn.execute(delete(AppSetting).where(AppSetting.key == SCHEMA_FINGERPRINT_KEY))
+        await conn.execute(insert(AppSetting).values(key=SCHEMA_FINGERPRINT_KEY, value=fingerprint))
+    return True
+
+
+# --- Connection pool ---
+async def warm_pool(engine: AsyncEngine, connections: int) -> int:
+    """Opens up to `connections` pooled connections at once and returns them to the pool. Returns how many opened."""
+    pool_size = getattr(engine.pool, "size", None)
+    if callable(pool_size):
+        connections = min(connections, pool_size())
+    if connections <= 0:
+        return 0
+
+    async def open_one():
+        conn = await engine.connect()
+        try:
+            await conn.execute(text("SELECT 1"))
+        except BaseException:
+            await conn.close()
+            raise
+        return conn
+
+    # All are held until every one is open, otherwise the pool would hand the first one out again.
+    results = await asyncio.gather(*(open_one() for _ in range(connections)), return_exceptions=True)
+    opened = [conn for conn in results if not isinstance(conn, BaseException)]
+    for conn in opened:
+        await conn.close()
+    if len(opened) < connections:
+        error = next(result for result in results if isinstance(result, BaseException))
+        logger.warning(f"Only {len(opened)}/{connections} database connections could be opened at startup: {error}")
+    return len(opened)
+
+
+# --- Caches ---
+async def _load_catalog():
+    try:
+        await asyncio.wait_for(swapzone_api_client.get_currencies(use_cache=False), CATALOG_WARMUP_TIMEOUT_SECONDS)
+    except (Exception, asyncio.TimeoutError) as e:
+        # Not fatal: the first currency keyboard fetches it again.
+        logger.warning(f"Currency catalog could not be preloaded: {e!r}")
+
+async def _load_with_session(session_factory, load):
+    async with session_factory() as session:
+        await load(session)
+
+async def _load_settings(session):
+    app_settings.replace(await crud.get_all_settings(session))
+
+async def _load_roles(session):
+    role_registry.replace(await crud.get_staff_roles(session))
+
+async def _load_blocklist(session):
+    blocklist.replace(await crud.get_blocked_user_ids(session))
+
+async def warm_caches(session_factory, report: StartupReport, language_preload_days: int, concurrent: bool = True):
+    """
+    Loads everything the first requests would otherwise fetch: the currency catalog, app settings,
+    staff roles, the blocklist and the languages of recently active users. Each loader uses its own
+    session so they run side by side; only the catalog is allowed to fail.
+    """
+    async def load_languages(session):
+        await language_resolver.preload(session, language_preload_days)
+
+    loaders = [
+        report.timed("catalog", _load_catalog()),
+        report.timed("settings", _load_with_session(session_factory, _load_settings)),
+        report.timed("roles", _load_with_session(session_factory, _load_roles)),
+        report.timed("blocklist", _load_with_session(session_factory, _load_blocklist)),
+        report.timed("languages", _load_with_session(session_factory, load_languages)),
+    ]
+    if concurrent:
+        await asyncio.gather(*loaders)
+    else:
+        for loader in loaders:
+            await loader
@@ -6,6 +6,9 @@ from typing import Any, Dict, List, Optional
 
 import aiohttp
 from ..config import logger, settings
+from .logging_setup import SAMPLED
+from .metrics import SWAPZONE_REQUEST_SECONDS
+from .tracing import tracer
 
 API_BASE_URL = "https://api.swapzone.io/v1/exchange"
 
@@ -16,7 +19,10 @@ class SwapZoneAPI:
         self.max_retries = max_retries
         self._session: aiohttp.ClientSession | None = None
         self._currencies_cache: List[Dict[str, Any]] = []
+        self._currencies_by_ticker: Dict[str, Dict[str, Any]] = {}
         self._cache_timestamp: float = 0
+        # Bumped only when a refresh actually changes the catalog, so derived caches (keyboards) survive refreshes.
+        self.catalog_version = 0
 
     async def _get_session(self) -> aiohttp.ClientSession:
         if self._session is None or self._session.closed:
@@ -29,9 +35,12 @@ class SwapZoneAPI:
         url = f"{API_BASE_URL}{endpoint}"
 
         for attempt in range(1, self.max_retries + 1):
+            started = time.perf_counter()
             try:
                 async with session.request(method, url, params=params, json=data, timeout=20) as response:
                     text_response = await response.text()
+                    SWAPZONE_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint, str(response.status))
+                    tracer.record("swapzone", endpoint, started, f"attempt {attempt}: {response.status}")
 
                     if response.status == 200:
                         return await response.json()
@@ -47,6 +56,8 @@ class SwapZoneAPI:
                     raise Exception(f"API request failed ({response.status}): {text_response}")
 
             except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                SWAPZONE_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint, type(e).__name__)
+                tracer.record("swapzone", endpoint, started, f"attempt {attempt}: {type(e).__name__}")
                 logger.warning(f"Network error on '{endpoint}'. Attempt {attempt}/{self.max_retries}: {e}")
                 await asyncio.sleep(2 ** attempt)
 
@@ -62,12 +73,21 @@ class SwapZoneAPI:
         response = await self._request('GET', '/currencies')
 
         if isinstance(response, list):
-            self._currencies_cache = [c for c in response if c.get('ticker')]
+            currencies = [c for c in response if c.get('ticker')]
+            if currencies != self._currencies_cache:
+                self._currencies_cache = currencies
+                self._currencies_by_ticker = {c['ticker']: c for c in currencies}
+                self.catalog_version += 1
             self._cache_timestamp = time.time()
             return self._currencies_cache
 
         raise Exception("Failed to parse currencies from API.")
 
+    @property
+    def currencies_by_ticker(self) -> Dict[str, Dict[str, Any]]:
+        """The last fetched catalog indexed by ticker (empty until get_currencies has succeeded once)."""
+        return self._currencies_by_ticker
+
     async def get_rate(self, from_currency: str, from_network: str, to_currency: str, to_network: str, amount: str) -> Dict[str, Any]:
         """Gets the estimated exchange rate with ALL required parameters."""
         params = {
@@ -78,11 +98,12 @@ class SwapZoneAPI:
             'amount': amount,
             'rateType': 'all',
         }
-        logger.info(f"Getting rate with full params: {params}")
+        logger.info("Getting rate %s/%s -> %s/%s for %s", from_currency, from_network, to_currency, to_network, amount, extra=SAMPLED)
         return await self._request('GET', '/rate', params=params)
 
     async def create_transaction(self, **kwargs) -> Dict[str, Any]:
-        logger.info(f"Creating transaction with data: {kwargs}")
+        # Addresses and amounts stay out of the log; the order row keeps them.
+        logger.info("Creating transaction %s -> %s", kwargs.get("from"), kwargs.get("to"))
         return await self._request('POST', '/create', data=kwargs)
 
     async def close_session(self):
@@ -0,0 +1,161 @@
+# tabadex_bot/utils/tracing.py
+
+import random
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from telegram import Update
+from telegram.request import HTTPXRequest
+
+from ..config import logger, settings
+from ..database.session import async_engine
+
+_current_trace: ContextVar["Trace | None"] = ContextVar("tabadex_trace", default=None)
+
+
+class Trace:
+    """Spans of one update: (kind, name, offset from the update start, duration, detail), all in seconds."""
+    __slots__ = ("update_id", "user_id", "label", "started_at", "started", "duration", "spans", "_token")
+
+    def __init__(self, update_id: int, user_id: int | None, label: str):
+        self.update_id, self.user_id, self.label = update_id, user_id, label
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.spans: list[tuple[str, str, float, float, str]] = []
+
+    def add(self, kind: str, name: str, started: float, duration: float, detail: str = ""):
+        self.spans.append((kind, name, started - self.started, duration, detail))
+
+    def totals(self) -> dict[str, tuple[int, float]]:
+        """Span count and time per kind."""
+        totals: dict[str, tuple[int, float]] = {}
+        for kind, _, _, duration, _ in self.spans:
+            count, total = totals.get(kind, (0, 0.0))
+            totals[kind] = (count + 1, total + duration)
+        return totals
+
+    def to_dict(self) -> dict:
+        return {
+            "update_id": self.update_id, "user_id": self.user_id, "label": self.label,
+            "started_at": self.started_at, "duration": round(self.duration, 6),
+            "spans": [
+                {"kind": kind, "name": name, "offset": round(offset, 6), "duration": round(duration, 6), "detail": detail}
+                for kind, name, offset, duration, detail in self.spans
+            ],
+        }
+
+
+class _Span:
+    __slots__ = ("trace", "kind", "name", "detail", "started")
+
+    def __init__(self, trace: Trace, kind: str, name: str, detail: str):
+        self.trace, self.kind, self.name, self.detail = trace, kind, name, detail
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.trace.add(self.kind, self.name, self.started, time.perf_counter() - self.started, self.detail)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+_NO_SPAN = _NoSpan()
+
+
+def _update_label(update: object) -> str:
+    # Only what identifies the step: commands and callback data, never free text (amounts, addresses).
+    if isinstance(update, Update):
+        if update.callback_query:
+            return f"callback:{update.callback_query.data}"
+        message = update.effective_message
+        if message and message.text and message.text.startswith("/"):
+            return f"command:{message.text.split()[0]}"
+        if message:
+            return "message"
+    return type(update).__name__
+
+
+class Tracer:
+    """
+    Per-update tracing of DB statements, SwapZone calls and Bot API calls. A sampled update carries its
+    Trace in a context variable; traces slower than `slow_seconds` are kept in a ring buffer for admins.
+    With sampling off, each instrumented call costs one context variable lookup.
+    """
+    def __init__(self, sample_rate: float, slow_seconds: float, buffer_size: int):
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.slow_traces: deque[Trace] = deque(maxlen=buffer_size)
+        self.sampled = 0
+
+    def start(self, update: object) -> Trace | None:
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return None
+        user = update.effective_user if isinstance(update, Update) else None
+        trace = Trace(getattr(update, "update_id", 0), user.id if user else None, _update_label(update))
+        trace._token = _current_trace.set(trace)
+        self.sampled += 1
+        return trace
+
+    def finish(self, trace: Trace):
+        _current_trace.reset(trace._token)
+        trace.duration = time.perf_counter() - trace.started
+        if trace.duration >= self.slow_seconds:
+            self.slow_traces.append(trace)
+            logger.warning(f"Slow update {trace.update_id} ({trace.label}) took {trace.duration:.2f}s")
+
+    def span(self, kind: str, name: str, detail: str = ""):
+        trace = _current_trace.get()
+        return _NO_SPAN if trace is None else _Span(trace, kind, name, detail)
+
+    def record(self, kind: str, name: str, started: float, detail: str = ""):
+        """Adds a span that started at `started` (perf_counter) and ends now."""
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(kind, name, started, time.perf_counter() - started, detail)
+
+    def set_sample_rate(self, rate: float):
+        self.sample_rate = min(max(rate, 0.0), 1.0)
+        logger.info(f"Trace sampling rate set to {self.sample_rate}")
+
+
+tracer = Tracer(settings.TRACE_SAMPLE_RATE, settings.TRACE_SLOW_SECONDS, settings.TRACE_BUFFER_SIZE)
+
+
+# --- Database statements ---
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_trace.get() is not None:
+        conn.info.setdefault("tabadex_trace_started", []).append(time.perf_counter())
+
+@event.listens_for(async_engine.sync_engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = _current_trace.get()
+    if trace is None or not conn.info.get("tabadex_trace_started"):
+        return
+    started = conn.info["tabadex_trace_started"].pop()
+    words = statement.split()
+    trace.add("db", words[0] if words else "", started, time.perf_counter() - started, " ".join(words)[:200])
+
+
+# --- Bot API calls ---
+class TracedRequest(HTTPXRequest):
+    """HTTPXRequest that records each Bot API call (e.g. sendMessage) as a span of the current trace."""
+    async def do_request(self, url: str, method: str, *args, **kwargs) -> tuple[int, bytes]:
+        with tracer.span("bot_api", url.rsplit("/", 1)[-1]):
+            return await super().do_request(url, method, *args, **kwargs)
+
+def traced_bot_request() -> TracedRequest:
+    # The pool size ApplicationBuilder uses for its own default request.
+    return TracedRequest(connection_pool_size=256)
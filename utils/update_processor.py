@@ -0,0 +1,81 @@
+# tabadex_bot/utils/update_processor.py
+
+import asyncio
+import time
+from typing import Any, Awaitable
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from .metrics import UPDATE_SECONDS, metrics
+from .tracing import tracer
+
+
+def ordering_key(update: object) -> int | None:
+    """The id whose updates must be handled in order: the sender, else the chat."""
+    if isinstance(update, Update):
+        if update.effective_user:
+            return update.effective_user.id
+        if update.effective_chat:
+            return update.effective_chat.id
+    return None
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processes updates concurrently while keeping the updates of any single user strictly ordered,
+    so a user's conversation never handles two updates at once.
+
+    The base semaphore only bounds how many updates may be in flight (running or waiting behind an
+    earlier update of the same user). Handler concurrency is bounded separately, *after* the
+    per-user lock is taken, so one user's backlog never occupies worker slots.
+    """
+    PENDING_FACTOR = 16
+
+    def __init__(self, max_concurrent_updates: int, max_pending_updates: int | None = None):
+        super().__init__(max_pending_updates or max_concurrent_updates * self.PENDING_FACTOR)
+        self._workers = asyncio.Semaphore(max_concurrent_updates)
+        self._user_locks: dict[int, asyncio.Lock] = {}
+        self._user_waiters: dict[int, int] = {}
+        metrics.collector(
+            "tabadex_updates_in_flight", "Updates running or waiting behind an earlier update of the same user.",
+            lambda: sum(self._user_waiters.values()),
+        )
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        trace = tracer.start(update)
+        try:
+            with UPDATE_SECONDS.time():
+                await self._process_in_order(update, coroutine)
+        finally:
+            if trace:
+                tracer.finish(trace)
+
+    async def _process_in_order(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = ordering_key(update)
+        if key is None:
+            async with self._workers:
+                await coroutine
+            return
+
+        lock = self._user_locks.get(key)
+        if lock is None:
+            lock = self._user_locks[key] = asyncio.Lock()
+        self._user_waiters[key] = self._user_waiters.get(key, 0) + 1
+        waiting = time.perf_counter()
+        try:
+            async with lock, self._workers:
+                tracer.record("wait", "per-user lock and worker slot", waiting)
+                await coroutine
+        finally:
+            self._user_waiters[key] -= 1
+            if not self._user_waiters[key]:
+                # Nobody else is queued for this user, drop the lock so the dict stays small.
+                del self._user_waiters[key]
+                del self._user_locks[key]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass